@@ -0,0 +1,246 @@
+"""
+Benchmark ของ hot path ในการวิเคราะห์ บนวิดีโอสังเคราะห์ (คนนั่งเก้าอี้) ที่สร้างซ้ำได้จาก seed
+
+    python bench_suite.py --size 640x480 --fps 30 --duration 5 --motion 0.5 --repeat 3
+    python bench_suite.py --check            # เทียบกับ history แล้ว exit 1 ถ้าช้าลงเกิน --tolerance
+
+วัดทั้ง end-to-end และราย stage:
+    downsample_video : frame_timestamps, select_frames, total
+    redundancy_stats : total
+    analyse_clip     : extract_clip_features, clip_metrics, total
+    analyse_set      : total (workers=1), workers_n
+    process_video    : total
+    choose_fps       : stats_report, bootstrap_delta_ci, total (ตาราง corpus สังเคราะห์)
+ผลต่อรอบต่อท้ายใน bench/history.jsonl (1 บรรทัด JSON ต่อรอบ)
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+HISTORY_PATH = Path("bench/history.jsonl")
+TOLERANCE    = 0.25          # ช้าลงเกิน 25% จาก median ของรอบก่อน ๆ = regression
+HISTORY_K    = 5             # ใช้กี่รอบล่าสุดเป็น baseline
+MIN_DELTA    = 0.01          # วินาที: stage ที่ช้าลงน้อยกว่านี้ไม่นับ (กัน noise ของ stage ระดับ ms)
+
+
+# ---------- synthetic video ----------
+def seated_frames(size: tuple[int, int] = (640, 480), fps: float = 30.0, n_frames: int = 150,
+                  motion: float = 0.5, seed: int = 0):
+    """
+    generator ของเฟรม BGR สังเคราะห์: stick figure นั่งเก้าอี้บนพื้นหลังที่มี texture
+    motion : 0 = นิ่งสนิท (ทุกเฟรมเหมือนกัน), 1 = โยกตัว ผงกหัว ขยับแขนชัดเจน + noise ของเซนเซอร์
+    """
+    W, H = size
+    rng = np.random.default_rng(seed)
+    small = rng.integers(90, 170, (H // 16 + 1, W // 16 + 1, 3), dtype=np.uint8)
+    bg = cv2.resize(small, (W, H), interpolation=cv2.INTER_CUBIC)
+    cv2.rectangle(bg, (int(0.40 * W), int(0.60 * H)), (int(0.66 * W), int(0.66 * H)), (60, 40, 30), -1)   # เบาะ
+    cv2.rectangle(bg, (int(0.38 * W), int(0.30 * H)), (int(0.41 * W), int(0.90 * H)), (60, 40, 30), -1)   # พนัก
+
+    thick = max(2, int(8 * H / 480))
+    for i in range(n_frames):
+        t = i / fps
+        sway = motion * 0.04 * W * math.sin(2 * math.pi * 0.3 * t)
+        nod  = motion * 0.02 * H * math.sin(2 * math.pi * 0.7 * t)
+        arm  = motion * 0.8 * math.sin(2 * math.pi * 0.5 * t)
+
+        hip      = (0.46 * W + 0.3 * sway, 0.60 * H)
+        shoulder = (0.46 * W + sway, 0.38 * H)
+        head     = (shoulder[0] + 0.2 * sway, 0.29 * H + nod)
+        knee     = (hip[0] + 0.13 * W, hip[1])
+        foot     = (knee[0], 0.86 * H)
+        elbow    = (shoulder[0] + 0.07 * W * math.cos(arm), shoulder[1] + 0.10 * H)
+        wrist    = (elbow[0] + 0.08 * W, elbow[1] - 0.04 * H * math.sin(arm))
+
+        img = bg.copy()
+        pt = lambda p: (int(p[0]), int(p[1]))
+        for a, b in ((hip, shoulder), (hip, knee), (knee, foot), (shoulder, elbow), (elbow, wrist)):
+            cv2.line(img, pt(a), pt(b), (40, 60, 200), thick, cv2.LINE_AA)
+        cv2.circle(img, pt(head), int(0.05 * H), (120, 160, 220), -1, cv2.LINE_AA)
+        if motion > 0:
+            noise = rng.normal(0, 2.0 * motion, img.shape)
+            img = np.clip(img + noise, 0, 255).astype(np.uint8)
+        yield img
+
+
+def make_seated_video(path: str | Path, size: tuple[int, int] = (640, 480), fps: float = 30.0,
+                      duration: float = 5.0, motion: float = 0.5, seed: int = 0) -> Path:
+    """เขียน seated_frames ยาว duration วินาทีเป็นไฟล์ mp4"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for img in seated_frames(size, fps, max(1, int(round(duration * fps))), motion, seed):
+        writer.write(img)
+    writer.release()
+    return Path(path)
+
+
+def make_corpus_table(n_subjects: int = 100, fps_levels=(30, 25, 20, 15, 10, 5), seed: int = 0):
+    """ตาราง metric ระดับ corpus (subject × posture × camera × fps) สำหรับวัด choose_fps"""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    rows = []
+    for s in range(n_subjects):
+        for posture in ("forward", "back"):
+            for cam in ("camera1", "camera2"):
+                for f in fps_levels:
+                    rows.append(dict(subject=f"S{s}", posture=posture, camera=cam,
+                                     clip=f"{posture}_{cam}_{f}fps.mp4",
+                                     coverage=0.9 - 0.001 * (30 - f) + rng.normal(0, 0.01),
+                                     jitter=0.01 + rng.normal(0, 0.001),
+                                     stability=0.05 + rng.normal(0, 0.001),
+                                     dup_pct=0.1 + 0.002 * (30 - f) + rng.normal(0, 0.01)))
+    return pd.DataFrame(rows)
+
+
+# ---------- timing ----------
+def _time(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return dict(min=min(times), median=statistics.median(times))
+
+
+def run_suite(size=(640, 480), fps=30.0, duration=5.0, motion=0.5, repeat=3,
+              n_subjects=100, workers=os.cpu_count() or 1, seed=0) -> dict:
+    """คืน {"<case>.<stage>": {"min": s, "median": s}} ของทุก case"""
+    from fps_check_lib import (analyse_clip, analyse_set, clip_metrics, downsample_video,
+                               extract_clip_features, frame_timestamps, redundancy_stats,
+                               select_frames)
+    from fps_result import bootstrap_delta_ci, choose_fps, stats_report
+    import testing
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)                  # process_video / choose_fps เขียนผลใน cwd
+        try:
+            video = str(make_seated_video(Path("bench_rec/S0/seated/clip_30fps.mp4"),
+                                          size, fps, duration, motion, seed))
+
+            ts = frame_timestamps(video)
+            results["downsample_video.frame_timestamps"] = _time(lambda: frame_timestamps(video), repeat)
+            results["downsample_video.select_frames"] = _time(
+                lambda: select_frames(ts, [25, 20, 15, 10, 5]), repeat)
+            results["downsample_video.total"] = _time(lambda: downsample_video(video, out_dir="ds"), repeat)
+            others = downsample_video(video, out_dir="ds")
+
+            results["redundancy_stats.total"] = _time(lambda: redundancy_stats(video, cache=False), repeat)
+
+            feats = extract_clip_features(video)
+            results["analyse_clip.extract_clip_features"] = _time(lambda: extract_clip_features(video), repeat)
+            results["analyse_clip.clip_metrics"] = _time(lambda: clip_metrics(feats), repeat)
+            results["analyse_clip.total"] = _time(lambda: analyse_clip(video, cache=False), repeat)
+
+            results["analyse_set.total"] = _time(lambda: analyse_set(video, others, cache=False), repeat)
+            if workers > 1:
+                results["analyse_set.workers_n"] = _time(
+                    lambda: analyse_set(video, others, cache=False, workers=workers), repeat)
+
+            results["process_video.total"] = _time(lambda: testing.process_video(video, None), repeat)
+
+            table = make_corpus_table(n_subjects, seed=seed)
+            results["choose_fps.stats_report"] = _time(lambda: stats_report(table), repeat)
+            results["choose_fps.bootstrap_delta_ci"] = _time(lambda: bootstrap_delta_ci(table), repeat)
+            results["choose_fps.total"] = _time(lambda: choose_fps(table), repeat)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+# ---------- history ----------
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=Path(__file__).resolve().parent, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def record(results: dict, params: dict, history: Path = HISTORY_PATH) -> dict:
+    """ต่อท้ายผลหนึ่งรอบลง history (JSONL) คืน entry ที่เขียน"""
+    entry = dict(time=time.strftime("%Y-%m-%dT%H:%M:%S"), commit=_git_commit(),
+                 host=platform.node(), python=platform.python_version(),
+                 params=params, results=results)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def load_history(history: Path = HISTORY_PATH) -> list[dict]:
+    if not history.exists():
+        return []
+    with open(history) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(entry: dict, past: list[dict], tolerance: float = TOLERANCE,
+                     k: int = HISTORY_K) -> list[dict]:
+    """
+    เทียบ min ของแต่ละ stage กับ median ของ k รอบล่าสุดที่ params + host ตรงกัน
+    คืน list ของ stage ที่ช้าลงเกิน tolerance
+    """
+    same = [e for e in past if e["params"] == entry["params"] and e["host"] == entry["host"]][-k:]
+    out = []
+    for stage, r in entry["results"].items():
+        prev = [e["results"][stage]["min"] for e in same if stage in e["results"]]
+        if not prev:
+            continue
+        base = statistics.median(prev)
+        if r["min"] > base * (1 + tolerance) and r["min"] - base > MIN_DELTA:
+            out.append(dict(stage=stage, seconds=r["min"], baseline=base, ratio=r["min"] / base))
+    return out
+
+
+def print_results(results: dict, regressions: list[dict]) -> None:
+    slow = {r["stage"]: r for r in regressions}
+    width = max(len(k) for k in results)
+    for stage, r in results.items():
+        flag = f"  REGRESSION x{slow[stage]['ratio']:.2f}" if stage in slow else ""
+        print(f"{stage:<{width}}  {r['min'] * 1000:10.1f} ms  (median {r['median'] * 1000:.1f}){flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="640x480", help="WxH")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--duration", type=float, default=5.0, help="วินาที")
+    parser.add_argument("--motion", type=float, default=0.5, help="0 = นิ่ง … 1 = ขยับมาก")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--subjects", type=int, default=100, help="จำนวน subject ของตาราง choose_fps")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--check", action="store_true", help="exit 1 ถ้ามี regression")
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    params = dict(size=[w, h], fps=args.fps, duration=args.duration, motion=args.motion,
+                  repeat=args.repeat, subjects=args.subjects, workers=args.workers, seed=args.seed)
+    results = run_suite((w, h), args.fps, args.duration, args.motion, args.repeat,
+                        args.subjects, args.workers, args.seed)
+    past = load_history(args.history)
+    entry = record(results, params, args.history)
+    regressions = find_regressions(entry, past, args.tolerance)
+    print_results(results, regressions)
+    print(f"\n[Saved] {args.history}")
+    if args.check and regressions:
+        raise SystemExit(1)
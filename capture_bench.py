@@ -0,0 +1,134 @@
+"""
+Load test ของ capture-and-record path (capture_sources.Recorder) ด้วยกล้องปลอม N ตัว ไม่ต้องมีกล้องจริง
+ลูปเลียนแบบ DualCameraApp.update_frames: อ่านทุกกล้อง → (preview: แปลง RGB) → เขียนไฟล์ → รอ frame_interval
+
+    python capture_bench.py --cameras 2 --camera-fps 30 --record-fps 10 --duration 10
+    python capture_bench.py --cameras 4 --source fake:clip.mp4 --jitter 0.005 --drop 0.01 --interval-ms 0
+    python capture_bench.py --cameras 2 --encoder mjpg
+
+รายงาน: fps ที่บันทึกได้จริง, เวลาต่อรอบ, latency (กล้องปล่อยเฟรม → เขียนเสร็จ) และเฟรมที่หาย
+    dropped : กล้องทิ้งเอง (--drop)
+    missed  : กล้องปล่อยแล้วแต่ลูปอ่านไม่ทัน ถูกเฟรมใหม่ทับ
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from capture_sources import FRAME_SIZE, Recorder, open_capture
+from encoder_profiles import DEFAULT_ENCODER, ENCODER_PROFILES
+
+
+def _pct(values, q) -> float:
+    return float(np.percentile(values, q)) if len(values) else float("nan")
+
+
+def run_load(n_cameras: int = 2, source: str = "fake", camera_fps: float = 30.0,
+             record_fps: float = 10.0, duration: float = 10.0, jitter: float = 0.0,
+             drop: float = 0.0, interval_ms: int | None = None, preview: bool = True,
+             record: bool = True, out_dir: str | Path | None = None,
+             size: tuple[int, int] = FRAME_SIZE, encoder: str = DEFAULT_ENCODER,
+             background: bool = False) -> dict:
+    """
+    ขับ Recorder ด้วยกล้องปลอม n_cameras ตัวนาน duration วินาที คืน dict ของผลวัด
+    interval_ms : เวลารอหลังแต่ละรอบ (ค่า default = int(1000 / record_fps) เหมือน app, 0 = เร็วสุด)
+    encoder     : encoder profile ของไฟล์ที่บันทึก (encoder_profiles.py)
+    background  : encode ใน thread แยกเหมือน app (latency = ถึงตอนเข้าคิว, รายงานความยาว queue สูงสุด)
+    """
+    if interval_ms is None:
+        interval_ms = int(1000 / record_fps)
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(out_dir or tmp)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # แต่ละกล้องใช้ seed ต่างกัน jitter/drop จะได้ไม่ตรงกันทุกตัว
+        caps = [open_capture(source, fps=camera_fps, jitter=jitter, drop=drop, seed=i)
+                for i in range(n_cameras)]
+        recorder = Recorder(caps, size=size)
+        try:
+            if record:
+                recorder.start([out_dir / f"load_camera{i + 1}.mp4" for i in range(n_cameras)],
+                               record_fps, encoder, background=background)
+            tick_times, latencies, failed, max_queue = [], [], 0, 0
+            t_start = time.perf_counter()
+            while time.perf_counter() - t_start < duration:
+                t0 = time.perf_counter()
+                frames = recorder.read()
+                if frames is None:
+                    failed += 1
+                else:
+                    if preview:
+                        for f in frames:
+                            cv2.cvtColor(f, cv2.COLOR_BGR2RGB)
+                    if record:
+                        recorder.write(frames)
+                        max_queue = max(max_queue, recorder.queue_depth)
+                    done = time.perf_counter()
+                    latencies.extend(done - ts for ts in recorder.timestamps if ts is not None)
+                tick_times.append(time.perf_counter() - t0)
+                if interval_ms:
+                    time.sleep(interval_ms / 1000)
+            elapsed = time.perf_counter() - t_start
+            files = recorder.stop()
+            stats = [cap.stats() for cap in recorder.caps]
+        finally:
+            recorder.release()
+
+    ticks = len(tick_times) - failed
+    encode_s = sum(f["encode_s"] for f in files)
+    return dict(
+        cameras=n_cameras, elapsed=elapsed, ticks=ticks, failed_reads=failed,
+        target_fps=record_fps, sustained_fps=ticks / elapsed if elapsed else 0.0,
+        tick_ms_p50=_pct(tick_times, 50) * 1000, tick_ms_p95=_pct(tick_times, 95) * 1000,
+        latency_ms_p50=_pct(latencies, 50) * 1000, latency_ms_p95=_pct(latencies, 95) * 1000,
+        latency_ms_max=max(latencies, default=float("nan")) * 1000,
+        **{k: sum(s[k] for s in stats) for k in ("produced", "delivered", "dropped", "missed")},
+        encoder=encoder, max_writer_queue=max_queue, file_bytes=sum(f["bytes"] for f in files),
+        encode_fps=sum(f["frames"] for f in files) / encode_s if encode_s else float("nan"),
+        disk_bytes_per_s=sum(f["bytes_per_s"] for f in files),
+    )
+
+
+def print_report(r: dict) -> None:
+    print(f"cameras        : {r['cameras']}  ({r['elapsed']:.1f} s)")
+    print(f"sustained fps  : {r['sustained_fps']:.2f} / target {r['target_fps']:g}"
+          f"  ({r['ticks']} ticks, {r['failed_reads']} failed reads)")
+    print(f"tick time      : p50 {r['tick_ms_p50']:.1f} ms  p95 {r['tick_ms_p95']:.1f} ms")
+    print(f"latency        : p50 {r['latency_ms_p50']:.1f} ms  p95 {r['latency_ms_p95']:.1f} ms"
+          f"  max {r['latency_ms_max']:.1f} ms")
+    produced = max(r["produced"] + r["dropped"], 1)
+    print(f"camera frames  : {r['produced'] + r['dropped']} emitted, {r['delivered']} delivered, "
+          f"{r['dropped']} dropped, {r['missed']} missed ({r['missed'] / produced:.0%})")
+    if r["file_bytes"]:
+        print(f"encoder        : {r['encoder']}  encode {r['encode_fps']:.0f} fps, "
+              f"{r['file_bytes'] / 1e6:.1f} MB รวม, ดิสก์ {r['disk_bytes_per_s'] / 1e6:.2f} MB/s, "
+              f"queue สูงสุด {r['max_writer_queue']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--source", default="fake", help="spec ของกล้องปลอม เช่น fake หรือ fake:clip.mp4")
+    parser.add_argument("--camera-fps", type=float, default=30.0, help="rate ที่กล้องปลอมปล่อยเฟรม")
+    parser.add_argument("--record-fps", type=float, default=10.0, help="fps ของไฟล์ที่บันทึก (self.fps ของ app)")
+    parser.add_argument("--duration", type=float, default=10.0, help="วินาที")
+    parser.add_argument("--jitter", type=float, default=0.0, help="วินาที (sd)")
+    parser.add_argument("--drop", type=float, default=0.0, help="โอกาสที่กล้องทิ้งเฟรม 0..1")
+    parser.add_argument("--interval-ms", type=int, default=None,
+                        help="เวลารอหลังแต่ละรอบ (default = 1000/record-fps เหมือน app)")
+    parser.add_argument("--size", default=f"{FRAME_SIZE[0]}x{FRAME_SIZE[1]}", help="WxH")
+    parser.add_argument("--encoder", default=DEFAULT_ENCODER, choices=list(ENCODER_PROFILES))
+    parser.add_argument("--background-writer", action="store_true", help="encode ใน thread แยกเหมือน app")
+    parser.add_argument("--no-preview", action="store_true")
+    parser.add_argument("--no-record", action="store_true")
+    parser.add_argument("--out-dir", default=None, help="เก็บไฟล์ที่บันทึกไว้ (default = temp แล้วลบทิ้ง)")
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    print_report(run_load(args.cameras, args.source, args.camera_fps, args.record_fps,
+                          args.duration, args.jitter, args.drop, args.interval_ms,
+                          not args.no_preview, not args.no_record, args.out_dir, (w, h),
+                          args.encoder, args.background_writer))
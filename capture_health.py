@@ -0,0 +1,213 @@
+"""
+ตัวเฝ้าสุขภาพของลูป capture (DualCameraApp.update_frames) แบบ real time + นโยบายลดภาระอัตโนมัติ
+
+ติดตามในหน้าต่างเลื่อน HEALTH_WINDOW วินาที:
+    deadline miss : รอบที่ห่างจากรอบก่อนเกิน DEADLINE_SLACK × (1 / fps)
+    read failure  : กล้องตัวไหนอ่านเฟรมไม่ได้ (ต่อกล้อง)
+    writer queue  : เฟรมที่ค้างใน queue ของ writer เบื้องหลัง (Recorder.start(background=True))
+
+เมื่อ miss เกิน MISS_RATE ของรอบในหน้าต่าง หรือ queue ค้างเกิน QUEUE_SECONDS วินาทีของวิดีโอ
+จะใช้ขั้นถัดไปของ DEGRADE_POLICY ทีละขั้น (เว้น HEALTH_WINDOW ก่อนตัดสินใจครั้งถัดไป):
+    preview_every=N : แสดง preview ทุก N รอบ
+    preview_scale=S : ย่อ preview เหลือ S เท่า
+    record_fps=F    : fps บันทึก × F (ทางสุดท้าย; ระหว่างบันทึกมีผลกับ take ถัดไป
+                      เพราะ fps ในไฟล์ที่เปิดอยู่เปลี่ยนไม่ได้)
+read failure ลดภาระแล้วไม่หาย → บันทึกเป็น event อย่างเดียว ไม่เลื่อนขั้น
+
+ฟื้นคืนแบบ hysteresis: miss และ queue ต่ำกว่า RECOVER_FACTOR × เกณฑ์ข้างบนติดต่อกัน RECOVER_WINDOWS หน้าต่าง
+→ ถอยกลับทีละขั้น (ขั้นล่าสุดก่อน) คืนค่าเดิมของขั้นนั้น (event "recover")
+เกณฑ์ฟื้นต่ำกว่าเกณฑ์ลด + ต้องดีต่อเนื่องหลายหน้าต่าง → ไม่แกว่งขึ้นลงทุกหน้าต่าง
+
+กำหนดนโยบายเองได้ด้วย env DEGRADE_POLICY เช่น "preview_every=2,preview_scale=0.5,record_fps=0.5"
+(ว่าง = ไม่ลดภาระ แค่บันทึก) ทุก intervention ถูกเก็บลง <take>_session.json ของการบันทึกนั้น
+"""
+from __future__ import annotations
+import collections
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# ---------- CONFIG ----------
+HEALTH_WINDOW  = 2.0        # วินาที: หน้าต่างเลื่อน + ระยะพักหลัง intervention
+DEADLINE_SLACK = 1.5        # รอบที่ห่างเกิน 1.5 × period = miss
+MISS_RATE      = 0.2        # สัดส่วน miss ในหน้าต่างที่ถือว่าลูปไม่ทัน
+QUEUE_SECONDS  = 1.0        # queue ของ writer ค้างเกินกี่วินาทีของวิดีโอถือว่า writer ไม่ทัน
+RECOVER_WINDOWS = 3         # หน้าต่างที่ดีติดต่อกันก่อนถอยกลับ 1 ขั้น
+RECOVER_FACTOR = 0.5        # "ดี" = miss rate / queue ต่ำกว่าเกณฑ์ลดภาระ × ค่านี้
+DEGRADE_POLICY = [("preview_every", 2), ("preview_every", 4), ("preview_scale", 0.5), ("record_fps", 0.5)]
+DEGRADE_STEPS  = dict(preview_every=int, preview_scale=float, record_fps=float)
+
+
+def policy_from_env(default: list[tuple] = DEGRADE_POLICY) -> list[tuple]:
+    """DEGRADE_POLICY จาก env (ดู docstring ของ module)"""
+    spec = os.environ.get("DEGRADE_POLICY")
+    if spec is None:
+        return list(default)
+    policy = []
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        step, _, value = item.partition("=")
+        if step not in DEGRADE_STEPS:
+            raise ValueError(f"ไม่รู้จักขั้น {step!r} ใน DEGRADE_POLICY (ใช้ได้: {', '.join(DEGRADE_STEPS)})")
+        policy.append((step, DEGRADE_STEPS[step](value)))
+    return policy
+
+
+class HealthMonitor:
+    """
+    เรียก tick() ทุกรอบของลูป คืน dict ของ intervention เมื่อเลื่อนขั้นหรือถอยกลับ (ไม่งั้น None)
+    ค่าปัจจุบันของแต่ละขั้นอ่านจาก preview_every / preview_scale / record_fps_scale
+    """
+
+    def __init__(self, fps: float, n_cameras: int = 2, policy: list[tuple] | None = None,
+                 clock=time.perf_counter):
+        self.fps = float(fps)
+        self.policy = policy_from_env() if policy is None else list(policy)
+        self.clock = clock
+        self.level = 0                              # จำนวนขั้นของ policy ที่ใช้ไปแล้ว
+        self.preview_every, self.preview_scale, self.record_fps_scale = 1, 1.0, 1.0
+        self.n_cameras = n_cameras
+        self._last_tick: float | None = None
+        self._hold_until = 0.0
+        self._applied: list[tuple] = []             # (step, ค่าก่อนใช้ขั้น) ของทุกขั้นที่ใช้อยู่
+        self._healthy_since: float | None = None
+        self.start_session()
+
+    def start_session(self) -> None:
+        """เริ่มนับใหม่สำหรับ session (take) ใหม่ ขั้นที่ลดไปแล้วยังคงอยู่"""
+        self.session_start = self.clock()
+        self.ticks = self.deadline_misses = 0
+        self.read_failures = [0] * self.n_cameras
+        self.max_queue = 0
+        self.events: list[dict] = []
+        self._window: collections.deque = collections.deque()   # (t, missed, queue)
+        self._failing = [False] * self.n_cameras
+
+    def set_fps(self, fps: float) -> None:
+        self.fps = float(fps)
+        self._window.clear()
+
+    def rebase(self, fps: float) -> None:
+        """
+        ผู้ใช้ตั้ง fps เอง: fps นี้เป็นฐานใหม่ record_fps_scale กลับเป็น 1.0
+        ขั้น record_fps ที่ใช้อยู่ยังนับใน level (ลำดับของ policy ไม่เลื่อน) แต่ถอยกลับแล้วไม่เปลี่ยน fps
+        """
+        self.set_fps(fps)
+        if self.record_fps_scale != 1.0:
+            self._event("rebase", step="record_fps", before=self.record_fps_scale, after=1.0, fps=self.fps)
+        self.record_fps_scale = 1.0
+        self._applied = [(step, 1.0 if step == "record_fps" else before) for step, before in self._applied]
+
+    # ---------- ต่อรอบ ----------
+    def tick(self, failed: list[int] = (), queue_depth: int = 0) -> dict | None:
+        """
+        failed      : index ของกล้องที่อ่านไม่ได้ในรอบนี้
+        queue_depth : จำนวนเฟรมที่ค้างใน queue ของ writer
+        """
+        now = self.clock()
+        period = 1.0 / self.fps
+        missed = self._last_tick is not None and now - self._last_tick > DEADLINE_SLACK * period
+        self._last_tick = now
+        self.ticks += 1
+        self.deadline_misses += missed
+        self.max_queue = max(self.max_queue, queue_depth)
+        for i in range(self.n_cameras):
+            fail = i in failed
+            self.read_failures[i] += fail
+            if fail and not self._failing[i]:
+                self._event("read_failure", camera=i + 1)
+            self._failing[i] = fail
+
+        self._window.append((now, missed, queue_depth))
+        while self._window and self._window[0][0] < now - HEALTH_WINDOW:
+            self._window.popleft()
+        if now < self._hold_until or now - self._window[0][0] < 0.5 * HEALTH_WINDOW:
+            return None                             # หน้าต่างยังสั้นเกินจะตัดสิน
+
+        miss_rate = sum(m for _, m, _ in self._window) / len(self._window)
+        max_queue = QUEUE_SECONDS * self.fps
+        reasons = []
+        if miss_rate > MISS_RATE:
+            reasons.append("deadline_miss")
+        if queue_depth > max_queue:
+            reasons.append("writer_queue")
+        if miss_rate > RECOVER_FACTOR * MISS_RATE or queue_depth > RECOVER_FACTOR * max_queue:
+            self._healthy_since = None
+        elif self._healthy_since is None:
+            self._healthy_since = now
+        if reasons and self.level < len(self.policy):
+            return self._degrade(reasons, miss_rate, queue_depth)
+        if (self.level > 0 and self._healthy_since is not None
+                and now - self._healthy_since >= RECOVER_WINDOWS * HEALTH_WINDOW):
+            return self._recover(miss_rate, queue_depth)
+        return None
+
+    def _current(self, step: str):
+        return dict(preview_every=self.preview_every, preview_scale=self.preview_scale,
+                    record_fps=self.record_fps_scale)[step]
+
+    def _set(self, step: str, value) -> None:
+        if step == "preview_every":
+            self.preview_every = value
+        elif step == "preview_scale":
+            self.preview_scale = value
+        else:
+            self.record_fps_scale = value
+
+    def _hold(self) -> None:
+        self._hold_until = self.clock() + HEALTH_WINDOW
+        self._window.clear()
+        self._healthy_since = None
+
+    def _degrade(self, reasons: list[str], miss_rate: float, queue_depth: int) -> dict:
+        step, value = self.policy[self.level]
+        self.level += 1
+        before = self._current(step)
+        if step == "record_fps":
+            value = self.record_fps_scale * value           # คูณสะสมถ้า policy มีหลายขั้น
+        self._applied.append((step, before))
+        self._set(step, value)
+        self._hold()
+        return self._event("degrade", step=step, before=before, after=value, reasons=reasons,
+                           miss_rate=round(miss_rate, 3), queue_depth=queue_depth)
+
+    def _recover(self, miss_rate: float, queue_depth: int) -> dict:
+        step, value = self._applied.pop()
+        self.level -= 1
+        before = self._current(step)
+        self._set(step, value)
+        self._hold()
+        return self._event("recover", step=step, before=before, after=value,
+                           miss_rate=round(miss_rate, 3), queue_depth=queue_depth)
+
+    def _event(self, kind: str, **info) -> dict:
+        ev = dict(kind=kind, t=round(self.clock() - self.session_start, 3), **info)
+        self.events.append(ev)
+        return ev
+
+    # ---------- metadata ----------
+    def session_metadata(self) -> dict:
+        return dict(
+            ticks=self.ticks, deadline_misses=self.deadline_misses,
+            read_failures=self.read_failures, max_writer_queue=self.max_queue,
+            degrade_level=self.level,
+            preview_every=self.preview_every, preview_scale=self.preview_scale,
+            record_fps_scale=self.record_fps_scale,
+            events=self.events,
+        )
+
+
+def record_fps_after(current: float, event: dict) -> float:
+    """fps บันทึกหลัง event ขั้น record_fps (current = fps ที่ใช้อยู่หรือที่รอใช้ take ถัดไป)"""
+    return max(1.0, round(current * event["after"] / event["before"], 2))
+
+
+def write_session(path: str | Path, meta: dict) -> Path:
+    """เขียน metadata ของ session เป็น JSON (tmp แล้ว os.replace)"""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, path)
+    return path
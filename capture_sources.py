@@ -0,0 +1,317 @@
+"""
+แหล่งภาพของ recorder: กล้องจริง (cv2.VideoCapture) หรือกล้องปลอมที่เล่นเฟรมจากไฟล์/เฟรมสังเคราะห์
+เพื่อวัด throughput ของ capture-and-record path ได้โดยไม่ต้องมีกล้อง (CI, server)
+
+spec ของแหล่งภาพ (ใช้ใน open_capture และ env CAMERA_SOURCES ของ two_camera.py คั่นด้วย ","):
+    0, 1, ...                      กล้องจริง index นั้น
+    fake                           กล้องปลอม เฟรมสังเคราะห์ (คนนั่งเก้าอี้จาก bench_suite)
+    fake:clip.mp4                  กล้องปลอม เล่นไฟล์วนซ้ำ
+    fake:clip.mp4?fps=30&jitter=0.005&drop=0.01
+                                   กำหนด rate, jitter (วินาที, sd ของเวลาออกเฟรม), โอกาสเฟรมหาย
+
+FakeCamera จำลองพฤติกรรม driver กล้อง: thread ของกล้องปล่อยเฟรมตามเวลาลงบัฟเฟอร์ 1 ช่อง
+read() รอเฟรมใหม่ ถ้าผู้อ่านช้ากว่ากล้อง เฟรมที่ยังไม่ถูกอ่านจะถูกทับ (นับเป็น missed)
+"""
+from __future__ import annotations
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import cv2
+import numpy as np
+
+import profiling
+from encoder_profiles import DEFAULT_ENCODER, file_stats, open_writer
+
+FRAME_SIZE     = (640, 480)       # ขนาดเฟรมที่ recorder เขียนลงไฟล์ (เหมือน two_camera.py)
+SYNTHETIC_LOOP = 2.0              # วินาที: ความยาวลูปของเฟรมสังเคราะห์ที่ render ไว้ล่วงหน้า
+READ_TIMEOUT   = 2.0              # วินาที: read() ของกล้องปลอมรอนานสุดเท่านี้
+FAKE_PARAMS    = dict(fps=float, jitter=float, drop=float, motion=float, seed=int)   # query ที่ใส่ใน spec ได้
+WRITER_QUEUE   = 64               # เฟรม (ต่อกล้อง): queue ของ writer เบื้องหลังเต็มแล้ว write() จะรอ
+
+
+class FakeCamera:
+    """
+    กล้องปลอมที่ interface เหมือน cv2.VideoCapture (read / isOpened / get / set / release)
+    source : None = เฟรมสังเคราะห์, path = เล่นไฟล์ (วนซ้ำถ้า loop=True)
+    """
+
+    def __init__(self, source: str | None = None, fps: float = 30.0, jitter: float = 0.0,
+                 drop: float = 0.0, size: tuple[int, int] = FRAME_SIZE, loop: bool = True,
+                 motion: float = 0.5, seed: int = 0):
+        if fps <= 0:
+            raise ValueError("fps ต้องมากกว่า 0")
+        self.source = source
+        self.fps    = float(fps)
+        self.jitter = float(jitter)
+        self.drop   = float(drop)
+        self.loop   = loop
+        self._rng   = np.random.default_rng(seed)
+
+        if source is None:
+            from bench_suite import seated_frames
+            n = max(1, int(round(SYNTHETIC_LOOP * fps)))
+            self._frames = list(seated_frames(size, fps, n, motion, seed))
+            self._cap = None
+            self.size = size
+        else:
+            self._frames = None
+            self._cap = cv2.VideoCapture(str(source))
+            if not self._cap.isOpened():
+                raise FileNotFoundError(f"เปิดไฟล์ไม่ได้: {source}")
+            self.size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                         int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        self.produced = self.delivered = self.dropped = self.missed = 0
+        self.last_timestamp: float | None = None      # perf_counter ตอนกล้องปล่อยเฟรมที่ read() คืนล่าสุด
+        self._slot = None                             # (frame, timestamp) ที่ยังไม่ถูกอ่าน
+        self._ended = False
+        self._closed = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ---------- ฝั่งกล้อง ----------
+    def _next_frame(self, k: int):
+        if self._frames is not None:
+            return self._frames[k % len(self._frames)]
+        ret, frame = self._cap.read()
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def _run(self) -> None:
+        t0, k = time.perf_counter(), 0
+        period = 1.0 / self.fps
+        while not self._closed.is_set():
+            due = t0 + k * period
+            if self.jitter:
+                due += float(np.clip(self._rng.normal(0, self.jitter), -0.5 * period, 0.5 * period))
+            wait = due - time.perf_counter()
+            if wait > 0 and self._closed.wait(wait):
+                break
+            frame = self._next_frame(k)
+            k += 1
+            with self._cond:
+                if frame is None:
+                    self._ended = True
+                    self._cond.notify_all()
+                    break
+                if self.drop and self._rng.random() < self.drop:
+                    self.dropped += 1
+                    continue
+                self.produced += 1
+                if self._slot is not None:
+                    self.missed += 1
+                self._slot = (frame, time.perf_counter())
+                self._cond.notify_all()
+        if self._cap is not None:
+            self._cap.release()
+
+    # ---------- interface แบบ cv2.VideoCapture ----------
+    def read(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._slot is not None or self._ended or self._closed.is_set(),
+                                timeout=READ_TIMEOUT)
+            if self._slot is None:
+                return False, None
+            frame, self.last_timestamp = self._slot
+            self._slot = None
+            self.delivered += 1
+        return True, frame.copy()
+
+    def isOpened(self) -> bool:
+        return not self._closed.is_set() and not self._ended
+
+    def get(self, prop: int) -> float:
+        return {cv2.CAP_PROP_FPS: self.fps,
+                cv2.CAP_PROP_FRAME_WIDTH: float(self.size[0]),
+                cv2.CAP_PROP_FRAME_HEIGHT: float(self.size[1])}.get(prop, 0.0)
+
+    def set(self, prop: int, value: float) -> bool:
+        return False
+
+    def release(self) -> None:
+        self._closed.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def stats(self) -> dict:
+        return dict(produced=self.produced, delivered=self.delivered,
+                    dropped=self.dropped, missed=self.missed)
+
+
+def open_capture(spec, **fake_kwargs):
+    """spec (ดู docstring ของ module) → cv2.VideoCapture หรือ FakeCamera; fake_kwargs เป็นค่า default ของกล้องปลอม"""
+    if isinstance(spec, int) or str(spec).strip().isdigit():
+        return cv2.VideoCapture(int(spec))
+    spec = str(spec).strip()
+    if spec != "fake" and not spec.startswith("fake:"):
+        raise ValueError(f"spec ของกล้องไม่ถูกต้อง: {spec!r}")
+    body = spec[len("fake:"):] if spec.startswith("fake:") else ""
+    path, _, query = body.partition("?")
+    kwargs = dict(fake_kwargs)
+    for key, (value, *_) in parse_qs(query).items():
+        if key not in FAKE_PARAMS:
+            raise ValueError(f"ไม่รู้จักพารามิเตอร์ {key!r} ใน {spec!r} (ใช้ได้: {', '.join(FAKE_PARAMS)})")
+        kwargs[key] = FAKE_PARAMS[key](value)
+    if path:
+        kwargs["source"] = path
+    return FakeCamera(**kwargs)
+
+
+def camera_sources(default: str = "0,1") -> list[str]:
+    """spec ของกล้องจาก env CAMERA_SOURCES (เช่น "fake,fake:clip.mp4?fps=15")"""
+    return [s.strip() for s in os.environ.get("CAMERA_SOURCES", default).split(",") if s.strip()]
+
+
+class Recorder:
+    """
+    capture-and-record path ที่ไม่ผูกกับ GUI: อ่านทุกกล้อง → resize เป็น FRAME_SIZE → เขียน VideoWriter
+    (encoder profile ต่อการบันทึก, stop() คืน encode fps / ขนาดไฟล์ / bytes/s ของแต่ละไฟล์)
+    background=True : encode ใน thread แยกผ่าน queue → ลูปไม่ค้างตอน VideoWriter.write ช้า
+                      ความยาว queue (queue_depth) บอกว่า writer ตามไม่ทัน
+                      encode ใน thread ล้มเหลว → เก็บไว้ที่ writer_error, write() ครั้งถัดไป raise RuntimeError
+                      และ stop() ยังปิดไฟล์/คืนสถิติได้ (ผู้เรียกอ่าน writer_error ต่อเอง)
+    DualCameraApp ใช้คลาสนี้อ่าน/บันทึก ส่วน capture_bench.py ใช้ขับด้วยกล้องปลอม N ตัว
+    """
+
+    def __init__(self, sources: list, size: tuple[int, int] = FRAME_SIZE, **fake_kwargs):
+        self.size = size
+        self._fake_kwargs = fake_kwargs
+        self.caps = [self._open(s) for s in sources]
+        self.writers: list = []
+        self.paths: list[Path] = []
+        self.encode_s: list[float] = []
+        self.encoder, self.fps = DEFAULT_ENCODER, 0.0
+        self.timestamps: list[float | None] = [None] * len(self.caps)
+        self.read_failures = [0] * len(self.caps)
+        self.failed: list[int] = []                  # กล้องที่อ่านไม่ได้ใน read() ล่าสุด
+        self._queue: queue.Queue | None = None
+        self._writer_thread: threading.Thread | None = None
+        self.writer_error: Exception | None = None    # exception ของ writer เบื้องหลัง (take ล่าสุด)
+        self.frame_count = 0
+
+    def _open(self, source):
+        return source if hasattr(source, "read") else open_capture(source, **self._fake_kwargs)
+
+    @property
+    def recording(self) -> bool:
+        return bool(self.writers)
+
+    def read(self) -> list[np.ndarray] | None:
+        """หนึ่งเฟรมต่อกล้อง (ขนาด self.size) หรือ None ถ้ามีกล้องไหนอ่านไม่ได้ (ดู self.failed)"""
+        frames, self.failed = [], []
+        with profiling.stage("capture"):
+            for i, cap in enumerate(self.caps):
+                ret, frame = cap.read()
+                if not ret:
+                    self.failed.append(i)
+                    self.read_failures[i] += 1
+                    continue
+                self.timestamps[i] = getattr(cap, "last_timestamp", None)
+                frames.append(cv2.resize(frame, self.size))
+        return None if self.failed else frames
+
+    def start(self, paths: list[str], fps: float, encoder: str = DEFAULT_ENCODER,
+              background: bool = False) -> list[Path]:
+        """
+        เริ่มเขียนไฟล์ละกล้องด้วย encoder profile (ดู encoder_profiles.py)
+        คืน path ที่เขียนจริง (นามสกุลอาจเปลี่ยนตาม container ของ profile)
+        background : encode ใน thread แยก (write() แค่เข้าคิว)
+        """
+        if len(paths) != len(self.caps):
+            raise ValueError("จำนวนไฟล์ต้องเท่ากับจำนวนกล้อง")
+        opened = [open_writer(p, fps, self.size, encoder) for p in paths]
+        self.writers = [w for w, _ in opened]
+        self.paths   = [p for _, p in opened]
+        self.encoder, self.fps = encoder, fps
+        self.encode_s = [0.0] * len(self.writers)
+        self.frame_count = 0
+        self.writer_error = None
+        if background:
+            self._queue = queue.Queue(maxsize=WRITER_QUEUE)
+            self._writer_thread = threading.Thread(target=self._write_loop, daemon=True,
+                                                   name="recorder-writer")
+            self._writer_thread.start()
+        return self.paths
+
+    @property
+    def queue_depth(self) -> int:
+        """จำนวนรอบที่ยังไม่ถูก encode (0 ถ้าเขียนแบบ synchronous)"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _encode(self, frames: list[np.ndarray]) -> None:
+        with profiling.stage("encode"):
+            for i, (writer, frame) in enumerate(zip(self.writers, frames)):
+                t0 = time.perf_counter()
+                writer.write(frame)
+                self.encode_s[i] += time.perf_counter() - t0
+
+    def _write_loop(self) -> None:
+        try:
+            while (frames := self._queue.get()) is not None:
+                self._encode(frames)
+        except Exception as e:                      # thread ตายเงียบๆ ไม่ได้: queue จะเต็มแล้ว write() ค้าง
+            self.writer_error = e
+
+    def _put(self, item) -> None:
+        """เข้าคิวของ writer เบื้องหลัง ไม่รอตลอดไปถ้า thread ตายไปแล้ว"""
+        while True:
+            if self.writer_error is not None or not self._writer_thread.is_alive():
+                raise RuntimeError(f"writer เบื้องหลังหยุดทำงาน: {self.writer_error!r}") from self.writer_error
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, frames: list[np.ndarray]) -> None:
+        if self._queue is not None:
+            self._put(frames)
+        else:
+            self._encode(frames)
+        self.frame_count += 1
+
+    def stop(self) -> list[dict]:
+        """
+        ปิดไฟล์ (รอ queue ของ writer เบื้องหลังหมดก่อน) คืน encoder_profiles.file_stats ของแต่ละไฟล์
+        writer เบื้องหลังล้มเหลว → ไม่ raise ปิดไฟล์ตามปกติ ข้อผิดพลาดอยู่ที่ writer_error
+        """
+        if self._queue is not None:
+            try:
+                self._put(None)
+            except RuntimeError:
+                pass
+            self._writer_thread.join()
+            self._queue = self._writer_thread = None
+        for writer in self.writers:
+            writer.release()
+        stats = [file_stats(p, self.frame_count, t, self.fps, self.encoder)
+                 for p, t in zip(self.paths, self.encode_s)] if self.writers else []
+        self.writers = []
+        return stats
+
+    def replace(self, i: int, source) -> bool:
+        """
+        เปลี่ยนกล้องตัวที่ i คืน True ถ้ากล้องใหม่อ่านเฟรมได้
+        ปิดตัวเดิมก่อนเปิดตัวใหม่ (กล้องจริงบางรุ่นเปิดซ้ำไม่ได้) ถ้าเปิดไม่สำเร็จกล้องตัวนี้จะว่างไว้
+        """
+        self.caps[i].release()
+        cap = self._open(source)
+        if cap.read()[0]:
+            self.caps[i] = cap
+            return True
+        cap.release()
+        return False
+
+    def release(self) -> None:
+        self.stop()
+        for cap in self.caps:
+            cap.release()
@@ -0,0 +1,129 @@
+"""
+วิเคราะห์คู่วิดีโอ <take>_camera1.mp4 / <take>_camera2.mp4 (จาก two_camera.py) พร้อมกันแบบ lockstep
+
+- FrameReader 2 ตัว (กล้องละ 1 thread) decode + แปลง RGB ล่วงหน้าใส่ queue → consumer ดึงเฟรม index เดียวกันของทั้งสองกล้อง
+- pose ของกล้อง 2 รันใน thread แยกขนานกับกล้อง 1 → decode และ inference ของสองสตรีมซ้อนกัน
+- ผลลัพธ์ 1 แถวต่อ take: metric ต่อกล้อง + metric รวม
+    coverage_best   : สัดส่วนเฟรมที่ "อย่างน้อยหนึ่งกล้อง" ผ่าน coverage
+    xview_dist_err  : |ระยะระหว่าง joint (world landmark, เมตร) กล้อง1 - กล้อง2| เฉลี่ย
+                      (ระยะระหว่างจุดไม่ขึ้นกับมุมกล้อง จึงเทียบข้าม view ได้)
+    xview_vis_agree : สัดส่วน joint ที่ทั้งสองกล้องตัดสิน visible ตรงกัน
+"""
+from __future__ import annotations
+import argparse
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from frame_reader import FrameReader
+from fps_check_lib import (JOINT_COLS, N_LANDMARKS, VIS_TH,
+                           coverage_flags, jitter_metric, stability_metric)
+from pose_profiles import DEFAULT_PROFILE, make_pose
+
+QUEUE_SIZE = 16            # จำนวนเฟรมที่ decoder อ่านล่วงหน้าได้ต่อกล้อง
+
+
+def find_pairs(root: str = "recordings") -> list[tuple[str, str, str]]:
+    """คืน [(take, path_camera1, path_camera2), ...] เฉพาะ take ที่มีครบสองไฟล์"""
+    pairs = []
+    for cam1 in sorted(glob.glob(os.path.join(root, "**", "*_camera1.mp4"), recursive=True)):
+        cam2 = cam1[:-len("_camera1.mp4")] + "_camera2.mp4"
+        if os.path.exists(cam2):
+            pairs.append((Path(cam1).name[:-len("_camera1.mp4")], cam1, cam2))
+    return pairs
+
+
+def _pose_row(pose, rgb) -> tuple[np.ndarray, np.ndarray]:
+    """pose.process 1 เฟรม → (image landmark (33,4), world landmark (33,3)); NaN ถ้าไม่เจอคน"""
+    lm = np.full((N_LANDMARKS, 4), np.nan, dtype=np.float32)
+    world = np.full((N_LANDMARKS, 3), np.nan, dtype=np.float32)
+    res = pose.process(rgb)
+    if res.pose_landmarks:
+        lm[:] = [(pt.x, pt.y, pt.z, pt.visibility) for pt in res.pose_landmarks.landmark]
+    if res.pose_world_landmarks:
+        world[:] = [(pt.x, pt.y, pt.z) for pt in res.pose_world_landmarks.landmark]
+    return lm, world
+
+
+def _pairwise_dist(world: np.ndarray) -> np.ndarray:
+    """(T, J, 3) → (T, J, J) ระยะระหว่าง joint ทุกคู่"""
+    return np.linalg.norm(world[:, :, None, :] - world[:, None, :, :], axis=-1)
+
+
+def fused_metrics(lms1, lms2, world1, world2) -> dict:
+    """metric รวมของสองกล้อง (ความยาวเท่ากันแล้ว)"""
+    flags1, flags2 = coverage_flags(lms1), coverage_flags(lms2)
+    both = ~np.isnan(lms1[:, 0, 0]) & ~np.isnan(lms2[:, 0, 0])
+
+    out = dict(coverage_best=float((flags1 | flags2).mean()),
+               both_found=float(both.mean()),
+               xview_dist_err=np.nan, xview_vis_agree=np.nan)
+    if both.any():
+        d1 = _pairwise_dist(world1[both][:, JOINT_COLS].astype(np.float64))
+        d2 = _pairwise_dist(world2[both][:, JOINT_COLS].astype(np.float64))
+        iu = np.triu_indices(len(JOINT_COLS), k=1)
+        out["xview_dist_err"] = float(np.nanmean(np.abs(d1 - d2)[:, iu[0], iu[1]]))
+        v1 = lms1[both][:, JOINT_COLS, 3] > VIS_TH
+        v2 = lms2[both][:, JOINT_COLS, 3] > VIS_TH
+        out["xview_vis_agree"] = float((v1 == v2).mean())
+    return out
+
+
+def analyse_pair(cam1: str, cam2: str, pose_profile: str = DEFAULT_PROFILE) -> dict:
+    """decode สองกล้องแบบ lockstep + pose ขนานกัน คืน metric ต่อกล้องและ metric รวม"""
+    readers = [FrameReader(p, "rgb", queue_size=QUEUE_SIZE) for p in (cam1, cam2)]
+    poses = [make_pose(pose_profile), make_pose(pose_profile)]
+    rows = ([], []), ([], [])            # (landmarks, world) ต่อกล้อง
+    try:
+        with ThreadPoolExecutor(max_workers=1) as side:
+            for fr1, fr2 in zip(*readers):
+                fut = side.submit(_pose_row, poses[1], fr2.rgb)   # กล้อง 2 ขนานกับกล้อง 1
+                results = [_pose_row(poses[0], fr1.rgb), fut.result()]
+                for (lms, world), (lm, w) in zip(rows, results):
+                    lms.append(lm); world.append(w)
+        n_frames = [sum(1 for _ in r) for r in readers]          # เฟรมที่เหลือของกล้องที่ยาวกว่า
+    finally:
+        for r in readers:
+            r.close()
+        for p in poses:
+            p.close()
+
+    if not rows[0][0]:
+        raise ValueError(f"อ่านเฟรมไม่ได้: {cam1}, {cam2}")
+
+    T = len(rows[0][0])
+    lms1, lms2 = np.stack(rows[0][0]), np.stack(rows[1][0])
+    world1, world2 = np.stack(rows[0][1]), np.stack(rows[1][1])
+    out = dict(frames=T, frame_diff=n_frames[0] - n_frames[1])
+    for cam, lms in (("cam1", lms1), ("cam2", lms2)):
+        out[f"coverage_{cam}"]  = float(coverage_flags(lms).mean())
+        out[f"jitter_{cam}"]    = jitter_metric(lms)
+        out[f"stability_{cam}"] = stability_metric(lms)
+    out.update(fused_metrics(lms1, lms2, world1, world2))
+    return out
+
+
+def analyse_pairs(root: str = "recordings", pose_profile: str = DEFAULT_PROFILE) -> pd.DataFrame:
+    """หนึ่งแถวต่อ take ของทุกคู่ใน root"""
+    rows = []
+    for take, cam1, cam2 in tqdm(find_pairs(root), desc="Dual-view"):
+        rows.append(dict(take=take, **analyse_pair(cam1, cam2, pose_profile)))
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="วิเคราะห์ camera1/camera2 ของแต่ละ take พร้อมกัน")
+    parser.add_argument("--root", default="recordings")
+    parser.add_argument("--pose-profile", default=DEFAULT_PROFILE)
+    parser.add_argument("--out", default="metrics_dual_view.csv")
+    args = parser.parse_args()
+
+    df = analyse_pairs(args.root, args.pose_profile)
+    df.to_csv(args.out, index=False)
+    print(df.to_string(index=False))
+    print(f"\n[Saved] {args.out}")
@@ -0,0 +1,122 @@
+"""
+Benchmark ของ encoder profile (encoder_profiles.ENCODER_PROFILES) บนเครื่องที่จะใช้บันทึกจริง
+รายงานต่อ profile: encode fps, ขนาดไฟล์, bytes/s ที่ดิสก์ต้องเขียนตอนบันทึก
+เทียบกับความเร็วเขียนดิสก์ของโฟลเดอร์ปลายทาง → เลือก profile ที่ทันทั้ง CPU และดิสก์สำหรับกล้อง N ตัว
+
+    python encoder_bench.py                                  # เฟรมสังเคราะห์ 640x480 (คนนั่งเก้าอี้)
+    python encoder_bench.py --videos "recordings/**/*.mp4" --fps 10 --cameras 2 --out-dir recordings
+
+realtime_cameras : จำนวนกล้องที่ encode ทันที่ --fps ด้วย CPU 1 core (encode_fps / fps)
+disk_headroom    : ความเร็วเขียนดิสก์ / bytes/s ของกล้องทั้งหมด (< 1 = ดิสก์ไม่ทัน)
+"""
+from __future__ import annotations
+import argparse
+import glob
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from encoder_profiles import ENCODER_PROFILES, available_profiles, file_stats, open_writer
+from frame_reader import FrameReader
+
+DISK_PROBE_MB = 64           # ขนาดไฟล์ทดสอบความเร็วเขียนดิสก์
+
+
+def load_frames(videos: list[str], size: tuple[int, int], max_frames: int) -> list[np.ndarray]:
+    """เฟรม BGR ขนาด size จากวิดีโอ (ต่อกันจนครบ max_frames) หรือเฟรมสังเคราะห์ถ้าไม่ระบุวิดีโอ"""
+    if not videos:
+        from bench_suite import seated_frames
+        return list(seated_frames(size, 30.0, max_frames, motion=0.5))
+    frames = []
+    for v in videos:
+        with FrameReader(v, "bgr", size=size) as reader:
+            for fr in reader:
+                frames.append(fr.bgr)
+                if len(frames) >= max_frames:
+                    return frames
+    return frames
+
+
+def encode_profile(frames: list[np.ndarray], profile: str, fps: float, out_dir: str | Path) -> dict:
+    """encode เฟรมทั้งหมดด้วย profile เดียว คืน file_stats (เวลารวม release() ที่ flush ลงไฟล์)"""
+    h, w = frames[0].shape[:2]
+    writer, path = open_writer(Path(out_dir) / f"bench_{profile}.mp4", fps, (w, h), profile)
+    t0 = time.perf_counter()
+    for f in frames:
+        writer.write(f)
+    writer.release()
+    stats = file_stats(path, len(frames), time.perf_counter() - t0, fps, profile)
+    os.remove(path)
+    return stats
+
+
+def disk_write_rate(out_dir: str | Path, mb: int = DISK_PROBE_MB) -> float:
+    """bytes/s ของการเขียนไฟล์ลง out_dir (รวม fsync ไม่ให้ page cache หลอก)"""
+    block = os.urandom(1 << 20)
+    fd, path = tempfile.mkstemp(dir=out_dir, suffix=".bench")
+    try:
+        t0 = time.perf_counter()
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(mb):
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        return mb * len(block) / (time.perf_counter() - t0)
+    finally:
+        os.remove(path)
+
+
+def run_bench(frames: list[np.ndarray], profiles: list[str], fps: float = 10.0,
+              cameras: int = 2, out_dir: str | Path | None = None) -> pd.DataFrame:
+    """ตารางผลต่อ profile (profile ที่ OpenCV ของเครื่องนี้ไม่มี codec จะถูกข้าม)"""
+    usable = available_profiles()
+    skipped = [p for p in profiles if p not in usable]
+    if skipped:
+        print(f"[skip] ไม่มี codec ในเครื่องนี้: {', '.join(skipped)}")
+    with tempfile.TemporaryDirectory(dir=out_dir) as tmp:
+        disk_bps = disk_write_rate(tmp)
+        rows = []
+        for p in profiles:
+            if p not in usable:
+                continue
+            s = encode_profile(frames, p, fps, tmp)
+            rows.append(dict(profile=p, fourcc=usable[p], frames=s["frames"],
+                             encode_fps=s["encode_fps"], file_mb=s["bytes"] / 1e6,
+                             mb_per_s=s["bytes_per_s"] / 1e6,
+                             realtime_cameras=s["encode_fps"] / fps,
+                             disk_headroom=disk_bps / (s["bytes_per_s"] * cameras)
+                             if s["bytes_per_s"] else np.nan))
+    df = pd.DataFrame(rows)
+    df.attrs["disk_mb_per_s"] = disk_bps / 1e6
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", default=None, help="glob ของวิดีโอ (default = เฟรมสังเคราะห์)")
+    parser.add_argument("--profiles", nargs="+", default=list(ENCODER_PROFILES),
+                        choices=list(ENCODER_PROFILES))
+    parser.add_argument("--fps", type=float, default=10.0, help="fps ของไฟล์ที่บันทึก (self.fps ของ app)")
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--size", default="640x480", help="WxH")
+    parser.add_argument("--out-dir", default=None, help="โฟลเดอร์บนดิสก์ที่จะบันทึกจริง (default = temp)")
+    parser.add_argument("--out", default="report/encoder_bench.csv")
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    videos = sorted(glob.glob(args.videos, recursive=True)) if args.videos else []
+    if args.videos and not videos:
+        raise SystemExit(f"ไม่พบวิดีโอ: {args.videos}")
+    df = run_bench(load_frames(videos, (w, h), args.frames), args.profiles,
+                   args.fps, args.cameras, args.out_dir)
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(args.out, index=False)
+    print(df.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    print(f"\ndisk write: {df.attrs['disk_mb_per_s']:.1f} MB/s")
+    print(f"[Saved] {args.out}")
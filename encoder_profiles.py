@@ -0,0 +1,260 @@
+"""
+ชุดการตั้งค่า encoder ของ VideoWriter ที่เลือกใช้ได้ทั้งตอนบันทึก (two_camera.py / capture_sources.Recorder)
+และตอนสร้างคลิป fps ต่ำ (fps_check_lib.downsample_video) เลือกจากผล encoder_bench.py ของแต่ละเครื่อง
+(encode fps vs ขนาดไฟล์ vs bytes/s ที่ดิสก์ต้องเขียนทัน)
+
+แต่ละ profile มีรายการ fourcc เรียงตามลำดับที่อยากได้ ใช้ตัวแรกที่ OpenCV build ของเครื่องนั้นเปิดได้
+(เช่น H.264 มีใน build ที่มี openh264/ffmpeg ที่เปิด encoder ไว้) ไม่มีสักตัว = profile นั้นใช้ไม่ได้บนเครื่องนี้
+ไม่ตกไปใช้ codec ของ profile อื่นเงียบๆ
+container ของไฟล์ถูกเปลี่ยนตาม profile (MJPG ใน .mp4 ไม่ใช่ tag มาตรฐาน → ใช้ .avi)
+
+env ของ two_camera.py:
+    CAPTURE_ENCODER=mjpg        profile ตอนบันทึก (default mp4v)
+    ARCHIVE_ENCODER=h264        transcode หลังบันทึกเสร็จใน process แยกเบื้องหลัง (default ไม่ transcode
+                                ยกเว้นไฟล์ตอนบันทึกไม่ใช่ .mp4 จะ transcode เป็น mp4v ให้ประวัติ/ตัววิเคราะห์หาเจอ)
+                                codec เดียวกับตอนบันทึก = ValueError (encode ซ้ำได้แต่คุณภาพตก)
+
+import โมดูลนี้ไม่โหลด cv2 (CLI ใช้ ENCODER_PROFILES เป็น choices ได้โดยไม่เสียเวลาเริ่ม)
+"""
+from __future__ import annotations
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cv2
+
+# ---------- CONFIG ----------
+ENCODER_PROFILES = {
+    "mp4v": dict(fourcc=("mp4v",), ext=".mp4"),                 # ค่าเดิมของ repo (MPEG-4 Part 2)
+    "mjpg": dict(fourcc=("MJPG",), ext=".avi"),                 # intra-only: ไม่มี motion search, ไฟล์ใหญ่
+    "h264": dict(fourcc=("avc1", "H264"), ext=".mp4"),          # archive: เล็กกว่า mp4v (ต้องมี H.264 ใน build)
+    "vp9" : dict(fourcc=("VP90",), ext=".mp4"),                 # archive ที่เล็กสุดใน build ทั่วไป แต่ encode ช้ามาก
+}
+DEFAULT_ENCODER = "mp4v"
+TRANSCODE_DIR   = ".transcode"      # โฟลเดอร์ชั่วคราว (ชื่อขึ้นต้นด้วย . → glob ของตัววิเคราะห์ไม่เห็น)
+CODEC_ALIASES   = {                 # fourcc (ตัวเล็ก) → codec เดียวกัน (ไฟล์ mp4v อ่านกลับมาได้ tag FMP4)
+    "fmp4": "mp4v", "xvid": "mp4v", "divx": "mp4v",
+    "avc1": "h264", "x264": "h264",
+    "vp09": "vp90",
+}
+
+_FOURCC_OK: dict[tuple, bool] = {}   # (fourcc, ext) → เปิด writer ได้ไหม (probe ครั้งเดียวต่อ process)
+
+
+def _check(profile: str) -> dict:
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"ไม่รู้จัก encoder profile: {profile} (มี {', '.join(ENCODER_PROFILES)})")
+    return ENCODER_PROFILES[profile]
+
+
+def output_path(path: str | Path, profile: str = DEFAULT_ENCODER) -> Path:
+    """path ที่ไฟล์จะถูกเขียนจริง (นามสกุลตาม container ของ profile)"""
+    return Path(path).with_suffix(_check(profile)["ext"])
+
+
+def _probe(fourcc: str, ext: str) -> bool:
+    key = (fourcc, ext)
+    if key not in _FOURCC_OK:
+        import cv2
+        with tempfile.TemporaryDirectory() as tmp:
+            w = cv2.VideoWriter(str(Path(tmp) / f"probe{ext}"), cv2.VideoWriter_fourcc(*fourcc),
+                                10, (64, 48))
+            _FOURCC_OK[key] = w.isOpened()
+            w.release()
+    return _FOURCC_OK[key]
+
+
+def resolve_fourcc(profile: str = DEFAULT_ENCODER) -> str | None:
+    """fourcc ตัวแรกของ profile ที่เครื่องนี้ใช้ได้ (None = ใช้ไม่ได้เลย)"""
+    cfg = _check(profile)
+    return next((cc for cc in cfg["fourcc"] if _probe(cc, cfg["ext"])), None)
+
+
+def codec_of(fourcc: str | None) -> str | None:
+    """ชื่อ codec กลางของ fourcc (ใช้เทียบว่า transcode แล้วได้ codec เดิมหรือไม่)"""
+    if not fourcc:
+        return None
+    cc = fourcc.strip("\0 ").lower()
+    return CODEC_ALIASES.get(cc, cc)
+
+
+def _refuse_same_codec(source_fourcc: str | None, profile: str) -> None:
+    target = resolve_fourcc(profile)
+    if target is not None and codec_of(source_fourcc) == codec_of(target):
+        raise ValueError(f"ไม่ transcode: profile {profile} ({target}) เป็น codec เดียวกับต้นฉบับ "
+                         f"({source_fourcc}) encode ซ้ำได้แต่คุณภาพตก")
+
+
+def available_profiles() -> dict[str, str]:
+    """profile ที่ใช้ได้บนเครื่องนี้ → fourcc ที่จะถูกใช้จริง"""
+    found = {p: resolve_fourcc(p) for p in ENCODER_PROFILES}
+    return {p: cc for p, cc in found.items() if cc}
+
+
+def open_writer(path: str | Path, fps: float, size: tuple[int, int],
+                profile: str = DEFAULT_ENCODER) -> tuple[cv2.VideoWriter, Path]:
+    """
+    cv2.VideoWriter ตาม profile คืน (writer, path ที่เขียนจริง)
+    raise RuntimeError ถ้า OpenCV ของเครื่องนี้ไม่มี codec ของ profile
+    """
+    import cv2
+    out = output_path(path, profile)
+    fourcc = resolve_fourcc(profile)
+    if fourcc is None:
+        raise RuntimeError(f"OpenCV ของเครื่องนี้ไม่มี codec ของ profile {profile} "
+                           f"({', '.join(_check(profile)['fourcc'])}) ใช้ได้: {', '.join(available_profiles())}")
+    writer = cv2.VideoWriter(str(out), cv2.VideoWriter_fourcc(*fourcc), fps, tuple(size))
+    if not writer.isOpened():
+        raise RuntimeError(f"เปิด VideoWriter ไม่ได้: {out} ({profile}/{fourcc})")
+    return writer, out
+
+
+def file_stats(path: str | Path, frames: int, encode_s: float, fps: float, profile: str) -> dict:
+    """
+    ตัวเลขของไฟล์ที่เขียนเสร็จแล้ว
+    encode_fps  : เฟรมต่อวินาทีของเวลา writer.write() รวม (ต้องมากกว่า fps × จำนวนกล้องถึงจะทัน)
+    bytes_per_s : bytes ต่อวินาทีของวิดีโอ = rate ที่ดิสก์ต้องเขียนให้ทันตอนบันทึกจริง
+    """
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    duration = frames / fps if fps else 0.0
+    return dict(path=str(path), profile=profile, frames=frames, bytes=size,
+                encode_s=encode_s, encode_fps=frames / encode_s if encode_s else 0.0,
+                bytes_per_s=size / duration if duration else 0.0)
+
+
+# ---------- transcode หลังบันทึก ----------
+def _source_fourcc(reader) -> str:
+    import cv2
+    cc = int(reader.cap.get(cv2.CAP_PROP_FOURCC)) & 0xFFFFFFFF       # บาง backend คืนค่าติดลบ
+    return cc.to_bytes(4, "little").decode("latin-1")
+
+
+def _verify(path: Path, frames: int) -> None:
+    """ไฟล์ผลต้องเปิดได้และอ่านได้ครบทุกเฟรมที่เขียน ไม่งั้นลบไฟล์ผลทิ้งแล้ว raise IOError"""
+    from frame_reader import FrameReader
+    with FrameReader(path, "bgr") as reader:
+        got = sum(1 for _ in reader) if reader.isOpened() else 0
+    if frames == 0 or got != frames:
+        os.remove(path)
+        raise IOError(f"ไฟล์ transcode ไม่สมบูรณ์: {path.name} อ่านได้ {got}/{frames} เฟรม (เก็บต้นฉบับไว้)")
+
+
+def transcode(src: str | Path, profile: str, remove_src: bool = True) -> dict:
+    """
+    เข้ารหัส src ใหม่ด้วย profile (ไฟล์ผลนามสกุลตาม profile ข้างไฟล์เดิม)
+    เขียนลง <dir>/.transcode/ ก่อน แล้วเปิดอ่านไฟล์ผลให้ครบทุกเฟรม (_verify) ก่อนย้ายเข้าที่
+    → ไม่มีไฟล์ครึ่งๆ กลางๆ ให้ตัววิเคราะห์เจอ และต้นฉบับไม่ถูกแตะจนกว่าไฟล์ผลจะผ่านการตรวจ
+    remove_src : ลบไฟล์ต้นฉบับหลังไฟล์ผลผ่านการตรวจ ถ้า False แต่ชื่อไฟล์ผลซ้ำกับต้นฉบับ
+                 ไฟล์ผลจะใช้ชื่อ <stem>_<profile><ext> แทน
+    raise ValueError ถ้า profile เป็น codec เดียวกับต้นฉบับ
+    คืน file_stats ของไฟล์ผล + src_bytes
+    """
+    from frame_reader import FrameReader
+    src = Path(src)
+    dst = output_path(src, profile)
+    if dst == src and not remove_src:
+        dst = src.with_name(f"{src.stem}_{profile}{src.suffix}")
+    tmp_dir = src.parent / TRANSCODE_DIR
+    tmp = tmp_dir / dst.name
+
+    src_bytes = os.path.getsize(src)
+    frames, encode_s = 0, 0.0
+    try:
+        with FrameReader(src, "bgr") as reader:
+            if not reader.isOpened():
+                raise IOError(f"Cannot open {src}")
+            _refuse_same_codec(_source_fourcc(reader), profile)
+            fps = reader.fps or 30.0
+            tmp_dir.mkdir(exist_ok=True)
+            writer, _ = open_writer(tmp, fps, reader.frame_size, profile)
+            try:
+                for fr in reader:
+                    t0 = time.perf_counter()
+                    writer.write(fr.bgr)
+                    encode_s += time.perf_counter() - t0
+                    frames += 1
+            finally:
+                writer.release()
+        _verify(tmp, frames)                 # ปิด reader ของต้นฉบับแล้ว (Windows ลบไฟล์ที่เปิดอยู่ไม่ได้)
+        if dst == src:
+            os.remove(src)                   # ชื่อเดียวกัน: ลบต้นฉบับหลังไฟล์ผลผ่านการตรวจแล้วเท่านั้น
+        os.replace(tmp, dst)
+        if remove_src and dst != src:
+            os.remove(src)
+    finally:
+        try:
+            tmp_dir.rmdir()
+        except OSError:                      # มีงานอื่นใช้อยู่ / ไม่ได้สร้าง
+            pass
+    return dict(file_stats(dst, frames, encode_s, fps, profile), src=str(src), src_bytes=src_bytes)
+
+
+def _lower_priority() -> None:
+    """initializer ของ process transcode: ลด priority ให้ลูป capture ได้ CPU ก่อน"""
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+class Transcoder:
+    """
+    คิว transcode เบื้องหลัง: process แยก 1 ตัว (ไม่แย่ง GIL ของ GUI, priority ต่ำ) ทำทีละไฟล์
+        tc = Transcoder("h264", source="mp4v")
+        fut = tc.submit(path)          # concurrent.futures.Future → dict ของ transcode()
+        tc.collect()                   # ผลของงานที่เสร็จแล้ว (ให้ GUI poll ด้วย after())
+    source : profile ของไฟล์ที่จะส่งมา ถ้าเป็น codec เดียวกับ profile → ValueError ตั้งแต่สร้าง
+             (transcode() ตรวจ codec ของไฟล์จริงซ้ำอีกครั้งทุกไฟล์)
+    """
+
+    def __init__(self, profile: str, remove_src: bool = True, source: str | None = None):
+        _check(profile)
+        if source is not None:
+            _refuse_same_codec(resolve_fourcc(source), profile)
+        self.profile, self.remove_src = profile, remove_src
+        self._pool = None
+        self.futures: list = []
+
+    def submit(self, path: str | Path):
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=1, initializer=_lower_priority)
+        fut = self._pool.submit(transcode, str(path), self.profile, self.remove_src)
+        self.futures.append((str(path), fut))
+        return fut
+
+    def pending(self) -> int:
+        return sum(not f.done() for _, f in self.futures)
+
+    def collect(self) -> list[dict]:
+        """ผลของงานที่เสร็จแล้ว (เอาออกจากคิว) งานที่ล้มเหลวได้ dict(src=..., error=...)"""
+        done = [(p, f) for p, f in self.futures if f.done()]
+        self.futures = [(p, f) for p, f in self.futures if not f.done()]
+        results = []
+        for path, fut in done:
+            exc = fut.exception()
+            results.append(dict(src=path, error=repr(exc)) if exc else fut.result())
+        return results
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+def encoders_from_env(default: str = DEFAULT_ENCODER) -> tuple[str, str | None]:
+    """
+    (capture, archive) จาก env CAPTURE_ENCODER / ARCHIVE_ENCODER (ดู docstring ของ module)
+    raise ValueError ถ้า archive เป็น codec เดียวกับ capture บนเครื่องนี้
+    """
+    capture = os.environ.get("CAPTURE_ENCODER", default).strip() or default
+    archive = os.environ.get("ARCHIVE_ENCODER", "").strip() or None
+    _check(capture)
+    if archive is not None:
+        _check(archive)
+    elif ENCODER_PROFILES[capture]["ext"] != ".mp4":
+        archive = DEFAULT_ENCODER
+    if archive is not None:
+        _refuse_same_codec(resolve_fourcc(capture), archive)
+    return capture, archive
@@ -0,0 +1,109 @@
+"""
+cache ของ feature ต่อเฟรม (SSIM ของเฟรมติดกัน, pose landmarks, frame hash) ต่อวิดีโอ
+
+- key = sha1(เนื้อไฟล์วิดีโอ) + ชนิด feature + พารามิเตอร์ + CACHE_VERSION → วิดีโอเดิม/พารามิเตอร์เดิมไม่ต้อง decode ใหม่
+  เปลี่ยนรูปแบบของ feature ที่เก็บ (เพิ่ม/เปลี่ยน key) ให้เพิ่ม CACHE_VERSION → entry รุ่นเก่าไม่ถูกอ่านอีก
+- เก็บเป็น .npz (array ละคอลัมน์) ในโฟลเดอร์ cache, ลบไฟล์ที่ใช้ล่าสุดนานที่สุดก่อนเมื่อเกิน max_bytes
+- เปิดใช้ทั้งระบบได้ด้วย env FEATURE_CACHE_DIR (ฟังก์ชันใน fps_check_lib จะใช้ default_cache())
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+
+# ---------- CONFIG ----------
+CACHE_ENV       = "FEATURE_CACHE_DIR"
+CACHE_MAX_BYTES = 2 * 1024**3       # 2 GB
+CACHE_VERSION   = 3                 # 2: feature ของคลิปมี timestamps, 3: index มี pos_msec_ok
+
+_hash_memo: dict[tuple, str] = {}   # (path, size, mtime) → sha1 ภายใน process เดียว
+
+
+def file_hash(path: str, chunk: int = 1 << 20) -> str:
+    """sha1 ของเนื้อไฟล์ (memo ตาม size+mtime เพื่อไม่ต้องอ่านไฟล์ซ้ำใน run เดียวกัน)"""
+    st = os.stat(path)
+    memo_key = (str(Path(path).resolve()), st.st_size, st.st_mtime_ns)
+    if memo_key not in _hash_memo:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk), b""):
+                h.update(block)
+        _hash_memo[memo_key] = h.hexdigest()
+    return _hash_memo[memo_key]
+
+
+class FeatureCache:
+    """
+    >>> cache = FeatureCache("cache_dir")
+    >>> feats = cache.get(video, "ssim", resize_to=(256, 256))   # None ถ้าไม่มี
+    >>> cache.put(video, "ssim", dict(ssim=series), resize_to=(256, 256))
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def key(self, video_path: str, kind: str, **params) -> str:
+        blob = json.dumps(dict(kind=kind, version=CACHE_VERSION, **params), sort_keys=True, default=str)
+        digest = hashlib.sha1(blob.encode()).hexdigest()[:16]
+        return f"{file_hash(video_path)}_{kind}_{digest}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def get(self, video_path: str, kind: str, **params) -> dict[str, np.ndarray] | None:
+        p = self._path(self.key(video_path, kind, **params))
+        if not p.exists():
+            return None
+        try:
+            with np.load(p) as z:
+                feats = {k: z[k] for k in z.files}
+        except (OSError, ValueError):        # ไฟล์เสีย → ถือว่าไม่มี
+            p.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(p)                       # อัปเดตเวลาใช้ล่าสุด (ใช้ตอน evict)
+        except FileNotFoundError:             # process อื่น evict ไปหลังอ่านเสร็จ ข้อมูลที่อ่านแล้วยังใช้ได้
+            pass
+        return feats
+
+    def put(self, video_path: str, kind: str, arrays: dict[str, np.ndarray], **params) -> None:
+        p = self._path(self.key(video_path, kind, **params))
+        # เขียนไฟล์ชั่วคราวแล้ว rename เพื่อไม่ให้ process อื่นอ่านไฟล์ที่เขียนไม่เสร็จ
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, p)
+        self.evict()
+
+    def evict(self) -> None:
+        files = sorted(self.root.glob("*.npz"), key=lambda f: f.stat().st_mtime)
+        total = sum(f.stat().st_size for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            total -= f.stat().st_size
+            f.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for f in self.root.glob("*.npz"):
+            f.unlink(missing_ok=True)
+
+
+def default_cache() -> FeatureCache | None:
+    """FeatureCache จาก env FEATURE_CACHE_DIR (ไม่ได้ตั้ง → None = ไม่ใช้ cache)"""
+    root = os.environ.get(CACHE_ENV)
+    return FeatureCache(root) if root else None
+
+
+def resolve_cache(cache: FeatureCache | bool | None) -> FeatureCache | None:
+    """None → default_cache(), False → ปิด cache, FeatureCache → ใช้ตามนั้น"""
+    if cache is None:
+        return default_cache()
+    if cache is False:
+        return None
+    return cache
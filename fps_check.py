@@ -1,68 +1,215 @@
-from fps_check_lib import downsample_video, analyse_set
-from fps_result import run_stats, _extract_fps  # เพิ่มตรงนี้
-import pandas as pd
+"""
+entry point ของ pipeline FPS
+
+    python fps_check.py run [VIDEO ...]      # P2–P6 ผ่าน pipeline ที่ cache ทุก stage
+    python fps_check.py analyse VIDEO        # metric ของวิดีโอยาวไฟล์เดียว (--chunks = แบ่งช่วงรันขนาน)
+    python fps_check.py list                 # รายชื่อวิดีโอใน recordings/
+    python fps_check.py summary              # พิมพ์ report/metrics_summary.csv
+    python fps_check.py stats [CSV]          # P5 (+ --choose = P6)
+    python fps_check.py bench-import         # เวลา import ของแต่ละโมดูล
+
+import โมดูลนี้ไม่รันอะไร; ไลบรารีหนักโหลดเฉพาะ subcommand ที่ต้องใช้
+"""
+from __future__ import annotations
+import argparse
+import csv
+import glob
+import os
 from pathlib import Path
+from typing import Sequence
+import profiling
+from pose_profiles import DEFAULT_PROFILE, POSE_PROFILES
+from encoder_profiles import DEFAULT_ENCODER, ENCODER_PROFILES
+
+DEFAULT_VIDEO = "recordings/forward_20250506_162415_camera2.mp4"
+
+# module ที่ stage เรียกต่อ → แก้โค้ดในนี้แล้ว stage ที่เกี่ยวข้อง run ใหม่เอง (ดู pipeline.Pipeline.add)
+LIB_MODULES    = ("fps_check_lib", "frame_reader", "ssim_engine", "feature_cache", "pose_profiles",
+                  "encoder_profiles", "landmark_export", "mediapipe")
+RESULT_MODULES = ("fps_result",)
+
+# ---------- stage ของ pipeline (ฟังก์ชันระดับโมดูล → fingerprint จาก source ได้) ----------
+def _stage_downsample(video_path, target_fps_list, encoder=DEFAULT_ENCODER):
+    from fps_check_lib import downsample_video
+    return downsample_video(video_path, target_fps_list, encoder=encoder)
+
+def _stage_metrics(ds_videos, video_path, pose_profile, export_dir):
+    from fps_check_lib import analyse_set
+    df = analyse_set(video_path, ds_videos, pose_profile=pose_profile, export_dir=export_dir)
+    df.insert(0, "recording", Path(video_path).name)
+    return df
+
+def _stage_combine(*frames, out_csv):
+    import pandas as pd
+    df = pd.concat(frames, ignore_index=True)
+    df.to_csv(out_csv, index=False)
+    print(f"[Saved] {out_csv}")
+    return df
 
-def run_pipeline(video_path: str):
+def _stage_stats(df, alpha):
+    from fps_result import stats_report
+    return stats_report(df, alpha=alpha)
+
+def _stage_choose(df, alpha, thresh, decision):
+    from fps_result import choose_fps
+    return choose_fps(df, alpha=alpha, thresh=thresh, decision=decision)
+
+
+def recording_key(video_path: str) -> str:
+    """ชื่อ recording ใน stage: path สัมพัทธ์ไม่มีนามสกุล (ไฟล์ชื่อซ้ำต่างโฟลเดอร์ไม่ชนกัน)"""
+    return Path(os.path.relpath(video_path)).with_suffix("").as_posix()
+
+
+def build_pipeline(video_paths: list[str], pose_profile: str = DEFAULT_PROFILE,
+                   export_dir: str | None = None, target_fps_list: list[float] | None = None,
+                   thresh: dict[str, float] | None = None, alpha: float | None = None,
+                   decision: str = "point", out_csv: str = "metrics_all_fps.csv",
+                   cache_dir: str | None = None, workers: int = 4,
+                   encoder: str = DEFAULT_ENCODER):
     """
-    รับวิดีโอ baseline 1 ไฟล์ แล้วรันทุก P แบบอัตโนมัติ
-    คืนค่าที่เป็น FPS ที่ดีที่สุด (ไม่ต่างจาก baseline + redundancy ต่ำ)
+    DAG ของ pipeline FPS:
+        downsample_<rec> → metrics_<rec>  (แต่ละ recording เป็นกิ่งแยก รันพร้อมกัน)
+        → combine (metrics_all_fps.csv) → stats (P5) / choose (P6)
+    thresh / alpha ค่า default = fps_result.THRESH / ALPHA ตอนสร้าง pipeline
+    → แก้ THRESH แล้วรันใหม่ จะ run แค่ stage choose (stage อื่นมาจาก cache)
+    encoder : encoder profile ของคลิป downsample (เปลี่ยนแล้ว stage downsample/metrics run ใหม่)
     """
-    # ----- P2: Downsample -----
-    print(">>> Step P2: Downsampling")
-    ds_videos = downsample_video(video_path)
+    import fps_result
+    from pipeline import PIPELINE_CACHE_DIR, Pipeline, outputs_exist
+    thresh = dict(fps_result.THRESH if thresh is None else thresh)
+    alpha  = fps_result.ALPHA if alpha is None else alpha
 
-    # ----- P3–P4: Metrics -----
-    print("\n>>> Step P3–P4: Analyse clips")
-    df_metrics = analyse_set(video_path, ds_videos)
+    pipe = Pipeline(cache_dir or PIPELINE_CACHE_DIR, workers=workers)
+    metric_stages = []
+    for v in video_paths:
+        rec = recording_key(v)
+        ds = pipe.add(f"downsample_{rec}", _stage_downsample, inputs=[v], check=outputs_exist,
+                      modules=LIB_MODULES,
+                      video_path=str(v), target_fps_list=target_fps_list, encoder=encoder)
+        metric_stages.append(pipe.add(f"metrics_{rec}", _stage_metrics, deps=[ds],
+                                      modules=LIB_MODULES,
+                                      video_path=str(v), pose_profile=pose_profile,
+                                      export_dir=export_dir))
+    pipe.add("combine", _stage_combine, deps=metric_stages,
+             check=lambda _: os.path.exists(out_csv), out_csv=out_csv)
+    pipe.add("stats", _stage_stats, deps=["combine"], modules=RESULT_MODULES, alpha=alpha)
+    pipe.add("choose", _stage_choose, deps=["combine"], modules=RESULT_MODULES,
+             check=lambda _: os.path.exists(fps_result.OUT_DIR / "metrics_summary.csv"),
+             alpha=alpha, thresh=thresh, decision=decision)
+    return pipe
 
-    # Save เผื่อไว้ใช้ซ้ำ
-    out_csv = Path("metrics_all_fps.csv")
-    df_metrics.to_csv(out_csv, index=False)
-    print(f"\n[Saved] {out_csv}")
-    print('นำข้อมูลที่ได้ไปวิเคราะห์ต่อในการทำEDA')
 
+@profiling.timed()
+def run_pipeline(video_path: str | list[str], pose_profile: str = DEFAULT_PROFILE,
+                 export_dir: str | None = None, thresh: dict[str, float] | None = None,
+                 decision: str = "point", force: Sequence[str] = (), workers: int = 4,
+                 encoder: str = DEFAULT_ENCODER):
+    """
+    รับวิดีโอ baseline (1 ไฟล์หรือหลายไฟล์) แล้วรันทุก P แบบอัตโนมัติ ผ่าน pipeline ที่ cache ทุก stage
+    คืนค่าที่เป็น FPS ที่ดีที่สุด (choose_fps)
+    pose_profile : ชื่อ profile ใน pose_profiles.POSE_PROFILES
+    export_dir   : ถ้าระบุ จะ export landmark ของทุกคลิป (ดู landmark_export)
+    thresh       : เกณฑ์ของ choose_fps (ค่า default = fps_result.THRESH)
+    force        : ชื่อ stage ที่บังคับ run ใหม่ (แก้โค้ดใน LIB_MODULES / RESULT_MODULES ไม่ต้องใช้)
+    encoder      : ชื่อ profile ใน encoder_profiles.ENCODER_PROFILES ของคลิป downsample
     """
+    videos = [video_path] if isinstance(video_path, (str, Path)) else list(video_path)
+    pipe = build_pipeline(videos, pose_profile=pose_profile, export_dir=export_dir,
+                          thresh=thresh, decision=decision, workers=workers, encoder=encoder)
+    out = pipe.run(force=force)
 
     # ----- P5: Statistical Analysis -----
     print("\n>>> Step P5: Statistical Analysis")
-    run_stats(df_metrics)
+    print(out["stats"])
 
     # ----- P6: เลือก FPS ที่ดีสุด -----
-    print("\n>>> Step P6: Selecting best FPS")
-    try:
-        base_fps = _extract_fps(video_path)  # ใช้ _extract_fps แทน split("_")
-    except ValueError:
-        print(f"Warning: Filename does not contain a valid FPS value. Using default FPS of 30.")
-        base_fps = 30
-
-    df_metrics["fps"] = df_metrics["clip"].apply(lambda clip: _extract_fps(clip))  # ใช้ _extract_fps กับ clip
-
-    # เงื่อนไขที่ผ่าน:
-    # 1) coverage ไม่ต่ำเกิน
-    # 2) jitter/stability ไม่แย่กว่ามาก
-    # 3) redundancy (dup_pct) ไม่เกิน 0.95
-    # 4) ไม่แตกต่างจาก baseline (พิจารณาจาก Δ ไม่เยอะ)
-
-    fps_f1_scores = []
-    for p in ds_videos:
-        try:
-            fps_val = _extract_fps(p)  # ใช้ _extract_fps
-            f1 = 1 - df_metrics[df_metrics["clip"] == Path(p).name]["dup_pct"].values[0]
-            fps_f1_scores.append((fps_val, f1))
-        except KeyError:
-            print(f"Warning: Missing data for clip {p}. Skipping.")
-
-    fps_f1_scores.sort(key=lambda x: x[1], reverse=True)
-
-    if fps_f1_scores:
-        best_fps = fps_f1_scores[0][0]
-        print(f"\n>>> Recommended FPS: {best_fps} fps")
-        return best_fps
-    else:
-        print("ไม่พบ FPS ที่ผ่านเกณฑ์ทั้งหมด ใช้ baseline ต่อไป")
-        return base_fps
-    """
+    print(f"\n>>> Recommended FPS: {out['choose']} fps")
+    return out["choose"]
+
+
+def list_recordings(root: str = "recordings") -> list[str]:
+    return sorted(glob.glob(os.path.join(root, "**", "*.mp4"), recursive=True))
+
+
+def print_summary(path: str | Path) -> None:
+    """พิมพ์ตารางสรุปที่ choose_fps เขียนไว้ (อ่านด้วย csv ไม่ต้องโหลด pandas)"""
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    for r in rows:
+        print("  ".join(c.rjust(w) for c, w in zip(r, widths)))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="FPS pipeline")
+    sub = parser.add_subparsers(dest="cmd")
+
+    p_run = sub.add_parser("run", help="P2–P6: downsample → metrics → stats → เลือก FPS")
+    p_run.add_argument("video", nargs="*", default=[DEFAULT_VIDEO])
+    p_run.add_argument("--pose-profile", default=DEFAULT_PROFILE, choices=list(POSE_PROFILES))
+    p_run.add_argument("--export-landmarks", metavar="DIR", default=None)
+    p_run.add_argument("--decision", default="point", choices=["point", "ci"])
+    p_run.add_argument("--force", nargs="+", default=[], metavar="STAGE",
+                       help="stage ที่บังคับ run ใหม่ เช่น metrics_recordings/<ชื่อวิดีโอไม่มีนามสกุล>")
+    p_run.add_argument("--workers", type=int, default=4, help="จำนวน stage ที่รันพร้อมกัน")
+    p_run.add_argument("--encoder", default=DEFAULT_ENCODER, choices=list(ENCODER_PROFILES),
+                       help="encoder profile ของคลิป downsample")
+    profiling.add_cli_args(p_run)
+
+    p_one = sub.add_parser("analyse", help="metric ของวิดีโอยาวไฟล์เดียว แบ่งช่วงเฟรมวิเคราะห์ขนานกัน")
+    p_one.add_argument("video")
+    p_one.add_argument("--chunks", type=int, default=os.cpu_count() or 1)
+    p_one.add_argument("--pose-profile", default="static", choices=list(POSE_PROFILES),
+                       help="--chunks > 1 ต้องใช้ profile แบบ static (tracking ข้ามรอยต่อของช่วงไม่ได้)")
+    profiling.add_cli_args(p_one)
+
+    p_list = sub.add_parser("list", help="รายชื่อวิดีโอ")
+    p_list.add_argument("--root", default="recordings")
+
+    p_sum = sub.add_parser("summary", help="พิมพ์ metrics_summary.csv")
+    p_sum.add_argument("csv", nargs="?", default="report/metrics_summary.csv")
+
+    p_stats = sub.add_parser("stats", help="P5: สถิติ (+ P6 ด้วย --choose)")
+    p_stats.add_argument("csv", nargs="?", default="metrics_all_fps.csv")
+    p_stats.add_argument("--choose", action="store_true")
+    p_stats.add_argument("--decision", default="point", choices=["point", "ci"])
+    profiling.add_cli_args(p_stats)
+
+    p_bench = sub.add_parser("bench-import", help="วัดเวลา import")
+    p_bench.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args(argv)
+    profiling.enable_from_args(args)
+    if args.cmd in (None, "run"):
+        run_pipeline(getattr(args, "video", [DEFAULT_VIDEO]),
+                     pose_profile=getattr(args, "pose_profile", DEFAULT_PROFILE),
+                     export_dir=getattr(args, "export_landmarks", None),
+                     decision=getattr(args, "decision", "point"),
+                     force=getattr(args, "force", []),
+                     workers=getattr(args, "workers", 4),
+                     encoder=getattr(args, "encoder", DEFAULT_ENCODER))
+    elif args.cmd == "analyse":
+        from fps_check_lib import analyse_clip, redundancy_stats
+        metrics = analyse_clip(args.video, pose_profile=args.pose_profile, chunks=args.chunks)
+        metrics.update(redundancy_stats(args.video, chunks=args.chunks))
+        for k, v in metrics.items():
+            print(f"{k:<16} {v}")
+    elif args.cmd == "list":
+        for p in list_recordings(args.root):
+            print(p)
+    elif args.cmd == "summary":
+        print_summary(args.csv)
+    elif args.cmd == "stats":
+        import pandas as pd
+        from fps_result import run_stats, choose_fps
+        df = pd.read_csv(args.csv)
+        run_stats(df)
+        if args.choose:
+            choose_fps(df, decision=args.decision)
+    elif args.cmd == "bench-import":
+        from import_bench import run_bench, print_report
+        print_report(run_bench(repeat=args.repeat))
 
 
-run_pipeline("recordings/forward_20250506_162415_camera2.mp4")
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,90 @@
+"""
+ไลบรารีวิเคราะห์ FPS: downsample → redundancy (SSIM) → pose metric ต่อคลิป
+import เบา (cv2 + numpy); mediapipe / pandas / tqdm โหลดเมื่อฟังก์ชันที่ใช้ถูกเรียกครั้งแรก
+"""
+from __future__ import annotations
 import cv2
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
 from pathlib import Path
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
-from tqdm import tqdm
-import mediapipe as mp
-import pandas as pd
+import profiling
+from frame_reader import FrameReader
+from ssim_engine import SSIMSeries, SSIMCascade, MotionGate, ssim_pair, frame_dhash
+from feature_cache import FeatureCache, resolve_cache
+from pose_profiles import DEFAULT_PROFILE, POSE_PROFILES, make_pose
+from encoder_profiles import DEFAULT_ENCODER, open_writer
+from landmark_export import export_landmarks, build_index, recording_name
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    import pandas as pd
+
+def frame_timestamps(video_path: str) -> np.ndarray:
+    """
+    อ่าน presentation timestamp (วินาที) ของทุกเฟรมด้วย grab() อย่างเดียว (ไม่ decode ภาพ)
+    ถ้า backend ไม่คืน timestamp ที่เพิ่มขึ้นเรื่อย ๆ จะ fallback เป็น idx / fps ของ container
+    """
+    return _scan_timestamps(video_path)[0]
+
+
+def _scan_timestamps(video_path: str) -> tuple[np.ndarray, bool]:
+    """(timestamps, pos_msec_ok) ของ frame_timestamps; pos_msec_ok=False = ใช้ idx / fps แทน"""
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise IOError(f"Cannot open {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
 
+    ts = []
+    while cap.grab():
+        ts.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+    cap.release()
+
+    ts = np.asarray(ts, dtype=np.float64)
+    if len(ts) > 1 and not np.all(np.diff(ts) > 0):
+        return np.arange(len(ts), dtype=np.float64) / fps, False
+    return ts, True
+
+
+def select_frames(timestamps: np.ndarray,
+                  target_fps_list: list[float]) -> dict[float, np.ndarray]:
+    """
+    เลือก index เฟรมต้นฉบับสำหรับทุก fps เป้าหมายในครั้งเดียว (vectorized)
+    ----------------------------------------------------------------------
+    เฟรมที่ k ของ output (เวลา t0 + k/f) = เฟรมต้นฉบับล่าสุดที่ timestamp <= เวลานั้น
+    (sample-and-hold แบบกล้องจริงที่ fps ต่ำกว่า) ดังนั้นถ้าต้นฉบับมีช่วงเฟรมหาย
+    index จะซ้ำได้ เพื่อให้เวลาของ output ตรงกับ fps ที่ติดป้ายไว้
+    รองรับ fps เศษส่วน เช่น 7.5, 12.5
+
+    คืน dict {fps : np.ndarray ของ index}
+    """
+    ts = np.asarray(timestamps, dtype=np.float64)
+    targets = np.asarray(target_fps_list, dtype=np.float64)
+    if len(ts) == 0 or len(targets) == 0:
+        return {f: np.empty(0, dtype=np.int64) for f in target_fps_list}
+
+    # ความยาวคลิปรวมช่วงแสดงผลของเฟรมสุดท้าย
+    frame_dt = np.median(np.diff(ts)) if len(ts) > 1 else 0.0
+    duration = ts[-1] - ts[0] + frame_dt
+    n_out = np.maximum(np.floor(duration * targets + 1e-6).astype(np.int64), 1)
+
+    # grid เวลาของทุก target ต่อกันเป็น array เดียว แล้ว searchsorted ครั้งเดียว
+    starts = np.cumsum(n_out) - n_out
+    k = np.arange(n_out.sum()) - np.repeat(starts, n_out)
+    t = ts[0] + k / np.repeat(targets, n_out)
+    idx = np.searchsorted(ts, t + 1e-6, side="right") - 1
+
+    return dict(zip(target_fps_list, np.split(idx, starts[1:])))
+
+
+@profiling.timed()
 def downsample_video(
         video_path: str,
-        target_fps_list: list[int] | None = None,
-        out_dir: str = "downsampled"
+        target_fps_list: list[float] | None = None,
+        out_dir: str = "downsampled",
+        timestamps: np.ndarray | None = None,
+        encoder: str = DEFAULT_ENCODER
     ) -> list[str]:
     """
     รับไฟล์วิดีโอ 1 คลิปแล้วสร้างไฟล์ที่ fps ต่ำลงตาม target_fps_list
@@ -19,113 +93,172 @@ def downsample_video(
     ----------
     video_path : str
         path ของวิดีโอต้นฉบับ
-    target_fps_list : list[int] | None
+    target_fps_list : list[float] | None
         fps ที่ต้องการ (ถ้า None จะสร้าง 5 ค่า: (fps_orig-5,…,-25) ขั้นละ-5)
+        ใส่ค่าเศษส่วนได้ เช่น 7.5 → ไฟล์ *_7.5fps.mp4
     out_dir : str
         โฟลเดอร์เก็บผลลัพธ์
+    timestamps : np.ndarray | None
+        timestamp (วินาที) ของแต่ละเฟรม ถ้า None จะอ่านจากไฟล์ด้วย frame_timestamps()
+    encoder : str
+        encoder profile ของไฟล์ผล (encoder_profiles.py) นามสกุลไฟล์ตาม profile
+        ค่า default mp4v = ผลเดิม (codec อื่นให้ artifact ต่างกัน → SSIM/pose ของคลิปเปลี่ยนตาม)
     """
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise IOError(f"Cannot open {video_path}")
-
-    fps_orig   = cap.get(cv2.CAP_PROP_FPS)
-    width      = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height     = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-    # -------- 1) กำหนดชุด fps เป้าหมาย --------
-    if target_fps_list is None:
-        step = max(1, int(fps_orig // 6))          # ให้ได้ ~5 ค่า
-        target_fps_list = [int(fps_orig - i*step)  # 30→[25,20,15,10,5]
-                           for i in range(1, 6)
-                           if fps_orig - i*step > 0]
-
-    # ป้องกัน target เกิน fps ต้นฉบับ
-    target_fps_list = [f for f in target_fps_list if f < fps_orig]
-
-    # -------- 2) เตรียม VideoWriter ทุกตัว --------
-    out_paths = []
-    writers   = {}
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")       # .mp4
-
-    Path(out_dir).mkdir(exist_ok=True)
-
-    for f in target_fps_list:
-        out_path = Path(out_dir) / f"{Path(video_path).stem}_{f}fps.mp4"
-        writers[f] = cv2.VideoWriter(str(out_path), fourcc, f, (width, height))
-        out_paths.append(str(out_path))
-
-    # -------- 3) วนอ่านเฟรมแล้วเขียนแบบ skip --------
-    acc = {f:0.0 for f in target_fps_list}         # accumulator ต่อ fps
-    ratio = {f: fps_orig / f for f in target_fps_list}
-
-    frame_idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        for f in target_fps_list:
-            acc[f] += 1
-            if acc[f] >= ratio[f]:                 # ถึงคิวเขียนเฟรม
-                writers[f].write(frame)
-                acc[f] -= ratio[f]
-
-        frame_idx += 1
-
-    # -------- 4) ปิดไฟล์ทั้งหมด --------
-    cap.release()
-    for w in writers.values():
-        w.release()
+    if timestamps is None:
+        timestamps = frame_timestamps(video_path)
+
+    with FrameReader(video_path, "bgr") as reader:    # decode ล่วงหน้าใน thread ซ้อนกับการ encode
+        if not reader.isOpened():
+            raise IOError(f"Cannot open {video_path}")
+
+        fps_orig      = reader.fps
+        width, height = reader.frame_size
+
+        # -------- 1) กำหนดชุด fps เป้าหมาย --------
+        if target_fps_list is None:
+            step = max(1, int(fps_orig // 6))          # ให้ได้ ~5 ค่า
+            target_fps_list = [int(fps_orig - i*step)  # 30→[25,20,15,10,5]
+                               for i in range(1, 6)
+                               if fps_orig - i*step > 0]
+
+        # ป้องกัน target เกิน fps ต้นฉบับ
+        target_fps_list = [f for f in target_fps_list if f < fps_orig]
+
+        # -------- 2) เลือกเฟรมจาก timestamp จริง (ครั้งเดียวทุก fps) --------
+        selected = select_frames(timestamps, target_fps_list)
+        n_src = len(timestamps)
+        # จำนวนครั้งที่ต้องเขียนเฟรมต้นฉบับแต่ละเฟรม ต่อ fps
+        repeats = {f: np.bincount(idx, minlength=n_src) for f, idx in selected.items()}
+
+        # -------- 3) เตรียม VideoWriter ทุกตัว --------
+        out_paths = []
+        writers   = {}
+        Path(out_dir).mkdir(exist_ok=True)
+
+        try:
+            for f in target_fps_list:
+                writers[f], out_path = open_writer(Path(out_dir) / f"{Path(video_path).stem}_{f:g}fps.mp4",
+                                                   f, (width, height), encoder)
+                out_paths.append(str(out_path))
+
+            # -------- 4) วนอ่านเฟรมแล้วเขียนตาม index ที่เลือกไว้ --------
+            for fr in reader:
+                if fr.index >= n_src:
+                    break
+                with profiling.stage("encode"):
+                    for f in target_fps_list:
+                        for _ in range(repeats[f][fr.index]):
+                            writers[f].write(fr.bgr)
+        finally:
+            # -------- 5) ปิดไฟล์ทั้งหมด (รวมกรณี error → decoder/writer ไม่ค้าง) --------
+            for w in writers.values():
+                w.release()
 
     return out_paths
 
 
+@profiling.timed()
 def redundancy_stats(video_path: str,
                      resize_to: tuple[int, int] = (256, 256),
                      threshold: float = 0.95,
-                     use_gray: bool = True) -> dict:
+                     use_gray: bool = True,
+                     eng_batch: int = 64,
+                     gate: MotionGate | None = None,
+                     cache: FeatureCache | bool | None = None,
+                     chunks: int = 1) -> dict:
     """
-    คำนวณ SSIM ระหว่างเฟรมติดกันของวิดีโอ
+    คำนวณ SSIM ระหว่างเฟรมติดกันของวิดีโอ (batch ละ eng_batch เฟรม ผ่าน ssim_engine)
     คืน dict: {mean_ssim, redundant_ratio, total_frames}
+
+    gate : MotionGate | None
+        ถ้าระบุ จะใช้ cascade (ภาพย่อ → SSIM เฉพาะคู่ที่ไม่แน่ใจ) และเพิ่ม
+        stage_counts ใน dict; mean_ssim เป็น nan เพราะไม่ได้คำนวณ SSIM ทุกคู่
+    cache : FeatureCache | bool | None
+        None = ใช้ default_cache() (env FEATURE_CACHE_DIR), False = ไม่ใช้
+        series ของ SSIM ถูกเก็บไว้ → เปลี่ยน threshold แล้วรันใหม่ไม่ต้อง decode (ไม่ใช้ร่วมกับ gate)
+    chunks : > 1 = แบ่งวิดีโอเป็นช่วงเฟรมคำนวณขนานกันใน process pool (เฉพาะ use_gray และไม่มี gate
+             ไม่งั้น raise ValueError)
     """
-    cap = cv2.VideoCapture(video_path)
-    ok, prev = cap.read()
-    if not ok:
-        raise ValueError(f"ไม่สามารถเปิดไฟล์ {video_path}")
-
-    total, redundant, ssim_sum = 0, 0, 0.0
-    
-    # เตรียมเฟรมแรก
-    if use_gray:
-        prev = cv2.cvtColor(prev, cv2.COLOR_BGR2GRAY)
-    if resize_to:
-        prev = cv2.resize(prev, resize_to)
-
-    pbar = tqdm(total=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
-                desc=f"Scanning {video_path}")
-
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-        if use_gray:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        if resize_to:
-            frame = cv2.resize(frame, resize_to)
-
-        # คำนวณ SSIM ระหว่าง prev–curr
-        score = ssim(prev, frame)
-        ssim_sum += score
-        if score > threshold:
-            redundant += 1
-        total += 1
-
-        prev = frame
-        pbar.update(1)
-    cap.release(); pbar.close()
+    if chunks > 1 and (gate is not None or not use_gray):
+        raise ValueError("chunks > 1 ใช้ได้กับ use_gray=True และไม่มี gate เท่านั้น")
+    cache = resolve_cache(cache) if gate is None else None
+    cache_params = dict(resize_to=resize_to, use_gray=use_gray)
+    if cache is not None:
+        feats = cache.get(video_path, "ssim", **cache_params)
+        if feats is not None:
+            return _redundancy_from_series(feats["ssim"], threshold)
+
+    if chunks > 1:
+        feats = _chunked_features(video_path, chunks, size=resize_to,
+                                  cache=cache if cache is not None else False)
+        if cache is not None:
+            cache.put(video_path, "ssim", dict(ssim=feats["ssim"], frame_hash=feats["frame_hash"]),
+                      **cache_params)
+        return _redundancy_from_series(feats["ssim"], threshold)
+
+    # แปลงเป็นเทา + ย่อใน thread ของ reader → loop นี้เหลือแค่ SSIM
+    view = "gray" if use_gray else "bgr"
+    with FrameReader(video_path, view, size=resize_to) as reader:
+        first = reader.read()
+        if first is None:
+            raise ValueError(f"ไม่สามารถเปิดไฟล์ {video_path}")
+
+        eng = SSIMSeries()                 # stat ของแต่ละเฟรมคำนวณครั้งเดียว
+        casc = SSIMCascade(threshold, gate) if gate is not None else None
+        scores, verdicts = [], []
+
+        # เตรียมเฟรมแรก
+        prev = getattr(first, view)
+        batch = [prev]
+        hashes = [frame_dhash(prev)] if prev.ndim == 2 else []
+        if casc is not None:
+            casc.push(prev)
+
+        from tqdm import tqdm
+        pbar = tqdm(total=reader.frame_count, desc=f"Scanning {video_path}")
+
+        for fr in reader:
+            frame = getattr(fr, view)
+            pbar.update(1)
+            if hashes:
+                hashes.append(frame_dhash(frame))
+            if casc is not None:
+                with profiling.stage("ssim"):
+                    verdicts.append(casc.push(frame))
+                continue
+
+            # สะสมเป็น batch แล้วคำนวณ SSIM ของคู่ prev–curr ทีเดียว
+            batch.append(frame)
+            if len(batch) >= eng_batch:
+                with profiling.stage("ssim"):
+                    scores.append(eng.push(np.stack(batch)))
+                batch = []
+        if casc is None and batch:
+            with profiling.stage("ssim"):
+                scores.append(eng.push(np.stack(batch)))
+    pbar.close()
+
+    if casc is not None:
+        total = len(verdicts)
+        return dict(mean_ssim=float("nan"),
+                    redundant_ratio=sum(verdicts) / max(total, 1),
+                    total_frames=total+1,  # +1 รวมเฟรมแรก
+                    stage_counts=dict(casc.stats))
+
+    scores = np.concatenate(scores)
+    if cache is not None:
+        cache.put(video_path, "ssim",
+                  dict(ssim=scores, frame_hash=np.asarray(hashes, dtype=np.uint64)),
+                  **cache_params)
+    return _redundancy_from_series(scores, threshold)
+
+
+def _redundancy_from_series(scores: np.ndarray, threshold: float) -> dict:
+    total = len(scores)
+    redundant = int((scores > threshold).sum())
 
     # เฟรมแรกไม่มีคู่ เปรียบเทียบไม่ได้
-    mean_ssim = ssim_sum / max(total, 1)
+    mean_ssim = float(scores.sum()) / max(total, 1)
     redundant_ratio = redundant / max(total, 1)
 
     return dict(mean_ssim=mean_ssim,
@@ -137,133 +270,439 @@ def redundancy_stats(video_path: str,
 # ---------- CONFIG ----------
 VIS_TH      = 0.5          # threshold visibility
 SSIM_TH     = 0.95         # two frames “ซ้ำ” ถ้า SSIM > 0.95
-JOINTS_IDX = [
-    mp.solutions.pose.PoseLandmark.NOSE,
-    mp.solutions.pose.PoseLandmark.LEFT_EAR,
-    mp.solutions.pose.PoseLandmark.RIGHT_EAR,
-    mp.solutions.pose.PoseLandmark.LEFT_SHOULDER,
-    mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER,
-    mp.solutions.pose.PoseLandmark.LEFT_ELBOW,
-    mp.solutions.pose.PoseLandmark.RIGHT_ELBOW,
-    mp.solutions.pose.PoseLandmark.LEFT_WRIST,
-    mp.solutions.pose.PoseLandmark.RIGHT_WRIST,
-    mp.solutions.pose.PoseLandmark.LEFT_HIP,
-    mp.solutions.pose.PoseLandmark.RIGHT_HIP,
+JOINTS_IDX = [               # ค่า mp.solutions.pose.PoseLandmark (ไม่ต้อง import mediapipe)
+    0,    # NOSE
+    7,    # LEFT_EAR
+    8,    # RIGHT_EAR
+    11,   # LEFT_SHOULDER
+    12,   # RIGHT_SHOULDER
+    13,   # LEFT_ELBOW
+    14,   # RIGHT_ELBOW
+    15,   # LEFT_WRIST
+    16,   # RIGHT_WRIST
+    23,   # LEFT_HIP
+    24,   # RIGHT_HIP
 ]
+JOINT_COLS  = np.array(JOINTS_IDX)
+N_LANDMARKS = 33           # จำนวน landmark ของ MediaPipe Pose
 
 # ---------- HELPER -----------
 def calc_ssim(prev, curr):
     prev_g = cv2.cvtColor(prev, cv2.COLOR_BGR2GRAY)
     curr_g = cv2.cvtColor(curr, cv2.COLOR_BGR2GRAY)
-    score, _ = ssim(prev_g, curr_g, full=True)
-    return score
-
-def analyse_clip(path: str):
-    cap = cv2.VideoCapture(str(path))
-    mp_pose = mp.solutions.pose.Pose()
+    return ssim_pair(prev_g, curr_g)
 
-    total, dup, full_landmark = 0, 0, 0
-    traj = {idx: [] for idx in JOINTS_IDX}
-
-    ret, prev = cap.read()        # เฟรมแรก
-    if not ret:
+def extract_clip_features(path: str, gate: MotionGate | None = None,
+                          pose=None, pose_profile: str = DEFAULT_PROFILE) -> dict[str, np.ndarray]:
+    """
+    decode + pose ครั้งเดียว แล้วคืน feature ต่อเฟรม (ไม่ขึ้นกับ threshold ใด ๆ)
+    pose : mp Pose ที่สร้างไว้แล้ว (เช่นของ worker) → reset() ก่อนใช้และไม่ปิดให้
+           ถ้า None จะสร้างใหม่ตาม pose_profile (ดู pose_profiles) และปิดเมื่อจบคลิป
+    ----------------------------------------------------------------------
+    landmarks  : (T, 33, 4) float32  x, y, z, visibility (NaN = เฟรมที่ไม่เจอคน)
+    ssim       : (T-1,) SSIM ของเฟรมติดกัน (เฉพาะตอน gate=None)
+    dup        : (T-1,) bool เฟรมซ้ำกับเฟรมก่อนหน้า (SSIM > SSIM_TH)
+    frame_hash : (T,) uint64 difference hash ของแต่ละเฟรม
+    timestamps : (T,) float64 presentation timestamp (วินาที)
+    gate_stats : [gate_same, gate_diff, ssim] (เฉพาะตอนใช้ gate)
+    """
+    own_pose = pose is None
+    mp_pose = make_pose(pose_profile) if own_pose else pose
+    if not own_pose:
+        mp_pose.reset()                  # ล้าง tracking state ของคลิปก่อนหน้า
+
+    eng  = SSIMSeries()                  # stat ของเฟรมก่อนหน้าถูกเก็บไว้ใช้ซ้ำ
+    casc = SSIMCascade(SSIM_TH, gate) if gate is not None else None
+    scores, dup, hashes, stamps = [], [], [], []
+    t = 0
+
+    # gray สำหรับ SSIM, rgb สำหรับ pose (แปลงใน thread ของ reader)
+    # with/finally: pose.process พัง → decoder thread กับไฟล์ถูกปิดเสมอ
+    try:
+        with FrameReader(path, "gray", "rgb") as reader:
+            # buffer landmark จองล่วงหน้าตามจำนวนเฟรมใน header (ขยายเท่าตัวถ้าไม่พอ)
+            landmarks = np.full((max(reader.frame_count, 1), N_LANDMARKS, 4), np.nan, dtype=np.float32)
+
+            for fr in reader:
+                stamps.append(fr.timestamp)
+
+                # SSIM
+                with profiling.stage("ssim"):
+                    gray = fr.gray
+                    hashes.append(frame_dhash(gray))
+                    if casc is not None:
+                        verdict = casc.push(gray)
+                        if verdict is not None:
+                            dup.append(verdict)
+                    else:
+                        score = eng.push(gray)
+                        if len(score):
+                            scores.append(score[0])
+
+                # Pose
+                if t == len(landmarks):
+                    landmarks = np.concatenate([landmarks, np.full_like(landmarks, np.nan)])
+                with profiling.stage("pose"):
+                    res = mp_pose.process(fr.rgb)
+                if res.pose_landmarks:
+                    landmarks[t] = [(pt.x, pt.y, pt.z, pt.visibility)
+                                    for pt in res.pose_landmarks.landmark]
+                t += 1
+    finally:
+        if own_pose:
+            mp_pose.close()
+
+    if t == 0:
         raise ValueError(f"Cannot read {path}")
-    total += 1
-
-    # ----- process first frame -----
-    res = mp_pose.process(cv2.cvtColor(prev, cv2.COLOR_BGR2RGB))
-    if res.pose_landmarks:
-        lm = res.pose_landmarks.landmark
-        ref_visible = [pt.visibility > VIS_TH for pt in lm]  # เก็บว่าจุดไหน "มองเห็น"
-        visible_cnt = sum(ref_visible)
-        if visible_cnt == len(lm):
-            full_landmark += 1
-        for idx in JOINTS_IDX:
-            traj[idx].append([lm[idx].x, lm[idx].y])
+
+    feats = dict(landmarks  = landmarks[:t],
+                 frame_hash = np.asarray(hashes, dtype=np.uint64),
+                 timestamps = np.asarray(stamps, dtype=np.float64))
+    if casc is not None:
+        feats["dup"] = np.asarray(dup, dtype=bool)
+        feats["gate_stats"] = np.array([casc.stats["gate_same"],
+                                        casc.stats["gate_diff"],
+                                        casc.stats["ssim"]])
     else:
-        ref_visible = [False] * len(JOINTS_IDX)
+        feats["ssim"] = np.asarray(scores, dtype=np.float64)
+        feats["dup"]  = feats["ssim"] > SSIM_TH
+    return feats
 
-    # ----- loop rest frames -----
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        total += 1
-
-        # SSIM
-        if calc_ssim(prev, frame) > SSIM_TH:
-            dup += 1
-        prev = frame
-
-        # Pose
-        res = mp_pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        if res.pose_landmarks:
-            lm = res.pose_landmarks.landmark
-            match_cnt = sum(
-                (ref and (pt.visibility > VIS_TH))
-                for ref, pt in zip(ref_visible, lm)
-            )
-            if match_cnt / sum(ref_visible) >= 0.9:  # มีจุดที่ตรวจเจอ >= 90% ของ baseline
-                full_landmark += 1
-            for idx in JOINTS_IDX:
-                traj[idx].append([lm[idx].x, lm[idx].y])
-        else:
-            for idx in JOINTS_IDX:
-                traj[idx].append([np.nan, np.nan])
 
-    cap.release()
-    mp_pose.close()
-
-    # ----- metrics -----
-    coverage = full_landmark / total
-    dup_pct  = dup / (total-1) if total > 1 else 0
-
-    jitter_vals, std_vals = [], []
-    for idx, pts in traj.items():
-        pts = np.array(pts)
-        # เอาเฉพาะจุดที่ไม่ NaN
-        mask = ~np.isnan(pts).any(axis=1)
-        pts_valid = pts[mask]
-        if len(pts_valid) > 1:
-            deltas = np.linalg.norm(np.diff(pts_valid, axis=0), axis=1)
-            jitter_vals.append(deltas.mean())
-            std_vals.append(pts_valid.std(axis=0).mean())
-        else:
-            jitter_vals.append(np.nan)
-            std_vals.append(np.nan)
-
-    jitter_avg = np.nanmean(jitter_vals)
-    std_avg    = np.nanmean(std_vals)
-
-    return dict(
+def coverage_flags(lms: np.ndarray) -> np.ndarray:
+    """
+    (T,) bool ต่อเฟรมว่าจุด "มองเห็น" ครบเทียบกับเฟรมแรกหรือไม่
+    เฟรมแรกนับเมื่อเห็นครบทุกจุด, เฟรมถัดไปนับเมื่อเห็นจุดของเฟรมแรก >= 90%
+    """
+    found = ~np.isnan(lms[:, 0, 0])
+    vis   = lms[:, :, 3] > VIS_TH
+    ref_visible = vis[0] if found[0] else np.zeros(lms.shape[1], dtype=bool)
+
+    flags = np.zeros(len(lms), dtype=bool)
+    flags[0] = found[0] and ref_visible.all()
+    if ref_visible.any():
+        match_cnt = (vis[1:] & ref_visible).sum(axis=1)
+        flags[1:] = found[1:] & (match_cnt / ref_visible.sum() >= 0.9)
+    return flags
+
+
+def coverage_metric(lms: np.ndarray) -> float:
+    """สัดส่วนเฟรมที่ผ่าน coverage_flags()"""
+    return float(coverage_flags(lms).mean())
+
+
+def _valid_joints(lms: np.ndarray) -> np.ndarray:
+    """(V, len(JOINTS_IDX), 2) เฉพาะเฟรมที่เจอคน (landmark หายทั้งเฟรมพร้อมกัน)"""
+    found = ~np.isnan(lms[:, 0, 0])
+    return lms[found][:, JOINT_COLS, :2].astype(np.float64)
+
+
+def jitter_metric(lms: np.ndarray) -> float:
+    """ระยะขยับเฉลี่ยระหว่างเฟรมที่เจอคนติดกัน เฉลี่ยทุก joint"""
+    pts = _valid_joints(lms)
+    if len(pts) < 2:
+        return np.nan
+    return float(np.linalg.norm(np.diff(pts, axis=0), axis=2).mean())
+
+
+def stability_metric(lms: np.ndarray) -> float:
+    """ส่วนเบี่ยงเบนมาตรฐานของตำแหน่ง (เฉลี่ยแกน x,y) เฉลี่ยทุก joint"""
+    pts = _valid_joints(lms)
+    if len(pts) < 2:
+        return np.nan
+    return float(pts.std(axis=0).mean())
+
+
+def clip_metrics(feats: dict[str, np.ndarray]) -> dict:
+    """คำนวณ metric ของคลิปจาก feature ที่ได้จาก extract_clip_features() / cache"""
+    lms   = feats["landmarks"]
+    total = len(lms)
+    dup   = feats["ssim"] > SSIM_TH if "ssim" in feats else feats["dup"]
+
+    out = dict(
         frames      = total,
-        dup_pct     = dup_pct,
-        coverage    = coverage,
-        jitter      = jitter_avg,
-        stability   = std_avg
+        dup_pct     = dup.sum() / (total-1) if total > 1 else 0,
+        coverage    = coverage_metric(lms),
+        jitter      = jitter_metric(lms),
+        stability   = stability_metric(lms)
     )
+    if "gate_stats" in feats:
+        g = feats["gate_stats"]
+        out.update(gate_same=int(g[0]), gate_diff=int(g[1]), ssim_pairs=int(g[2]))
+    return out
+
+
+@profiling.timed()
+def analyse_clip(path: str, gate: MotionGate | None = None,
+                 cache: FeatureCache | bool | None = None, pose=None,
+                 pose_profile: str = DEFAULT_PROFILE,
+                 export_dir: str | None = None, chunks: int = 1):
+    """
+    pose_profile : ชื่อ profile ใน pose_profiles.POSE_PROFILES (ใช้เป็นส่วนหนึ่งของ cache key ด้วย)
+    export_dir   : ถ้าระบุ จะ export landmark + timestamp ของคลิปไว้ที่นี่ (ดู landmark_export)
+    chunks       : > 1 = แบ่งคลิปเป็นช่วงเฟรมวิเคราะห์ขนานกันใน process pool (คลิปยาว, ดู CHUNK-PARALLEL)
+                   ใช้ได้เมื่อไม่มี gate และไม่ได้ส่ง pose มาเท่านั้น และ pose_profile ต้องเป็นแบบ static
+                   (นอกนั้น raise ValueError; profile แบบ tracking landmark จะไม่ตรงกับการรันรวดเดียว)
+    gate : MotionGate | None
+        ถ้าระบุ dup_pct จะคำนวณผ่าน cascade และเพิ่มคอลัมน์ gate_same/gate_diff/ssim_pairs
+        (ไม่ใช้ cache เพราะไม่มี SSIM ครบทุกคู่)
+    cache : FeatureCache | bool | None
+        None = ใช้ default_cache() (env FEATURE_CACHE_DIR), False = ไม่ใช้
+        ถ้าวิดีโอเคยถูกวิเคราะห์แล้ว จะคำนวณ metric จาก feature ใน cache โดยไม่ decode ใหม่
+    """
+    if chunks > 1 and (gate is not None or pose is not None):
+        raise ValueError("chunks > 1 ใช้ร่วมกับ gate หรือ pose ที่ส่งมาเองไม่ได้")
+    cache = resolve_cache(cache) if gate is None else None
+    feats = cache.get(str(path), "clip", pose_profile=pose_profile) if cache is not None else None
+    if feats is None and chunks > 1:
+        feats = extract_clip_features_chunked(path, chunks, pose_profile=pose_profile,
+                                              cache=cache if cache is not None else False)
+        if cache is not None:
+            cache.put(str(path), "clip", feats, pose_profile=pose_profile)
+    elif feats is None:
+        feats = extract_clip_features(path, gate, pose=pose, pose_profile=pose_profile)
+        if cache is not None:
+            cache.put(str(path), "clip", feats, pose_profile=pose_profile)
+    if export_dir is not None:
+        export_landmarks(export_dir, recording_name(path), feats["landmarks"], feats["timestamps"],
+                         source=path, pose_profile=pose_profile)
+    return clip_metrics(feats)
+
+# ---------- PARALLEL -------------
+_WORKER_POSE = None        # Pose ของแต่ละ worker process (สร้างครั้งเดียว ใช้ทุกคลิป)
+
+def _init_pose_worker(pose_profile: str):
+    global _WORKER_POSE
+    _WORKER_POSE = make_pose(pose_profile)
+
+def _analyse_in_worker(path: str, cache, pose_profile: str, export_dir) -> dict:
+    return analyse_clip(path, cache=cache, pose=_WORKER_POSE, pose_profile=pose_profile,
+                        export_dir=export_dir)
+
+def _run_clips(paths: list[str], cache, workers: int,
+               pose_profile: str = DEFAULT_PROFILE,
+               export_dir: str | None = None) -> list[dict]:
+    """analyse_clip ทุกไฟล์ คืนผลตามลำดับ paths เสมอ (ไม่ขึ้นกับลำดับที่ worker ทำเสร็จ)"""
+    from tqdm import tqdm
+    if workers <= 1:
+        return [analyse_clip(p, cache=cache, pose_profile=pose_profile, export_dir=export_dir)
+                for p in tqdm(paths)]
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_pose_worker,
+                             initargs=(pose_profile,)) as ex:
+        futs = [ex.submit(_analyse_in_worker, p, cache, pose_profile, export_dir) for p in paths]
+        for _ in tqdm(as_completed(futs), total=len(futs)):
+            pass
+        return [f.result() for f in futs]
+
+# ---------- CHUNK-PARALLEL (วิดีโอยาวไฟล์เดียว) -------------
+# แบ่งวิดีโอเป็นช่วงเฟรมติดกัน → worker ละช่วง → ต่อ feature ต่อเฟรมกลับตามลำดับ แล้วคำนวณ metric
+# จาก array ที่ต่อแล้ว (เหมือนรันทีละเฟรม) → coverage (อ้างอิงเฟรมแรกของทั้งคลิป), jitter (ระยะข้ามรอยต่อ)
+# และ dup_pct ไม่ขึ้นกับจุดตัด; แต่ละช่วง decode เฟรมก่อนจุดตัดเพิ่ม 1 เฟรมเพื่อ SSIM คู่ที่คร่อมรอยต่อ
+#
+# ข้อจำกัด: pose แบบ tracking ขึ้นกับเฟรมก่อนหน้า แต่ละช่วงจะเริ่ม detect ใหม่ที่ต้นช่วง → landmark
+# ไม่ตรงกับการรันรวดเดียว จึงรับเฉพาะ profile ที่ static_image_mode=True (เช่น "static")
+# ซึ่ง landmark / SSIM / hash / timestamp ตรงกับ serial ทุกเฟรม profile อื่น raise ValueError
+CHUNK_MIN_FRAMES = 64      # ช่วงสั้นกว่านี้ไม่คุ้มเปิด worker
+
+
+def _check_chunk_profile(pose_profile: str | None) -> None:
+    if pose_profile is not None and not POSE_PROFILES[pose_profile].get("static_image_mode"):
+        static = [p for p, cfg in POSE_PROFILES.items() if cfg.get("static_image_mode")]
+        raise ValueError(f"chunks > 1 ใช้ได้กับ pose profile แบบ static เท่านั้น ({', '.join(static)}) "
+                         f"ได้รับ {pose_profile!r}: tracking ข้ามรอยต่อของช่วงไม่ได้")
+
+
+def frame_index(video_path: str,
+                cache: FeatureCache | bool | None = None) -> tuple[np.ndarray, bool]:
+    """
+    (timestamp ของทุกเฟรม, pos_msec_ok) ของ _scan_timestamps เก็บใน feature cache → สแกนไฟล์แค่ครั้งแรก
+    pos_msec_ok=False : timestamp เป็น idx / fps ที่สร้างขึ้น ใช้ยืนยันตำแหน่งหลัง seek ไม่ได้
+    """
+    cache = resolve_cache(cache)
+    if cache is not None:
+        hit = cache.get(str(video_path), "index")
+        if hit is not None:
+            return hit["timestamps"], bool(hit["pos_msec_ok"])
+    ts, ok = _scan_timestamps(video_path)
+    if cache is not None:
+        cache.put(str(video_path), "index", dict(timestamps=ts, pos_msec_ok=np.asarray(ok)))
+    return ts, ok
+
+
+def chunk_ranges(n_frames: int, chunks: int,
+                 min_frames: int = CHUNK_MIN_FRAMES) -> list[tuple[int, int]]:
+    """แบ่ง [0, n_frames) เป็นช่วงติดกันยาวใกล้เคียงกัน ไม่เกิน chunks ช่วง และแต่ละช่วง >= min_frames"""
+    chunks = max(1, min(chunks, n_frames // max(min_frames, 1)))
+    bounds = np.linspace(0, n_frames, chunks + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _range_features(path: str, start: int, stop: int, first_ts: float | None,
+                    size: tuple[int, int] | None = None, pose=None,
+                    eng_batch: int = 64) -> dict[str, np.ndarray]:
+    """
+    feature ของเฟรม [start, stop): ssim ของคู่ที่จบที่เฟรมเหล่านี้, frame_hash, timestamps (+ landmarks ถ้ามี pose)
+    first_ts : timestamp ของเฟรม max(start-1, 0) จาก frame_index ถ้าเฟรมแรกหลัง seek ไม่ตรง
+               จะอ่านใหม่แบบ grab ไล่จากต้นไฟล์
+               None = ไฟล์ไม่มี timestamp ที่เชื่อได้ (pos_msec_ok=False) → grab ไล่จากต้นไฟล์เลย
+               ตำแหน่งถูกต้องตาม index ที่นับเอง ไม่ต้องเทียบ timestamp
+    """
+    first = max(start - 1, 0)
+    views = ("gray", "rgb") if pose is not None else ("gray",)
+    for exact in ((True,) if first_ts is None else (False, True)):
+        reader = FrameReader(path, *views, size=size, start=first, stop=stop, exact_seek=exact)
+        head = reader.read()
+        if head is not None and (first_ts is None or abs(head.timestamp - first_ts) < 1e-6):
+            break
+        reader.close()
+    else:
+        raise ValueError(f"อ่านเฟรม {first} ของ {path} ไม่ได้")
+
+    n = stop - start
+    eng = SSIMSeries()
+    scores, batch, hashes, stamps = [], [], [], []
+    landmarks = np.full((n, N_LANDMARKS, 4), np.nan, dtype=np.float32) if pose is not None else None
+    with reader:
+        for fr in chain([head], reader):
+            batch.append(fr.gray)
+            if len(batch) >= eng_batch:
+                scores.append(eng.push(np.stack(batch)))
+                batch = []
+            if fr.index < start:             # เฟรมก่อนจุดตัด ใช้แค่เป็นคู่ SSIM
+                continue
+            hashes.append(frame_dhash(fr.gray))
+            stamps.append(fr.timestamp)
+            if pose is not None:
+                with profiling.stage("pose"):
+                    res = pose.process(fr.rgb)
+                if res.pose_landmarks:
+                    landmarks[fr.index - start] = [(pt.x, pt.y, pt.z, pt.visibility)
+                                                   for pt in res.pose_landmarks.landmark]
+    if batch:
+        scores.append(eng.push(np.stack(batch)))
+
+    if len(stamps) != n:
+        raise ValueError(f"{path}: ช่วง [{start}, {stop}) อ่านได้ {len(stamps)} เฟรม")
+    feats = dict(ssim=np.concatenate(scores), frame_hash=np.asarray(hashes, dtype=np.uint64),
+                 timestamps=np.asarray(stamps, dtype=np.float64))
+    if landmarks is not None:
+        feats["landmarks"] = landmarks
+    return feats
+
+
+def _range_in_worker(path: str, start: int, stop: int, first_ts: float | None,
+                     size: tuple[int, int] | None, with_pose: bool,
+                     eng_batch: int) -> dict[str, np.ndarray]:
+    pose = _WORKER_POSE if with_pose else None   # static_image_mode: ไม่มีสถานะข้ามเฟรมให้ reset
+    return _range_features(path, start, stop, first_ts, size, pose, eng_batch)
+
+
+def _chunked_features(path: str, chunks: int, workers: int | None = None,
+                      size: tuple[int, int] | None = None, pose_profile: str | None = None,
+                      cache: FeatureCache | bool | None = None) -> dict[str, np.ndarray]:
+    """รัน _range_features ทุกช่วงใน process pool แล้วต่อผลตามลำดับเฟรม (pose_profile=None = ไม่รัน pose)"""
+    _check_chunk_profile(pose_profile)
+    ts, pos_msec_ok = frame_index(path, cache)
+    if len(ts) == 0:
+        raise ValueError(f"Cannot read {path}")
+    ranges = chunk_ranges(len(ts), chunks)
+    with_pose = pose_profile is not None
+    eng_batch = 64 if size else 1            # ภาพเต็มทำทีละเฟรม (batch ของภาพใหญ่ไม่เร็วขึ้น กิน RAM)
+    pool_kw = dict(initializer=_init_pose_worker, initargs=(pose_profile,)) if with_pose else {}
+    with ProcessPoolExecutor(max_workers=min(workers or len(ranges), len(ranges)), **pool_kw) as ex:
+        futs = [ex.submit(_range_in_worker, str(path), a, b,
+                          float(ts[max(a - 1, 0)]) if pos_msec_ok else None, size, with_pose, eng_batch)
+                for a, b in ranges]
+        parts = [f.result() for f in futs]
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def extract_clip_features_chunked(path: str, chunks: int = os.cpu_count() or 1,
+                                  workers: int | None = None,
+                                  pose_profile: str = "static",
+                                  cache: FeatureCache | bool | None = None) -> dict[str, np.ndarray]:
+    """
+    extract_clip_features แบบแบ่งช่วงเฟรมรันขนานกัน (ไม่รองรับ gate) ผลมี key เดียวกันทุกตัว
+    pose_profile : ต้องเป็น profile แบบ static_image_mode (ดูข้อจำกัดด้านบน) ไม่งั้น raise ValueError
+    cache : ใช้เก็บ frame_index ของไฟล์ (ดู feature_cache)
+    """
+    feats = _chunked_features(path, chunks, workers, pose_profile=pose_profile, cache=cache)
+    feats["dup"] = feats["ssim"] > SSIM_TH
+    return feats
+
+
+def _with_deltas(base_metrics: dict, clip_metrics: list[dict]) -> list[dict]:
+    results = [base_metrics]
+    for m in clip_metrics:
+        # สร้าง delta เทียบ baseline (MAE แนวคิดง่าย ๆ)
+        m['Δcoverage']  = m['coverage']  - base_metrics['coverage']
+        m['Δjitter']    = m['jitter']    - base_metrics['jitter']
+        m['Δstability'] = m['stability'] - base_metrics['stability']
+        m['dup_diff']   = m['dup_pct']   - base_metrics['dup_pct']
+        results.append(m)
+    return results
 
 # ---------- MAIN -------------
-def analyse_set(baseline_path: str, others: list[str]):
+@profiling.timed()
+def analyse_set(baseline_path: str, others: list[str],
+                cache: FeatureCache | bool | None = None,
+                workers: int = 1,
+                pose_profile: str = DEFAULT_PROFILE,
+                export_dir: str | None = None):
     """
     baseline_path : คลิป fps สูงสุด (เช่น 30 fps)
     others        : list คลิปที่ down-sample แล้ว
+    cache         : ส่งต่อให้ analyse_clip (ดู feature_cache)
+    workers       : > 1 = วิเคราะห์คลิปพร้อมกันใน process pool (แต่ละ worker มี Pose ของตัวเอง)
+    pose_profile  : ชื่อ profile ใน pose_profiles.POSE_PROFILES
+    export_dir    : ถ้าระบุ จะ export landmark ทุกคลิป + index.csv (ดู landmark_export)
     """
-    results = []
+    if workers > 1:
+        return (analyse_sets([(baseline_path, others)], cache=cache, workers=workers,
+                             pose_profile=pose_profile, export_dir=export_dir)
+                .drop(columns='recording'))
+
     print("=== Baseline ===")
-    base_metrics = analyse_clip(baseline_path)
+    base_metrics = analyse_clip(baseline_path, cache=cache, pose_profile=pose_profile,
+                                export_dir=export_dir)
     base_metrics['clip'] = Path(baseline_path).name
-    results.append(base_metrics)
 
     print("\n=== Down-sampled clips ===")
-    for p in tqdm(others):
-        m = analyse_clip(p)
+    metrics = _run_clips(others, cache, 1, pose_profile, export_dir)
+    for p, m in zip(others, metrics):
         m['clip'] = Path(p).name
-        # สร้าง delta เทียบ baseline (MAE แนวคิดง่าย ๆ)
-        m['Δcoverage']  = m['coverage']  - base_metrics['coverage']
-        m['Δjitter']    = m['jitter']    - base_metrics['jitter']
-        m['Δstability'] = m['stability'] - base_metrics['stability']
-        m['dup_diff']   = m['dup_pct']   - base_metrics['dup_pct']
-        results.append(m)
+    if export_dir is not None:
+        build_index(export_dir)
+
+    import pandas as pd
+    return pd.DataFrame(_with_deltas(base_metrics, metrics))
+
 
-    return pd.DataFrame(results)
\ No newline at end of file
+def analyse_sets(jobs: list[tuple[str, list[str]]],
+                 cache: FeatureCache | bool | None = None,
+                 workers: int = os.cpu_count() or 1,
+                 pose_profile: str = DEFAULT_PROFILE,
+                 export_dir: str | None = None) -> pd.DataFrame:
+    """
+    วิเคราะห์หลาย recording ใน pool เดียว
+    jobs : [(baseline_path, others), ...]
+    คืน DataFrame รวม (เพิ่มคอลัมน์ recording = ชื่อไฟล์ baseline) เรียงตาม jobs
+    delta คำนวณใน process หลักหลังได้ผลครบ → ผลเหมือนกันทุกครั้งไม่ว่า worker จะเสร็จลำดับไหน
+    """
+    import pandas as pd
+    paths = [p for base, others in jobs for p in [base, *others]]
+    metrics = _run_clips(paths, cache, workers, pose_profile, export_dir)
+    if export_dir is not None:
+        build_index(export_dir)
+
+    frames, i = [], 0
+    for base, others in jobs:
+        chunk = metrics[i:i + 1 + len(others)]
+        i += 1 + len(others)
+        for p, m in zip([base, *others], chunk):
+            m['clip'] = Path(p).name
+        df = pd.DataFrame(_with_deltas(chunk[0], chunk[1:]))
+        df.insert(0, 'recording', Path(base).name)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
@@ -1,20 +1,17 @@
 """
 เป็นแนวทางการวิเคราะห์ผลการทดสอบ FPS แต่ให้ผลลัพธ์เพียง 1 เดียว อาจจะไม่เหมาะกับการใช้งานจริง
 
+pandas / statsmodels / scipy / matplotlib โหลดในฟังก์ชันที่ใช้ (import โมดูลนี้ใช้แค่ numpy)
 """
 from __future__ import annotations
-import pandas as pd
 import re, itertools, math
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import profiling
 from pathlib import Path
-import matplotlib.pyplot as plt
-
-# ---------- Stats ----------
-import statsmodels.api as sm
-from statsmodels.stats.anova import AnovaRM
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-
-from scipy.stats import friedmanchisquare, wilcoxon
-from statsmodels.stats.multitest import multipletests
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ----------- CONFIG ----------
 ALPHA      = 0.05                     # ค่าตัดสิน
@@ -22,30 +19,84 @@ METRICS    = ["coverage", "jitter", "stability", "dup_pct"]  # field ที่
 SUBJECT_ID = "S0"                     # ถ้ามีคลิปชุดเดียวให้ fix รหัส subject ไว้
 
 # ----------------------------------------------------------------
-def _extract_fps(name: str) -> int:
+FPS_RE    = r"(\d+(?:\.\d+)?)\s*fps"
+UNIT_COLS = ["subject", "posture", "camera"]   # คอลัมน์ที่ระบุ recording ในตาราง corpus
+
+def _extract_fps(name: str) -> int | float:
     """
     'baseline_30fps.mp4' → 30
     'clip_25fps.mp4'     → 25
+    'clip_7.5fps.mp4'    → 7.5
     """
-    m = re.search(r"(\d+)\s*fps", name.lower())
+    m = re.search(FPS_RE, name.lower())
     if m:
-        return int(m.group(1))
+        fps = float(m.group(1))
+        return int(fps) if fps.is_integer() else fps
     # กรณี baseline_30 / baseline30
     m = re.search(r"(\d+)", name)
     if m:
         return int(m.group(1))
     raise ValueError(f"หา fps ไม่เจอจากชื่อไฟล์: {name}")
 
+def fps_column(clips: pd.Series) -> pd.Series:
+    """_extract_fps ทั้งคอลัมน์ในครั้งเดียว (int ถ้าทุกค่าเป็นจำนวนเต็ม)"""
+    s = clips.str.lower().str.extract(FPS_RE, expand=False)
+    s = s.fillna(clips.str.extract(r"(\d+)", expand=False))
+    if s.isna().any():
+        raise ValueError(f"หา fps ไม่เจอจากชื่อไฟล์: {clips[s.isna()].iloc[0]}")
+    fps = s.astype(float)
+    return fps.astype(int) if (fps % 1 == 0).all() else fps
+
+def corpus_table(df_metrics: pd.DataFrame) -> pd.DataFrame:
+    """
+    เติมคอลัมน์ fps + subject / posture / camera ให้ตาราง metric
+    - ตาราง corpus ที่มีคอลัมน์เหล่านี้อยู่แล้ว → ใช้ตามนั้น
+    - ผลจาก analyse_sets (คอลัมน์ recording เช่น forward_20250506_162415_camera2.mp4)
+      → posture = คำแรกของชื่อ, camera = cameraN
+    - ไม่มีข้อมูล → subject = SUBJECT_ID, posture / camera = "-"
+    """
+    df = df_metrics.copy()
+    if "fps" not in df:
+        df["fps"] = fps_column(df["clip"])
+    rec = df["recording"].astype(str) if "recording" in df else None
+    if "subject" not in df:
+        df["subject"] = SUBJECT_ID
+    if "posture" not in df:
+        df["posture"] = rec.str.extract(r"^([A-Za-z]+)_", expand=False).fillna("-") if rec is not None else "-"
+    if "camera" not in df:
+        df["camera"] = rec.str.extract(r"(camera\d+)", expand=False).fillna("-") if rec is not None else "-"
+    return df
+
+def _unit_cols(df: pd.DataFrame) -> list[str]:
+    """คอลัมน์ที่รวมกันแล้วได้ 1 recording (baseline 1 ตัวต่อกลุ่ม)"""
+    return UNIT_COLS + (["recording"] if "recording" in df else [])
+
+def to_long(df_in: pd.DataFrame, metrics: list[str] = METRICS) -> pd.DataFrame:
+    """
+    ทุก metric ในครั้งเดียว (melt) → [subject,posture,camera,(recording),fps,metric,value]
+    """
+    df = corpus_table(df_in)
+    return (df.melt(id_vars=[*_unit_cols(df), "fps"], value_vars=metrics,
+                    var_name="metric", value_name="value")
+              .sort_values(["metric", "fps"], kind="stable")
+              .reset_index(drop=True))
+
 def reshape_long(df_in: pd.DataFrame, metric: str) -> pd.DataFrame:
     """
-    คืน DataFrame long-format: [subject,fps,value]
+    คืน DataFrame long-format: [subject,posture,camera,(recording),fps,value]
     """
-    rows = []
-    for _, r in df_in.iterrows():
-        fps_val = _extract_fps(r["clip"])
-        rows.append(dict(subject=SUBJECT_ID, fps=fps_val, value=r[metric]))
-    out = pd.DataFrame(rows).sort_values("fps").reset_index(drop=True)
-    return out
+    return to_long(df_in, [metric]).drop(columns="metric")
+
+def subject_pivot(long_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    subject × fps (ค่าเฉลี่ยของทุก posture/camera ของ subject นั้น)
+    ตัด subject ที่ขาดบาง fps ทิ้ง → ตาราง balanced สำหรับ test แบบ repeated-measures
+    """
+    return (long_df.pivot_table(index="subject", columns="fps", values="value", aggfunc="mean")
+                   .dropna())
+
+def _pivot_long(pivot: pd.DataFrame) -> pd.DataFrame:
+    return pivot.stack().rename("value").reset_index()
 
 # ----------------- PARAMETRIC -----------------
 def rm_anova(long_df: pd.DataFrame) -> tuple[float,float]:
@@ -53,18 +104,22 @@ def rm_anova(long_df: pd.DataFrame) -> tuple[float,float]:
     Repeated-Measures (within subject) ANOVA
     คืน (F-stat, p-value)
     """
-    aov = AnovaRM(long_df,
+    from statsmodels.stats.anova import AnovaRM
+    aov = AnovaRM(_pivot_long(subject_pivot(long_df)),
                   depvar="value",
                   subject="subject",
                   within=["fps"]).fit()
-    F   = aov.anova_table["F Value"][0]
-    p   = aov.anova_table["Pr > F"][0]
+    F   = aov.anova_table["F Value"].iloc[0]
+    p   = aov.anova_table["Pr > F"].iloc[0]
     return F, p
 
 def tukey(long_df: pd.DataFrame) -> pd.DataFrame:
-    """Post-hoc Tukey HSD ทั้งหมด"""
-    res = pairwise_tukeyhsd(long_df["value"],
-                            groups=long_df["fps"],
+    """Post-hoc Tukey HSD ทั้งหมด (บนค่าเฉลี่ยต่อ subject)"""
+    import pandas as pd
+    from statsmodels.stats.multicomp import pairwise_tukeyhsd
+    means = _pivot_long(subject_pivot(long_df))
+    res = pairwise_tukeyhsd(means["value"],
+                            groups=means["fps"],
                             alpha=ALPHA)
     return pd.DataFrame(data=res._results_table.data[1:],   # กำจัด header
                         columns=res._results_table.data[0])
@@ -74,68 +129,97 @@ def friedman(long_df: pd.DataFrame) -> tuple[float,float]:
     """
     Friedman test (alternative to RM-ANOVA when data non-normal / n=1 subj.)
     """
-    pivot = long_df.pivot(index="subject", columns="fps", values="value")
+    from scipy.stats import friedmanchisquare
+    pivot = subject_pivot(long_df)
     stat, p = friedmanchisquare(*pivot.values.T)
     return stat, p
 
+def _wilcoxon_vs_base(pivot: pd.DataFrame) -> tuple[list, np.ndarray]:
+    """Wilcoxon ของทุก fps เทียบ baseline (fps สูงสุด) ในการเรียกครั้งเดียว (axis=0)"""
+    base_fps = pivot.columns.max()
+    others = [f for f in pivot.columns if f != base_fps]
+    if len(pivot) < 2:                        # subject เดียว ทดสอบไม่ได้ → p = 1 (ตัดสินจาก delta อย่างเดียว)
+        return others, np.ones(len(others))
+    from scipy.stats import wilcoxon
+    diff = pivot[[base_fps]].values - pivot[others].values
+    _, p = wilcoxon(diff, axis=0)
+    return others, np.atleast_1d(p)
+
 def pairwise_wilcoxon(long_df: pd.DataFrame) -> pd.DataFrame:
     """
     Wilcoxon signed-rank (pairwise vs. baseline fps สูงสุด)
     ใช้ Holm correction
     """
-    pivot = long_df.pivot(index="subject", columns="fps", values="value")
+    import pandas as pd
+    from statsmodels.stats.multitest import multipletests
+    pivot = subject_pivot(long_df)
     base_fps = pivot.columns.max()            # baseline = fps สูงสุด
-    p_raw, comp = [], []                      # เก็บ p-value เดิม / คู่ทดสอบ
-    for f in pivot.columns:
-        if f == base_fps: 
-            continue
-        stat,p = wilcoxon(pivot[base_fps], pivot[f])
-        p_raw.append(p)
-        comp.append((f, base_fps))
+    others, p_raw = _wilcoxon_vs_base(pivot)
+    comp = [(f, base_fps) for f in others]
     # Holm correction
     reject, p_adj, *_ = multipletests(p_raw, alpha=ALPHA, method="holm")
     out = pd.DataFrame(dict(fps=comp, p_raw=p_raw, p_adj=p_adj, reject=reject))
     return out
 
 # -------------------- MAIN --------------------
+def _metric_report(m: str, long_df: pd.DataFrame, alpha: float, force_nonparam: bool) -> str:
+    """ผลทดสอบของ metric เดียวเป็นข้อความ (รันขนานกันได้ แล้วพิมพ์ตามลำดับ)"""
+    lines = [f"\n======================  {m.upper()}  ======================"]
+
+    # --- เลือกวิธีทดสอบ ---
+    use_nonparam = force_nonparam or (long_df["subject"].nunique() < 2)
+    # (ถ้ามี subject เดียว AnovaRM จะไม่ทำงาน → บังคับใช้ friedman)
+
+    if not use_nonparam:
+        # ---------- RM-ANOVA ----------
+        F,p = rm_anova(long_df)
+        lines.append(f"[RM-ANOVA]  F = {F:.3f},  p = {p:.5f}")
+        if p < alpha:
+            lines.append("  ↳ ต่างอย่างมีนัยฯ → Post-hoc Tukey (α={:.3f})".format(alpha))
+            tuk = tukey(long_df)
+            # โชว์เฉพาะคู่ baseline เท่านั้น
+            base_fps = long_df["fps"].max()
+            sel = tuk[((tuk.group1==base_fps)|(tuk.group2==base_fps))]
+            lines.append(sel.to_string(index=False))
+        else:
+            lines.append("  ↳ ไม่พบความแตกต่าง (p > α)")
+    else:
+        # ---------- Friedman ----------
+        stat,p = friedman(long_df)
+        lines.append(f"[Friedman χ²]  χ² = {stat:.3f},  p = {p:.5f}")
+        if p < alpha:
+            lines.append("  ↳ ต่างอย่างมีนัยฯ → Wilcoxon pairwise+Holm")
+            pw = pairwise_wilcoxon(long_df)
+            lines.append(pw.to_string(index=False))
+        else:
+            lines.append("  ↳ ไม่พบความแตกต่าง (p > α)")
+    return "\n".join(lines)
+
+def _per_metric(fn, long_all: pd.DataFrame, metrics: list[str], *args) -> list:
+    """เรียก fn(metric, long_df ของ metric นั้น, *args) ทุก metric พร้อมกัน คืนผลตามลำดับ metrics"""
+    groups = dict(tuple(long_all.groupby("metric", sort=False)))
+    with ThreadPoolExecutor(max_workers=len(metrics) or 1) as ex:
+        futs = [ex.submit(fn, m, groups[m].drop(columns="metric"), *args) for m in metrics]
+        return [f.result() for f in futs]
+
+@profiling.timed("stats")
+def stats_report(df_metrics: pd.DataFrame,
+                 metrics: list[str] = METRICS,
+                 alpha: float      = ALPHA,
+                 force_nonparam: bool=False) -> str:
+    """ผลของ run_stats เป็นข้อความ (เก็บ cache / เขียนไฟล์ได้)"""
+    long_all = to_long(df_metrics, metrics)
+    return "\n".join(_per_metric(_metric_report, long_all, metrics, alpha, force_nonparam))
+
 def run_stats(df_metrics: pd.DataFrame,
               metrics: list[str] = METRICS,
               alpha: float      = ALPHA,
               force_nonparam: bool=False) -> None:
     """
-    df_metrics : DataFrame ที่ได้จาก analyse_set()
+    df_metrics : DataFrame จาก analyse_set() / analyse_sets() หรือตาราง corpus
+                 ที่มีคอลัมน์ subject, posture, camera (ไม่มี → ดู corpus_table)
     """
-    for m in metrics:
-        print(f"\n======================  {m.upper()}  ======================")
-        long_df = reshape_long(df_metrics, m)
-
-        # --- เลือกวิธีทดสอบ ---
-        use_nonparam = force_nonparam or (long_df["subject"].nunique() < 2)
-        # (ถ้ามี subject เดียว AnovaRM จะไม่ทำงาน → บังคับใช้ friedman)
-
-        if not use_nonparam:
-            # ---------- RM-ANOVA ----------
-            F,p = rm_anova(long_df)
-            print(f"[RM-ANOVA]  F = {F:.3f},  p = {p:.5f}")
-            if p < alpha:
-                print("  ↳ ต่างอย่างมีนัยฯ → Post-hoc Tukey (α={:.3f})".format(alpha))
-                tuk = tukey(long_df)
-                # โชว์เฉพาะคู่ baseline เท่านั้น
-                base_fps = long_df["fps"].max()
-                sel = tuk[((tuk.group1==base_fps)|(tuk.group2==base_fps))]
-                print(sel.to_string(index=False))
-            else:
-                print("  ↳ ไม่พบความแตกต่าง (p > α)")
-        else:
-            # ---------- Friedman ----------
-            stat,p = friedman(long_df)
-            print(f"[Friedman χ²]  χ² = {stat:.3f},  p = {p:.5f}")
-            if p < alpha:
-                print("  ↳ ต่างอย่างมีนัยฯ → Wilcoxon pairwise+Holm")
-                pw = pairwise_wilcoxon(long_df)
-                print(pw.to_string(index=False))
-            else:
-                print("  ↳ ไม่พบความแตกต่าง (p > α)")
+    print(stats_report(df_metrics, metrics, alpha, force_nonparam))
 
 
 # -------------------- EXAMPLE -------------------
@@ -144,8 +228,9 @@ if __name__ == "__main__":
     1) รัน analyse_set() ได้ df แล้วเซฟเป็น CSV (หรือส่งตรงก็ได้)
     2) โหลด df แล้วเรียก run_stats(df)
     """
+    import pandas                    # pd ด้านบนมีแค่ตอน type check
     # df = analyse_set(baseline_path, others)
-    df  = pd.read_csv("metrics_all_fps.csv")       # <-- ตัวอย่าง
+    df  = pandas.read_csv("metrics_all_fps.csv")       # <-- ตัวอย่าง
 
     run_stats(df, metrics=["coverage","jitter","stability","dup_pct"])
 
@@ -157,11 +242,10 @@ THRESH = {                       # ค่าสูงสุดที่ยอม
     "stability":  0.0003,
     "dup_pct"  :  0.05,          # ห้ามเพิ่มเกิน 5 %
 }
-OUT_DIR = Path("report")         # โฟลเดอร์ผลลัพธ์
-OUT_DIR.mkdir(exist_ok=True)
+OUT_DIR = Path("report")         # โฟลเดอร์ผลลัพธ์ (สร้างตอน choose_fps เขียนผล)
 
 # -------- util : p-value ของคู่ fps vs baseline ---------------
-def pvals_vs_base(long_df: pd.DataFrame, alpha=ALPHA) -> dict[int,float]:
+def pvals_vs_base(long_df: pd.DataFrame, alpha=ALPHA) -> dict[float,float]:
     """
     คืน dict {fps : p_val}  (baseline เองไม่คืน)
     ใช้ Tukey ถ้าอนุกรม parametric, else Wilcoxon
@@ -170,69 +254,141 @@ def pvals_vs_base(long_df: pd.DataFrame, alpha=ALPHA) -> dict[int,float]:
     if long_df["subject"].nunique() > 1:       # ใช้ Tukey
         tk = tukey(long_df)
         sel = tk[(tk.group1==base)|(tk.group2==base)]
-        return { int(r.group1 if r.group2==base else r.group2) : r.pvalue
-                 for _,r in sel.iterrows() }
+        other = sel.group1.where(sel.group2==base, sel.group2)
+        return dict(zip(other, sel["p-adj"]))
     # ----- Wilcoxon (single-subject / non-param) -----
-    pv = {}
-    pivot = long_df.pivot(index="subject", columns="fps", values="value")
-    for f in pivot.columns:
-        if f==base: continue
-        _,p = wilcoxon(pivot[base], pivot[f])
-        pv[int(f)] = p
-    return pv
+    others, p = _wilcoxon_vs_base(subject_pivot(long_df))
+    return dict(zip(others, p))
+
+def _pvals_metric(m: str, long_df: pd.DataFrame, alpha: float) -> dict[float,float]:
+    return pvals_vs_base(long_df, alpha)
+
+# -------- delta ต่อ recording + bootstrap CI ----------------
+N_BOOT     = 10_000              # จำนวน resample
+CI         = 0.95
+BOOT_CHUNK = 1 << 22             # จำนวนช่องของ weight matrix ต่อ batch (คุมหน่วยความจำ)
+
+def recording_deltas(df_metrics: pd.DataFrame, metrics: list[str] = METRICS) -> pd.DataFrame:
+    """
+    long-format + delta เทียบ baseline ของ recording ตัวเอง (fps สูงสุดในกลุ่ม subject/posture/camera)
+    ไม่คืนแถวของ baseline
+    """
+    long_all = to_long(df_metrics, metrics)
+    units = [c for c in long_all.columns if c not in ("fps", "value")]   # รวม metric
+    is_base = long_all["fps"] == long_all.groupby(units, sort=False)["fps"].transform("max")
+    base_val = long_all["value"].where(is_base).groupby([long_all[c] for c in units]).transform("max")
+    if base_val.isna().any():
+        raise ValueError("หา baseline ไม่เจอในตาราง")
+    return long_all.assign(delta=long_all["value"] - base_val)[~is_base].reset_index(drop=True)
+
+@profiling.timed("bootstrap")
+def bootstrap_delta_ci(df_metrics: pd.DataFrame,
+                       metrics: list[str] = METRICS,
+                       n_boot: int = N_BOOT,
+                       ci: float = CI,
+                       seed: int | None = 0,
+                       by: list[str] | None = None) -> pd.DataFrame:
+    """
+    Bootstrap CI (percentile) ของ delta เทียบ baseline ทุก fps × metric พร้อมกัน
+    by : หน่วยที่ resample (ค่า default = subject ถ้ามี ≥ 2 คน, ไม่งั้นใช้ recording/take)
+
+    แต่ละหน่วยถูกย่อเป็นค่าเฉลี่ย delta หนึ่งแถว D (หน่วย × fps·metric)
+    การ resample n หน่วยแบบใส่คืน = น้ำหนัก multinomial w → ค่าเฉลี่ย = (w @ D) / (w @ valid)
+    ทั้ง batch จึงเป็น matmul ครั้งเดียว (ไม่มี loop ต่อ resample)
+    คืน [fps, metric, delta, ci_low, ci_high, n_units]
+    """
+    deltas = recording_deltas(df_metrics, metrics)
+    if by is None:
+        by = ["subject"] if deltas["subject"].nunique() > 1 else _unit_cols(deltas)
+    table = deltas.pivot_table(index=by, columns=["fps", "metric"], values="delta", aggfunc="mean")
+    D = table.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(D)
+    D0, V = np.where(valid, D, 0.0), valid.astype(np.float64)
+    n = len(D)
+
+    rng   = np.random.default_rng(seed)
+    boots = np.empty((n_boot, D.shape[1]))
+    step  = max(1, BOOT_CHUNK // n)
+    p     = np.full(n, 1.0 / n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for s in range(0, n_boot, step):
+            w = rng.multinomial(n, p, size=min(step, n_boot - s)).astype(np.float64)
+            boots[s:s + len(w)] = (w @ D0) / (w @ V)
+    tail = (1.0 - ci) / 2
+    lo, hi = np.nanquantile(boots, [tail, 1.0 - tail], axis=0)
+
+    out = table.columns.to_frame(index=False)
+    out["delta"]   = np.nanmean(D, axis=0)
+    out["ci_low"]  = lo
+    out["ci_high"] = hi
+    out["n_units"] = valid.sum(axis=0)
+    return out
 
 # ----------- MAIN : สรุป + เลือก FPS ----------------
+@profiling.timed()
 def choose_fps(df_metrics: pd.DataFrame,
                metrics: list[str]=METRICS,
                alpha: float=ALPHA,
-               thresh: dict[str,float]=THRESH) -> int:
-    baseline_fps = df_metrics["clip"].apply(_extract_fps).max()
-    baseline_row = df_metrics[df_metrics["clip"].str.contains(str(baseline_fps))]
-    if baseline_row.empty:
-        raise ValueError("หา baseline ไม่เจอในตาราง")
+               thresh: dict[str,float]=THRESH,
+               decision: str="point",
+               n_boot: int=N_BOOT,
+               ci: float=CI) -> int:
+    """
+    delta คิดเทียบ baseline ของแต่ละ recording (fps สูงสุดในกลุ่ม subject/posture/camera)
+    แล้วเฉลี่ยทุก recording ต่อ fps; p-value จาก pvals_vs_base (ทุก metric ขนานกัน)
 
-    summary_rows = []
-    pass_fps = set()  # fps ที่ผ่านทั้ง metric+stat จะคัดเลือกท้ายสุด
+    decision = "point" : ผ่านเมื่อ delta เฉลี่ยอยู่ใน thresh และ p > alpha (แบบเดิม)
+               "ci"    : ผ่านเมื่อขอบ CI ฝั่งที่แย่ยังอยู่ใน thresh
+                         (coverage ใช้ ci_low, metric อื่นใช้ ci_high) ไม่ใช้ p-value
+    """
+    if decision not in ("point", "ci"):
+        raise ValueError(f"decision ต้องเป็น 'point' หรือ 'ci' (ได้ {decision!r})")
+    deltas = recording_deltas(df_metrics, metrics)
+    baseline_fps = to_long(df_metrics, metrics)["fps"].max()
+
+    df_sum = (deltas.groupby(["fps", "metric"], sort=False)
+                    .agg(value=("value", "mean"), delta=("delta", "mean"), n=("delta", "size"))
+                    .reset_index())
+    order = {m: i for i, m in enumerate(metrics)}
+    df_sum = (df_sum.sort_values(["fps", "metric"], key=lambda s: s.map(order) if s.name == "metric" else s)
+                    .reset_index(drop=True))
+
+    # ----- ตรวจทิศของ metric ----- coverage สูงกว่าดี (ยอมให้ลดได้ไม่เกิน |thresh|), ที่เหลือยิ่งน้อยยิ่งดี
+    th = df_sum["metric"].map(thresh)
+    is_cov = df_sum["metric"] == "coverage"
+    cols = ["fps", "metric", "value", "delta", "p", "ok_delta", "ok_p", "n"]
+    if decision == "ci":
+        bounds = bootstrap_delta_ci(df_metrics, metrics, n_boot, ci)
+        df_sum = df_sum.merge(bounds[["fps", "metric", "ci_low", "ci_high"]], on=["fps", "metric"], how="left")
+        worst = df_sum["ci_low"].where(is_cov, df_sum["ci_high"])
+        cols[4:4] = ["ci_low", "ci_high"]
+    else:
+        worst = df_sum["delta"]
+    df_sum["ok_delta"] = (worst >= th).where(is_cov, worst <= th)
+    pvals = dict(zip(metrics, _per_metric(_pvals_metric, to_long(df_metrics, metrics), metrics, alpha)))
+    df_sum["p"] = [pvals[m].get(f, 1) for f, m in zip(df_sum["fps"], df_sum["metric"])]
+    df_sum["ok_p"] = df_sum["p"] > alpha
 
-    for m in metrics:
-        long_df = reshape_long(df_metrics, m)
-        pvals   = pvals_vs_base(long_df, alpha)   # {fps: p}
-        base_val = baseline_row.iloc[0][m]
-
-        for _,r in df_metrics.iterrows():
-            fps = _extract_fps(r["clip"])
-            if fps==baseline_fps: continue
-            val   = r[m]
-            delta = val - base_val
-            # ----- ตรวจทิศของ metric -----
-            if m=="coverage":                   # coverage สูงกว่าดี
-                ok_delta = delta >= thresh[m]   # ยอมให้ลดได้ไม่เกิน |thresh|
-            else:                               # metric ยิ่งน้อยยิ่งดี
-                ok_delta = delta <= thresh[m]
-            ok_p   = (pvals.get(fps,1) > alpha)
-
-            summary_rows.append(dict(fps=fps, metric=m, value=val,
-                                      delta=delta, p=pvals.get(fps,1),
-                                      ok_delta=ok_delta, ok_p=ok_p))
     # --------- Summary DF ----------
-    df_sum = pd.DataFrame(summary_rows)
+    df_sum = df_sum[cols]
+    OUT_DIR.mkdir(exist_ok=True)
     df_sum.to_csv(OUT_DIR/"metrics_summary.csv", index=False)
 
     # --------- เลือก fps -------------
-    for fps in sorted(df_sum.fps.unique()):
-        df_sub = df_sum[df_sum.fps==fps]
-        if df_sub["ok_delta"].all() and df_sub["ok_p"].all():
-            pass_fps.add(fps)
+    rules = ["ok_delta", "ok_p"] if decision == "point" else ["ok_delta"]
+    ok = df_sum.groupby("fps")[rules].all().all(axis=1)
+    pass_fps = set(ok.index[ok])
 
     best = max(pass_fps) if pass_fps else baseline_fps
     print("\n🎯  Recommended FPS =", best)
-    # --------- วาดกราฟ ----------
+    # --------- วาดกราฟ (ค่าเฉลี่ยทุก recording ต่อ fps) ----------
+    import matplotlib.pyplot as plt
+    means = to_long(df_metrics, metrics).groupby(["metric", "fps"])["value"].mean()
     for m in metrics:
         plt.figure()
         plt.title(f"{m} vs FPS")
-        xs = df_metrics["clip"].apply(_extract_fps)
-        ys = df_metrics[m]
-        plt.plot(xs, ys, marker="o")
+        ys = means.loc[m]
+        plt.plot(ys.index, ys.values, marker="o")
         plt.axvline(best, ls="--", label=f"chosen {best}fps")
         plt.xlabel("FPS"); plt.ylabel(m)
         plt.legend()
@@ -243,6 +399,7 @@ def choose_fps(df_metrics: pd.DataFrame,
 
 # ----------------- DEMO -----------------
 if __name__ == "__main__":
-    df = pd.read_csv("metrics_all_fps.csv")
+    import pandas
+    df = pandas.read_csv("metrics_all_fps.csv")
     run_stats(df)                   # ← P5 (พิมพ์ผลให้ดู)
     choose_fps(df)                  # ← P6
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+ตัวอ่านเฟรมที่ใช้ร่วมกันของทุกตัววิเคราะห์: decode + แปลงสี/ย่อภาพใน thread แยก แล้วส่งผ่าน queue จำกัดขนาด
+→ decode ของเฟรมถัดไปซ้อนกับงานของเฟรมปัจจุบัน (cv2 ปล่อย GIL ระหว่าง decode/cvtColor/resize)
+
+    with FrameReader(path, "gray", "rgb", size=(256, 256)) as reader:
+        for fr in reader:
+            fr.gray, fr.rgb, fr.timestamp ...
+
+views : ภาพที่ต้องการ "bgr" (ภาพที่ decode ได้), "gray", "rgb"; view ที่ไม่ได้ขอเป็น None
+size  : (w, h) ย่อทุก view ไว้ก่อนส่งให้ผู้ใช้ (None = ขนาดเดิม)
+threads : จำนวน thread ของ codec (CAP_PROP_N_THREADS) ถ้า OpenCV รองรับ; None = ค่าของ backend
+start, stop : อ่านเฉพาะเฟรม [start, stop) (Frame.index นับจากต้นไฟล์)
+exact_seek  : False = seek ด้วย CAP_PROP_POS_FRAMES (backend กระโดดไป keyframe แล้ว decode ต่อ)
+              True  = grab() ไล่จากต้นไฟล์ (ช้า แต่ตรงเสมอ ใช้เมื่อ seek ของไฟล์นั้นเชื่อไม่ได้)
+"""
+from __future__ import annotations
+import queue
+import threading
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+import profiling
+
+QUEUE_SIZE = 8             # จำนวนเฟรมที่ decode ล่วงหน้าได้
+VIEWS      = ("bgr", "gray", "rgb")
+
+_END = object()
+
+
+class Frame(NamedTuple):
+    index: int
+    timestamp: float        # วินาที (CAP_PROP_POS_MSEC)
+    bgr: np.ndarray | None
+    gray: np.ndarray | None
+    rgb: np.ndarray | None
+
+
+def open_video(path: str, threads: int | None = None) -> cv2.VideoCapture:
+    """cv2.VideoCapture ที่ขอ codec threading ถ้าระบุ threads และ OpenCV รองรับ"""
+    if threads and hasattr(cv2, "CAP_PROP_N_THREADS"):
+        cap = cv2.VideoCapture(str(path), cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, int(threads)])
+        if cap.isOpened():
+            return cap
+    return cv2.VideoCapture(str(path))
+
+
+class FrameReader:
+    def __init__(self, path: str, *views: str, size: tuple[int, int] | None = None,
+                 queue_size: int = QUEUE_SIZE, threads: int | None = None,
+                 start: int = 0, stop: int | None = None, exact_seek: bool = False):
+        views = views or ("bgr",)
+        unknown = set(views) - set(VIEWS)
+        if unknown:
+            raise ValueError(f"ไม่รู้จัก view: {sorted(unknown)} (ใช้ได้: {', '.join(VIEWS)})")
+        self.path  = str(path)
+        self.views = frozenset(views)
+        self.size  = tuple(size) if size else None
+        self.start, self.stop, self.exact_seek = start, stop, exact_seek
+        self.cap   = open_video(self.path, threads)
+        self.opened      = self.cap.isOpened()
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps         = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_size  = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                            int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self._q    = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decode, daemon=True, name="frame-reader")
+        self._thread.start()
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    # ---------- thread ของ decoder ----------
+    def _view(self, frame: np.ndarray, code: int | None) -> np.ndarray:
+        # แปลงสีก่อนแล้วค่อยย่อ (ลำดับเดียวกับโค้ดเดิมของตัววิเคราะห์ ผลตรงกันทุกพิกเซล)
+        img = frame if code is None else cv2.cvtColor(frame, code)
+        if self.size and (img.shape[1], img.shape[0]) != self.size:
+            img = cv2.resize(img, self.size)
+        return img
+
+    def _convert(self, index: int, ts: float, frame: np.ndarray) -> Frame:
+        return Frame(index, ts,
+                     self._view(frame, None) if "bgr" in self.views else None,
+                     self._view(frame, cv2.COLOR_BGR2GRAY) if "gray" in self.views else None,
+                     self._view(frame, cv2.COLOR_BGR2RGB) if "rgb" in self.views else None)
+
+    def _decode(self) -> None:
+        try:
+            index = self.start
+            if index and self.exact_seek:
+                for _ in range(index):
+                    self.cap.grab()
+            elif index:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            while not self._stop.is_set() and (self.stop is None or index < self.stop):
+                with profiling.stage("decode"):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    break
+                ts = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                with profiling.stage("preprocess"):
+                    item = self._convert(index, ts, frame)
+                self._q.put(item)
+                index += 1
+        except Exception as exc:            # ส่งต่อให้ฝั่งผู้ใช้ raise
+            self._q.put(exc)
+        finally:
+            self.cap.release()
+            self._q.put(_END)
+
+    # ---------- ฝั่งผู้ใช้ ----------
+    def __iter__(self):
+        while True:
+            item = self._q.get()
+            if item is _END:
+                self._q.put(_END)             # iterate ซ้ำ/close ภายหลังก็จบทันที
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def read(self) -> Frame | None:
+        """เฟรมถัดไป หรือ None เมื่อหมดไฟล์"""
+        return next(iter(self), None)
+
+    def close(self) -> None:
+        """หยุด decoder (ระบาย queue ให้ thread ออกจาก put() ได้) แล้วปิดไฟล์"""
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread.join()
+        while not self._q.empty():
+            self._q.get_nowait()
+        self._q.put(_END)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
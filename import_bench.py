@@ -0,0 +1,76 @@
+"""
+วัดเวลา import ของโมดูลวิเคราะห์ + เวลาเริ่ม CLI (ใน interpreter ใหม่ทุกครั้ง)
+และตรวจว่าไม่มีไลบรารีหนักถูกโหลดตอน import
+
+    python import_bench.py            # หรือ python fps_check.py bench-import
+"""
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MODULES = ["ssim_engine", "feature_cache", "landmark_export", "pose_profiles",
+           "encoder_profiles", "fps_check_lib", "fps_result", "fps_check"]
+HEAVY   = ["mediapipe", "pandas", "tqdm", "scipy", "statsmodels", "matplotlib", "skimage"]
+CLI     = [["fps_check.py", "list"], ["fps_check.py", "--help"]]
+BUDGET  = 1.0                    # วินาที: เกินนี้ถือว่า SLOW
+
+_PROBE = """
+import importlib, json, sys, time
+t = time.perf_counter()
+importlib.import_module({module!r})
+dt = time.perf_counter() - t
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps(dict(seconds=dt, heavy=heavy)))
+"""
+
+ROOT = Path(__file__).resolve().parent
+
+
+def measure_import(module: str, repeat: int = 3) -> dict:
+    """เวลา import (ค่าน้อยสุดจาก repeat ครั้ง) + ไลบรารีหนักที่ติดมา"""
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or res["seconds"] < best["seconds"]:
+            best = res
+    return dict(target=f"import {module}", seconds=best["seconds"], heavy=",".join(best["heavy"]))
+
+
+def measure_cli(args: list[str], repeat: int = 3) -> dict:
+    """เวลาทั้ง process ของคำสั่ง CLI (รวมเวลาเริ่ม interpreter)"""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, check=True)
+        times.append(time.perf_counter() - t)
+    return dict(target="python " + " ".join(args), seconds=min(times), heavy="")
+
+
+def run_bench(modules: list[str] = MODULES, cli: list[list[str]] = CLI,
+              repeat: int = 3) -> list[dict]:
+    rows = [measure_import(m, repeat) for m in modules]
+    rows += [measure_cli(c, repeat) for c in cli]
+    for r in rows:
+        r["status"] = "HEAVY" if r["heavy"] else ("SLOW" if r["seconds"] > BUDGET else "OK")
+    return rows
+
+
+def print_report(rows: list[dict]) -> None:
+    width = max(len(r["target"]) for r in rows)
+    for r in rows:
+        print(f"{r['target']:<{width}}  {r['seconds'] * 1000:8.1f} ms  {r['status']:<5}  {r['heavy']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rows = run_bench(repeat=args.repeat)
+    print_report(rows)
+    sys.exit(any(r["status"] != "OK" for r in rows))
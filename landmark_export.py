@@ -0,0 +1,100 @@
+"""
+export landmark ต่อ recording ให้ทีม ML ใช้เทรนโดยไม่ต้อง decode วิดีโอ/รัน MediaPipe ซ้ำ
+
+โครงสร้างใน out_dir (ต่อ recording ชื่อ <name>):
+    <name>.lm.npy  : (T, 33, 4) x, y, z, visibility  (float16 ค่า default, NaN = ไม่เจอคน)
+    <name>.ts.npy  : (T,) float64 timestamp ของแต่ละเฟรม (วินาที)
+    <name>.json    : meta (source, fps, pose_profile, ...)
+    index.csv      : หนึ่งแถวต่อ recording สร้างด้วย build_index()
+
+.npy ไม่บีบอัด → เปิดแบบ memory-map ได้ (np.load(mmap_mode="r")) อ่านเฉพาะช่วงที่ต้องใช้
+แต่ละ recording เขียนไฟล์ของตัวเองเท่านั้น worker หลายตัว export พร้อมกันได้ แล้วค่อย build_index ทีเดียว
+"""
+from __future__ import annotations
+import csv
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+
+INDEX_NAME   = "index.csv"
+INDEX_FIELDS = ["recording", "source", "frames", "fps", "dtype",
+                "pose_profile", "landmarks", "timestamps"]
+
+
+def recording_name(path: str | Path) -> str:
+    """
+    ชื่อ <parent>_<sub>_<stem> ของวิดีโอ (แบบเดียวกับ testing.process_video)
+    คลิปชื่อซ้ำต่างโฟลเดอร์ (เช่น S1/…/clip_30fps, S2/…/clip_30fps) จึงไม่ทับกัน; path สั้นกว่าใช้เท่าที่มี
+    """
+    path = Path(path)
+    return "_".join([*path.parts[-3:-1], path.stem])
+
+
+def export_landmarks(out_dir: str | Path, name: str,
+                     landmarks: np.ndarray, timestamps: np.ndarray,
+                     dtype=np.float16, **meta) -> Path:
+    """เขียนไฟล์ landmark/timestamp/meta ของ recording เดียว คืน path ของ .lm.npy"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    landmarks = np.asarray(landmarks)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(landmarks) != len(timestamps):
+        raise ValueError("จำนวนเฟรมของ landmarks กับ timestamps ไม่เท่ากัน")
+
+    lm_path, ts_path = out_dir / f"{name}.lm.npy", out_dir / f"{name}.ts.npy"
+    np.save(lm_path, landmarks.astype(dtype))
+    np.save(ts_path, timestamps)
+
+    dt = np.diff(timestamps)
+    meta = dict(recording    = name,
+                frames       = int(len(landmarks)),
+                fps          = round(float(1.0 / np.median(dt)), 3) if len(dt) and np.median(dt) > 0 else 0.0,
+                dtype        = np.dtype(dtype).name,
+                landmarks    = lm_path.name,
+                timestamps   = ts_path.name,
+                **{k: str(v) for k, v in meta.items()})
+    tmp = out_dir / f"{name}.json.tmp"
+    tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=1))
+    os.replace(tmp, out_dir / f"{name}.json")
+    return lm_path
+
+
+def build_index(out_dir: str | Path) -> Path:
+    """รวม meta ทุก recording ใน out_dir เป็น index.csv (เรียงตามชื่อ)"""
+    out_dir = Path(out_dir)
+    rows = []
+    for meta_path in sorted(out_dir.glob("*.json")):
+        meta = json.loads(meta_path.read_text())
+        rows.append({k: meta.get(k, "") for k in INDEX_FIELDS})
+    index_path = out_dir / INDEX_NAME
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")     # ชื่อไม่ชนกันเมื่อหลาย thread build พร้อมกัน
+    with os.fdopen(fd, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, index_path)
+    return index_path
+
+
+def load_landmarks(out_dir: str | Path, name: str,
+                   mmap: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """คืน (landmarks (T,33,4), timestamps (T,)) ของ recording เดียว (memory-map ค่า default)"""
+    out_dir = Path(out_dir)
+    mode = "r" if mmap else None
+    return (np.load(out_dir / f"{name}.lm.npy", mmap_mode=mode),
+            np.load(out_dir / f"{name}.ts.npy", mmap_mode=mode))
+
+
+def iter_dataset(index_path: str | Path, mmap: bool = True) -> Iterator[dict]:
+    """
+    วนทุก recording ใน index.csv → dict(meta ..., landmarks=memmap, timestamps=memmap)
+    ใช้ใน training loader ได้ตรง ๆ โดยไม่ต้องโหลดทั้ง dataset เข้า RAM
+    """
+    index_path = Path(index_path)
+    with open(index_path, newline="") as f:
+        for row in csv.DictReader(f):
+            lms, ts = load_landmarks(index_path.parent, row["recording"], mmap)
+            yield dict(row, landmarks=lms, timestamps=ts)
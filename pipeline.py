@@ -0,0 +1,188 @@
+"""
+pipeline แบบ DAG เล็ก ๆ ที่ cache ผลของแต่ละ stage
+
+- stage = ฟังก์ชัน + stage ที่พึ่ง (deps) + ไฟล์ input + พารามิเตอร์
+- fingerprint = sha1(source ของฟังก์ชัน, พารามิเตอร์, sha1 เนื้อไฟล์ input, fingerprint ของ deps,
+                     sha1 source / version ของ modules ที่ stage เรียกต่อ)
+  → เปลี่ยนพารามิเตอร์ของ stage ไหน ก็ run ใหม่แค่ stage นั้นกับ stage ที่อยู่ปลายทาง
+- ผลของ stage เก็บเป็น pickle ใน cache_dir/<stage>_<fingerprint>.pkl
+- stage ที่ไม่พึ่งกัน (เช่น คนละ recording) รันพร้อมกันใน thread pool
+
+    >>> pipe = Pipeline("pipeline_cache")
+    >>> pipe.add("ds", downsample_video, inputs=[video], modules=["fps_check_lib"], video_path=video)
+    >>> pipe.add("metrics", analyse_set_stage, deps=["ds"], modules=["fps_check_lib"], video=video)
+    >>> outputs = pipe.run()
+
+ฟังก์ชันของ stage รับผลของ deps เป็น positional ตามลำดับ แล้วตามด้วยพารามิเตอร์แบบ keyword
+modules : ชื่อ module ที่ stage เรียกต่อ (เช่น fps_check_lib) → แก้โค้ดใน module นั้นแล้ว stage run ใหม่เอง
+          module ที่ติดตั้งเป็น package ใช้เลข version แทน source; module ที่ไม่ได้ระบุไว้ต้องใช้ run(force=[...])
+"""
+from __future__ import annotations
+import hashlib
+import importlib.metadata
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import re
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Sequence
+
+import profiling
+from feature_cache import file_hash
+
+PIPELINE_CACHE_DIR = "pipeline_cache"
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable, deps: list[str], inputs: list[str],
+                 params: dict, check: Callable | None = None, modules: Sequence[str] = ()):
+        self.name    = name
+        self.fn      = fn
+        self.deps    = list(deps)
+        self.inputs  = [str(p) for p in inputs]
+        self.params  = params
+        self.check   = check         # check(output) → False = ผลใน cache ใช้ไม่ได้แล้ว (เช่น ไฟล์ถูกลบ)
+        self.modules = list(modules)
+
+
+def _fn_source(fn: Callable) -> str:
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        return f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+
+
+def _module_version(name: str) -> str:
+    """version ของ package ที่ติดตั้ง หรือ sha1 ของไฟล์ source (module ในโปรเจกต์) โดยไม่ import"""
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    spec = importlib.util.find_spec(name)
+    origin = getattr(spec, "origin", None)
+    return file_hash(origin) if origin and os.path.isfile(origin) else name
+
+
+def outputs_exist(paths) -> bool:
+    """check สำหรับ stage ที่คืน path (หรือ list ของ path): ทุกไฟล์ต้องยังอยู่"""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    return all(os.path.exists(p) for p in paths)
+
+
+class Pipeline:
+    def __init__(self, cache_dir: str | Path = PIPELINE_CACHE_DIR, workers: int = 4):
+        self.cache_dir = Path(cache_dir)
+        self.workers   = workers
+        self.stages: dict[str, Stage] = {}
+        self.status: dict[str, str] = {}     # ผลของ run() ล่าสุด: "cached" / "run"
+        self._fp: dict[str, str] = {}
+
+    def add(self, name: str, fn: Callable, deps: Sequence[str] = (), inputs: Sequence[str] = (),
+            check: Callable | None = None, modules: Sequence[str] = (), **params) -> str:
+        if name in self.stages:
+            raise ValueError(f"stage ซ้ำ: {name}")
+        missing = [d for d in deps if d not in self.stages]
+        if missing:
+            raise ValueError(f"stage {name}: ยังไม่มี dep {missing} (ต้อง add ก่อน)")
+        self.stages[name] = Stage(name, fn, deps, inputs, params, check, modules)
+        return name
+
+    # ---------- fingerprint / cache ----------
+    def fingerprint(self, name: str) -> str:
+        if name not in self._fp:
+            st = self.stages[name]
+            blob = json.dumps(dict(
+                source=_fn_source(st.fn),
+                params=st.params,
+                inputs=[file_hash(p) for p in st.inputs],
+                deps=[self.fingerprint(d) for d in st.deps],
+                modules={m: _module_version(m) for m in st.modules},
+            ), sort_keys=True, default=str)
+            self._fp[name] = hashlib.sha1(blob.encode()).hexdigest()[:16]
+        return self._fp[name]
+
+    def _cache_path(self, name: str) -> Path:
+        safe = re.sub(r"[^\w.-]", "_", name)           # ชื่อ stage มี / ได้ (เช่น path ของวิดีโอ)
+        return self.cache_dir / f"{safe}_{self.fingerprint(name)}.pkl"
+
+    def _load(self, name: str):
+        """คืน (hit, output)"""
+        p = self._cache_path(name)
+        if not p.exists():
+            return False, None
+        try:
+            with open(p, "rb") as f:
+                out = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+        check = self.stages[name].check
+        if check is not None and not check(out):
+            return False, None
+        return True, out
+
+    def _save(self, name: str, output) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(output, f)
+        os.replace(tmp, self._cache_path(name))
+
+    # ---------- run ----------
+    def _needed(self, targets: list[str]) -> list[str]:
+        """stage ที่ต้องมีผลเพื่อให้ได้ targets เรียงแบบ topological (ลำดับที่ add)"""
+        need, stack = set(), list(targets)
+        while stack:
+            n = stack.pop()
+            if n not in need:
+                need.add(n)
+                stack.extend(self.stages[n].deps)
+        return [n for n in self.stages if n in need]
+
+    def run(self, targets: Sequence[str] | None = None, force: Sequence[str] = ()) -> dict:
+        """
+        รัน stage ที่จำเป็นสำหรับ targets (ค่า default = ทุก stage) คืน {stage: output}
+        force : stage ที่บังคับ run ใหม่โดยไม่ดู cache (stage ปลายทางของมันจะ run ใหม่ด้วย)
+        """
+        order = self._needed(list(targets) if targets else list(self.stages))
+        forced = set()
+        for n in order:
+            if n in force or any(d in forced for d in self.stages[n].deps):
+                forced.add(n)
+        outputs, status = {}, {}
+        pending = list(order)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            while pending or running:
+                for name in [n for n in pending if all(d in outputs for d in self.stages[n].deps)]:
+                    pending.remove(name)
+                    hit, out = (False, None) if name in forced else self._load(name)
+                    if hit:
+                        outputs[name], status[name] = out, "cached"
+                        print(f"[cached] {name}")
+                        continue
+                    st = self.stages[name]
+                    args = [outputs[d] for d in st.deps]
+                    running[ex.submit(self._execute, st, args)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    outputs[name], elapsed = fut.result()
+                    status[name] = "run"
+                    print(f"[run]    {name} ({elapsed:.1f} s)")
+        self.status = status
+        return outputs
+
+    def _execute(self, st: Stage, args: list):
+        t0 = time.perf_counter()
+        with profiling.stage(f"pipeline:{st.name}"):
+            out = st.fn(*args, **st.params)
+        self._save(st.name, out)
+        return out, time.perf_counter() - t0
@@ -0,0 +1,105 @@
+"""
+Benchmark การตั้งค่า MediaPipe Pose (pose_profiles.POSE_PROFILES) บนชุดวิดีโออ้างอิง
+รายงานต่อ profile: frames/s (เฉพาะ pose.process), coverage และความต่างของ landmark
+เทียบกับ profile อ้างอิง (ค่า default = heavy / model_complexity=2)
+
+    python pose_bench.py --videos "recordings/**/*.mp4" --profiles default lite static
+"""
+from __future__ import annotations
+import argparse
+import glob
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from fps_check_lib import JOINT_COLS, N_LANDMARKS, coverage_metric
+from pose_profiles import POSE_PROFILES, REFERENCE_PROFILE, make_pose
+
+
+def run_profile(video_path: str, profile: str, max_frames: int | None = None):
+    """
+    รัน pose ทั้งคลิปด้วย profile เดียว
+    คืน (landmarks (T,33,4) float32, วินาทีที่ใช้ใน pose.process รวม)
+    """
+    cap = cv2.VideoCapture(video_path)
+    pose = make_pose(profile)
+    rows, elapsed = [], 0.0
+    while max_frames is None or len(rows) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t0 = time.perf_counter()
+        res = pose.process(rgb)
+        elapsed += time.perf_counter() - t0
+        row = np.full((N_LANDMARKS, 4), np.nan, dtype=np.float32)
+        if res.pose_landmarks:
+            row[:] = [(pt.x, pt.y, pt.z, pt.visibility) for pt in res.pose_landmarks.landmark]
+        rows.append(row)
+    cap.release()
+    pose.close()
+    return np.stack(rows), elapsed
+
+
+def landmark_deviation(lms: np.ndarray, ref: np.ndarray) -> tuple[float, float]:
+    """
+    คืน (ระยะ x,y เฉลี่ยของ JOINTS_IDX ในเฟรมที่เจอคนทั้งคู่, สัดส่วนเฟรมที่ผลเจอ/ไม่เจอตรงกัน)
+    """
+    n = min(len(lms), len(ref))
+    lms, ref = lms[:n], ref[:n]
+    found, ref_found = ~np.isnan(lms[:, 0, 0]), ~np.isnan(ref[:, 0, 0])
+    both = found & ref_found
+    if not both.any():
+        return np.nan, float((found == ref_found).mean())
+    diff = lms[both][:, JOINT_COLS, :2] - ref[both][:, JOINT_COLS, :2]
+    return float(np.linalg.norm(diff, axis=2).mean()), float((found == ref_found).mean())
+
+
+def run_bench(videos: list[str], profiles: list[str],
+              reference: str = REFERENCE_PROFILE,
+              max_frames: int | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """คืน (ผลต่อวิดีโอ×profile, สรุปเฉลี่ยต่อ profile)"""
+    if reference not in profiles:
+        profiles = [reference, *profiles]
+
+    rows = []
+    for v in videos:
+        results = {p: run_profile(v, p, max_frames) for p in profiles}
+        ref_lms = results[reference][0]
+        for p, (lms, elapsed) in results.items():
+            dev, found_agree = landmark_deviation(lms, ref_lms)
+            rows.append(dict(video=Path(v).name, profile=p, frames=len(lms),
+                             fps=len(lms) / elapsed if elapsed else np.nan,
+                             coverage=coverage_metric(lms),
+                             deviation=dev, found_agree=found_agree))
+    per_video = pd.DataFrame(rows)
+    summary = (per_video.groupby("profile", sort=False)
+               .agg(frames=("frames", "sum"), fps=("fps", "mean"),
+                    coverage=("coverage", "mean"), deviation=("deviation", "mean"),
+                    found_agree=("found_agree", "mean"))
+               .reset_index())
+    return per_video, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", default="recordings/**/*.mp4", help="glob ของวิดีโออ้างอิง")
+    parser.add_argument("--profiles", nargs="+", default=list(POSE_PROFILES),
+                        choices=list(POSE_PROFILES))
+    parser.add_argument("--reference", default=REFERENCE_PROFILE, choices=list(POSE_PROFILES))
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--out", default="report/pose_bench.csv")
+    args = parser.parse_args()
+
+    videos = sorted(glob.glob(args.videos, recursive=True))
+    if not videos:
+        raise SystemExit(f"ไม่พบวิดีโอ: {args.videos}")
+    per_video, summary = run_bench(videos, args.profiles, args.reference, args.max_frames)
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    per_video.to_csv(args.out, index=False)
+    print(summary.to_string(index=False))
+    print(f"\n[Saved] {args.out}")
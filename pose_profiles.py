@@ -0,0 +1,25 @@
+"""
+ชุดการตั้งค่า MediaPipe Pose ที่เลือกใช้ได้ทุก entry point (analyse_clip, analyse_set, process_video, run_pipeline)
+เลือกจากผล pose_bench.py (fps vs coverage vs ความต่างของ landmark จาก heavy)
+"""
+from __future__ import annotations
+
+# ---------- CONFIG ----------
+POSE_PROFILES = {
+    "default"     : dict(),                                   # ค่าเดิมของ mp.solutions.pose.Pose()
+    "heavy"       : dict(model_complexity=2),                 # reference สำหรับวัดความคลาดเคลื่อน
+    "lite"        : dict(model_complexity=0),
+    "lite_track"  : dict(model_complexity=0, min_tracking_confidence=0.3),
+    "strict_track": dict(min_tracking_confidence=0.8),
+    "static"      : dict(static_image_mode=True),             # detect ใหม่ทุกเฟรม (ไม่ใช้ tracking)
+}
+DEFAULT_PROFILE   = "default"
+REFERENCE_PROFILE = "heavy"
+
+
+def make_pose(profile: str = DEFAULT_PROFILE, **overrides):
+    """สร้าง mp.solutions.pose.Pose ตามชื่อ profile (overrides ทับค่าของ profile เช่น static_image_mode=True)"""
+    if profile not in POSE_PROFILES:
+        raise ValueError(f"ไม่รู้จัก pose profile: {profile} (มี {', '.join(POSE_PROFILES)})")
+    import mediapipe as mp                  # โหลดเมื่อสร้าง Pose ครั้งแรก (import โมดูลนี้ไม่ดึง mediapipe)
+    return mp.solutions.pose.Pose(**{**POSE_PROFILES[profile], **overrides})
@@ -0,0 +1,250 @@
+"""
+profiling แบบ opt-in: จับเวลาราย stage + sampling profiler (ถ้าต้องการ) แล้วเขียน trace ต่อรอบการรัน
+
+เปิดด้วย env หรือ flag --profile ของ CLI (fps_check.py run, testing.py):
+    SITTING_PROFILE=1                 → trace ที่ report/profile_trace.json
+    SITTING_PROFILE=out/trace.json    → trace ที่ path นั้น
+    SITTING_PROFILE_SAMPLE=1          → sampling profiler ด้วย (stack ทุก SAMPLE_INTERVAL วินาที)
+
+ผลลัพธ์:
+    <trace>.json   : Chrome trace event format เปิดใน https://ui.perfetto.dev หรือ chrome://tracing
+                     (flame chart ต่อ process/thread) หรือ speedscope
+    <trace>.folded : stack แบบ collapsed ของ sampler ("a;b;c <count>") ใช้กับ flamegraph.pl / speedscope
+    ตารางสรุปเวลารวมต่อ stage พิมพ์ตอนจบ
+
+stage ที่ใช้ทั่วทั้ง repo: decode, preprocess, pose, ssim, grid, encode, stats, capture
+(+ ชื่อ entry point เช่น run_pipeline, process_video, update_frames)
+
+ตอนปิดอยู่ stage() คืน context manager ว่างตัวเดียวกันทุกครั้ง ต้นทุนแทบเป็นศูนย์
+worker ของ process pool ได้ env ต่อจาก parent → เขียน <trace>.pid<N>.json/.folded ของตัวเอง
+แล้ว process หลักรวมเป็นไฟล์เดียวตอนจบ
+"""
+from __future__ import annotations
+import atexit
+import collections
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing import util as mp_util
+from pathlib import Path
+
+PROFILE_ENV     = "SITTING_PROFILE"
+SAMPLE_ENV      = "SITTING_PROFILE_SAMPLE"
+DEFAULT_TRACE   = "report/profile_trace.json"
+SAMPLE_INTERVAL = 0.005          # วินาที
+
+_NULL = contextlib.nullcontext()
+
+_trace: Path | None = None       # None = ปิดอยู่
+_sample = False
+_pid: int | None = None          # process ที่ state ชุดนี้เป็นของ (fork แล้วต้องเริ่มใหม่)
+_events: list[tuple] = []        # (name, start, dur, tid, args)
+_sampler: "_Sampler | None" = None
+
+
+def enabled() -> bool:
+    return _trace is not None
+
+
+def enable(trace: str | Path | None = None, sample: bool = False) -> Path:
+    """เปิด profiling (ตั้ง env ด้วยเพื่อให้ worker process เปิดตาม) คืน path ของ trace"""
+    global _trace, _sample
+    _trace = Path(trace or DEFAULT_TRACE)
+    _sample = sample
+    os.environ[PROFILE_ENV] = str(_trace)
+    if sample:
+        os.environ[SAMPLE_ENV] = "1"
+    _start_process()
+    return _trace
+
+
+def _start_process() -> None:
+    """เริ่ม state ของ process นี้: ล้าง event ที่ติดมาจาก fork, sampler, ตัวเขียนไฟล์ตอนจบ"""
+    global _pid, _events, _sampler
+    if _pid != os.getpid():
+        _pid, _events, _sampler = os.getpid(), [], None
+        if multiprocessing.parent_process() is None:
+            atexit.register(write)
+        else:
+            # worker ของ multiprocessing ออกด้วย os._exit → atexit ไม่ทำงาน แต่ finalizer ทำงาน
+            mp_util.Finalize(None, write, exitpriority=10)
+    if _sample and _sampler is None:
+        _sampler = _Sampler(SAMPLE_INTERVAL)
+
+
+# ---------- timers ----------
+class _Stage:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name, self.args = name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if _pid != os.getpid():
+            _start_process()
+        _events.append((self.name, self.start, end - self.start, threading.get_ident(), self.args))
+        return False
+
+
+def stage(name: str, **args):
+    """
+    context manager จับเวลา stage หนึ่งช่วง (ซ้อนกันได้)
+        with profiling.stage("pose"):
+            res = pose.process(rgb)
+    args จะติดไปกับ event ใน trace (เช่น video=...)
+    """
+    if _trace is None:
+        return _NULL
+    return _Stage(name, args)
+
+
+def timed(name: str | None = None):
+    """decorator: ทั้งฟังก์ชันเป็นหนึ่ง stage (ชื่อ default = ชื่อฟังก์ชัน)"""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _trace is None:
+                return fn(*a, **kw)
+            with _Stage(label, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+# ---------- sampling profiler ----------
+class _Sampler:
+    """เก็บ stack ของทุก thread (ยกเว้นตัวเอง) ทุก interval วินาที นับเป็น collapsed stack"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profiling-sampler")
+        self._thread.start()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> collections.Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+
+# ---------- output ----------
+def _child_path(trace: Path, pid: int, suffix: str) -> Path:
+    return trace.with_name(f"{trace.stem}.pid{pid}{suffix}")
+
+
+def _trace_events() -> list[dict]:
+    # perf_counter เป็นนาฬิกา monotonic ของทั้งเครื่อง → event ของทุก process เรียงบนแกนเวลาเดียวกัน
+    pid = os.getpid()
+    return [dict(name=name, ph="X", ts=start * 1e6, dur=dur * 1e6, pid=pid, tid=tid, args=args)
+            for name, start, dur, tid, args in _events]
+
+
+def summarize(events: list[dict]) -> list[dict]:
+    """เวลารวมต่อ stage เรียงจากมากไปน้อย"""
+    acc: dict[str, list] = {}
+    for e in events:
+        a = acc.setdefault(e["name"], [0, 0.0, 0.0])
+        a[0] += 1
+        a[1] += e["dur"] / 1e6
+        a[2] = max(a[2], e["dur"] / 1e6)
+    rows = [dict(stage=k, count=n, total=t, mean=t / n, max=m) for k, (n, t, m) in acc.items()]
+    return sorted(rows, key=lambda r: -r["total"])
+
+
+def print_summary(rows: list[dict]) -> None:
+    if not rows:
+        return
+    width = max(len(r["stage"]) for r in rows)
+    print(f"[profile] {'stage':<{width}}  {'count':>7}  {'total s':>9}  {'mean ms':>9}  {'max ms':>9}")
+    for r in rows:
+        print(f"[profile] {r['stage']:<{width}}  {r['count']:>7}  {r['total']:>9.3f}  "
+              f"{r['mean'] * 1000:>9.2f}  {r['max'] * 1000:>9.2f}")
+
+
+def write() -> Path | None:
+    """
+    เขียน trace ของ process นี้ (ถูกเรียกเองตอน process จบ)
+    process หลักรวมไฟล์ของ worker เข้ามาด้วยแล้วลบทิ้ง คืน path ของ trace
+    """
+    global _sampler
+    if _trace is None or _pid != os.getpid():
+        return None
+    counts = _sampler.stop() if _sampler is not None else collections.Counter()
+    _sampler = None
+    events = _trace_events()
+    _trace.parent.mkdir(parents=True, exist_ok=True)
+
+    if multiprocessing.parent_process() is not None:
+        if events:
+            _child_path(_trace, _pid, ".json").write_text(json.dumps(events))
+        if counts:
+            _child_path(_trace, _pid, ".folded").write_text(
+                "".join(f"{k} {v}\n" for k, v in counts.items()))
+        return None
+
+    for part in _trace.parent.glob(f"{_trace.stem}.pid*.json"):
+        events += json.loads(part.read_text())
+        part.unlink()
+    for part in _trace.parent.glob(f"{_trace.stem}.pid*.folded"):
+        for line in part.read_text().splitlines():
+            stack, _, n = line.rpartition(" ")
+            counts[stack] += int(n)
+        part.unlink()
+
+    _trace.write_text(json.dumps(dict(traceEvents=events, displayTimeUnit="ms")))
+    print_summary(summarize(events))
+    print(f"[profile] trace → {_trace}")
+    if counts:
+        folded = _trace.with_suffix(".folded")
+        folded.write_text("".join(f"{k} {v}\n" for k, v in counts.most_common()))
+        print(f"[profile] samples → {folded}")
+    _events.clear()
+    return _trace
+
+
+def add_cli_args(parser) -> None:
+    """เพิ่ม --profile [PATH] / --profile-sample ให้ argparse parser"""
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_TRACE, default=None, metavar="TRACE",
+                        help=f"จับเวลาราย stage แล้วเขียน trace (default {DEFAULT_TRACE})")
+    parser.add_argument("--profile-sample", action="store_true",
+                        help="เปิด sampling profiler ด้วย (เขียน <trace>.folded)")
+
+
+def enable_from_args(args) -> None:
+    """เปิด profiling ตาม flag ของ add_cli_args (subcommand ที่ไม่มี flag นี้ไม่ทำอะไร)"""
+    trace, sample = getattr(args, "profile", None), getattr(args, "profile_sample", False)
+    if trace or sample:
+        enable(trace, sample)
+
+
+if os.environ.get(PROFILE_ENV):
+    enable(None if os.environ[PROFILE_ENV] == "1" else os.environ[PROFILE_ENV],
+           os.environ.get(SAMPLE_ENV) == "1")
@@ -0,0 +1,260 @@
+"""
+SSIM แบบ batch สำหรับเฟรมติดกันในวิดีโอ (แทนการเรียก skimage ทีละคู่)
+
+- local mean / sum of squares ของแต่ละเฟรมคำนวณครั้งเดียว แล้วใช้ซ้ำทั้งคู่ (i-1, i) และ (i, i+1)
+- local mean ใช้ cv2.boxFilter (float32) ส่วนสูตร SSIM เป็น array op บนทั้ง batch
+- ให้ค่าเท่ากับ skimage.metrics.structural_similarity ค่า default สำหรับภาพ gray 2D
+  (win_size=7, uniform filter, K1=0.01, K2=0.03, sample covariance, data_range ตาม dtype)
+  ความคลาดเคลื่อน |Δ| <= SSIM_ATOL เพราะ float32 (ภาพเรียบที่มี noise เล็กน้อยแย่สุด วัดได้ ~1.5e-5
+  บนภาพ 256x256 uint8; ใช้ dtype=np.float64 ถ้าต้องการ ~1e-14)
+
+หมายเหตุ: skimage เฉลี่ยเฉพาะพื้นที่ที่ crop ขอบออก (win_size-1)//2 พิกเซล ซึ่งหน้าต่างของทุกพิกเซล
+ในพื้นที่นั้นอยู่ในภาพพอดี จึงคำนวณเฉพาะ "valid window" ได้โดยไม่ต้องสน border mode
+"""
+from __future__ import annotations
+import cv2
+import numpy as np
+
+# ---------- CONFIG ----------
+WIN_SIZE   = 7
+K1, K2     = 0.01, 0.03
+SSIM_ATOL  = 1e-4             # tolerance เทียบกับ skimage (ดู docstring ด้านบน)
+BATCH_SIZE = 64               # จำนวนเฟรมต่อ batch ใน ssim_series()
+
+
+def _data_range(dtype) -> float:
+    """data_range แบบเดียวกับ skimage: ช่วงของ dtype (uint8 → 255)"""
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return float(info.max - info.min)
+    return 2.0 if dtype.kind == "f" else 1.0
+
+
+def _local_mean(x: np.ndarray, win: int) -> np.ndarray:
+    """
+    x : (B, H, W) float → ค่าเฉลี่ยในหน้าต่าง win×win ที่ crop ขอบแล้ว (B, H-win+1, W-win+1)
+    """
+    pad = (win - 1) // 2
+    out = np.empty((x.shape[0], x.shape[1] - 2 * pad, x.shape[2] - 2 * pad), dtype=x.dtype)
+    for i, f in enumerate(x):
+        out[i] = cv2.boxFilter(f, -1, (win, win), normalize=True,
+                               borderType=cv2.BORDER_REFLECT)[pad:-pad, pad:-pad]
+    return out
+
+
+class SSIMSeries:
+    """
+    คำนวณ SSIM ของเฟรมติดกันแบบต่อเนื่อง (stream หรือ batch)
+
+    >>> eng = SSIMSeries()
+    >>> eng.push(gray_batch)    # (B,H,W) หรือ (H,W) → score ของคู่ที่จบที่เฟรมเหล่านั้น
+    เฟรมสุดท้ายของ batch ก่อนหน้าถูกเก็บไว้พร้อม statistic เพื่อต่อคู่ข้าม batch
+    """
+
+    def __init__(self, win_size: int = WIN_SIZE, data_range: float | None = None,
+                 dtype=np.float32):
+        if win_size % 2 == 0 or win_size < 3:
+            raise ValueError("win_size ต้องเป็นเลขคี่ >= 3")
+        self.win_size   = win_size
+        self.data_range = data_range
+        self.dtype      = dtype
+        self._prev      = None        # (frame, mean, mean of squares) ของเฟรมก่อนหน้า
+
+    def reset(self) -> None:
+        self._prev = None
+
+    def push(self, frames: np.ndarray) -> np.ndarray:
+        frames = np.asarray(frames)
+        if frames.ndim == 2:
+            frames = frames[None]
+        if frames.ndim != 3:
+            raise ValueError("รองรับเฉพาะภาพ grayscale (H,W) หรือ batch (B,H,W)")
+
+        win  = self.win_size
+        npix = win * win
+        dr   = self.data_range if self.data_range is not None else _data_range(frames.dtype)
+        C1   = (K1 * dr) ** 2
+        C2   = (K2 * dr) ** 2
+        cov_norm = npix / (npix - 1)   # sample covariance เหมือน skimage
+
+        # ----- statistic ต่อเฟรม (คำนวณครั้งเดียว) -----
+        x   = frames.astype(self.dtype)
+        mu  = _local_mean(x, win)
+        mu2 = _local_mean(x * x, win)
+
+        if self._prev is not None:
+            px, pmu, pmu2 = self._prev
+            x   = np.concatenate([px[None], x])
+            mu  = np.concatenate([pmu[None], mu])
+            mu2 = np.concatenate([pmu2[None], mu2])
+        self._prev = (x[-1], mu[-1], mu2[-1])
+
+        if len(x) < 2:
+            return np.empty(0, dtype=np.float64)
+
+        # ----- statistic ต่อคู่ (เหลือแค่ cross term) -----
+        mxy = _local_mean(x[:-1] * x[1:], win)
+        ux, uy = mu[:-1], mu[1:]
+        vx  = cov_norm * (mu2[:-1] - ux * ux)
+        vy  = cov_norm * (mu2[1:] - uy * uy)
+        vxy = cov_norm * (mxy - ux * uy)
+
+        S = ((2 * ux * uy + C1) * (2 * vxy + C2)) / ((ux * ux + uy * uy + C1) * (vx + vy + C2))
+        return S.mean(axis=(1, 2), dtype=np.float64)
+
+
+def ssim_series(frames, batch_size: int = BATCH_SIZE, **kw) -> np.ndarray:
+    """
+    frames : sequence ของภาพ gray (H,W) ขนาดเท่ากัน
+    คืน np.ndarray ยาว len(frames)-1 : SSIM ของคู่ (i-1, i)
+    """
+    eng = SSIMSeries(**kw)
+    out = [eng.push(np.asarray(frames[i:i + batch_size]))
+           for i in range(0, len(frames), batch_size)]
+    return np.concatenate(out) if out else np.empty(0, dtype=np.float64)
+
+
+def ssim_pair(img1: np.ndarray, img2: np.ndarray, **kw) -> float:
+    """SSIM ของภาพ gray 2 ภาพ (drop-in แทน skimage structural_similarity)"""
+    return float(SSIMSeries(**kw).push(np.stack([img1, img2]))[0])
+
+
+# ================= MOTION PREFILTER (cascade) =================
+GATE_THUMB = (32, 32)         # ขนาดภาพย่อของ stage 1
+GATE_THRESHOLD = 0.95         # SSIM threshold ที่ GATE_BOUNDS ปรับมา (threshold อื่นต้องส่ง bound เอง)
+GATE_BOUNDS = {               # (same_below, diff_above) ปรับไว้สำหรับ SSIM threshold GATE_THRESHOLD @256x256
+    "mad"  : (0.001, 0.06),   # mean |a-b| / 255 ของภาพย่อ
+    "dhash": (-1.0, 0.25),    # สัดส่วนบิตที่ต่างของ difference hash 64 บิต (ตัดสินได้แค่ "ไม่ซ้ำ")
+}
+# ผลเทียบกับ SSIM ล้วน (cascade_agreement) บนวิดีโอสังเคราะห์ 300 เฟรม วัตถุขยับ 40 เฟรม
+# + Gaussian noise σ = 1, 3, 6, 10:
+#   mad   : agreement 1.000 ทุกระดับ; σ=1 gate ตัดสินเอง 260/299 คู่, σ>=3 ส่งต่อ SSIM ทั้งหมด
+#   dhash : ถ้าให้ตัดสิน "ซ้ำ" เมื่อ hash เท่ากัน agreement ตกเหลือ 0.916 ที่ σ=3
+#           (noise ทำ SSIM < 0.95 แต่ hash ไม่เปลี่ยน) จึงปิดฝั่ง "ซ้ำ" ไว้
+# ควรรัน cascade_agreement กับวิดีโอจริงของแต่ละกล้องก่อนเปลี่ยนค่าเหล่านี้หรือ threshold
+
+
+class MotionGate:
+    """
+    stage 1 ของ cascade: เทียบภาพแบบถูก ๆ ก่อนส่งให้ SSIM
+    - method="mad"   : mean absolute difference ของภาพย่อ GATE_THUMB (INTER_AREA)
+    - method="dhash" : hamming distance ของ difference hash 8x8
+    distance <= same_below → ตัดสินว่า "ซ้ำ" ทันที, distance > diff_above → "ไม่ซ้ำ" ทันที,
+    ระหว่างนั้น = ไม่แน่ใจ → ส่งต่อให้ SSIM เต็ม
+    calibrated_for : SSIM threshold ที่ bound ใช้ได้ (GATE_THRESHOLD ถ้าใช้ค่า default ของ GATE_BOUNDS,
+                     None = ผู้ใช้ส่ง bound เอง → ผู้ใช้รับผิดชอบเอง)
+    """
+
+    def __init__(self, method: str = "mad",
+                 same_below: float | None = None,
+                 diff_above: float | None = None,
+                 thumb_size: tuple[int, int] = GATE_THUMB):
+        if method not in GATE_BOUNDS:
+            raise ValueError(f"ไม่รู้จัก method: {method}")
+        lo, hi = GATE_BOUNDS[method]
+        self.method     = method
+        self.same_below = lo if same_below is None else same_below
+        self.diff_above = hi if diff_above is None else diff_above
+        self.thumb_size = thumb_size
+        self.calibrated_for = GATE_THRESHOLD if same_below is None and diff_above is None else None
+
+    def signature(self, gray: np.ndarray) -> np.ndarray:
+        if self.method == "dhash":
+            small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+            return small[:, 1:] > small[:, :-1]
+        return cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def distance(self, sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        if self.method == "dhash":
+            return float(np.count_nonzero(sig_a != sig_b)) / sig_a.size
+        return float(np.abs(sig_a - sig_b).mean()) / 255.0
+
+    def decide(self, sig_a: np.ndarray, sig_b: np.ndarray) -> bool | None:
+        """True = ซ้ำ, False = ไม่ซ้ำ, None = ไม่แน่ใจ"""
+        d = self.distance(sig_a, sig_b)
+        if d <= self.same_below:
+            return True
+        if d > self.diff_above:
+            return False
+        return None
+
+
+def frame_dhash(gray: np.ndarray) -> np.uint64:
+    """difference hash 64 บิตของภาพ gray (ใช้เป็น frame hash ใน feature cache)"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1]).view(">u8")[0].astype(np.uint64)
+
+
+class SSIMCascade:
+    """
+    ตัดสินว่าเฟรมติดกัน "ซ้ำ" (SSIM > threshold) หรือไม่ โดยใช้ MotionGate ก่อน
+    แล้วคำนวณ SSIM เต็มเฉพาะคู่ที่ gate ไม่แน่ใจ
+
+    stats : {"gate_same", "gate_diff", "ssim"} = จำนวนคู่ที่แต่ละ stage ตัดสิน
+    ถ้า gate=None จะเป็น SSIM ล้วน (ทุกคู่ไปนับที่ "ssim")
+    gate ที่ใช้ bound default ใช้ได้กับ threshold = GATE_THRESHOLD เท่านั้น (ไม่งั้น raise ValueError
+    เพราะ gate จะตัดสินขัดกับ SSIM) threshold อื่นให้ส่ง same_below / diff_above ที่ปรับเองให้ MotionGate
+    """
+
+    def __init__(self, threshold: float = GATE_THRESHOLD, gate: MotionGate | None = None):
+        if gate is not None and gate.calibrated_for is not None and threshold != gate.calibrated_for:
+            raise ValueError(f"GATE_BOUNDS ปรับไว้สำหรับ SSIM threshold {gate.calibrated_for} "
+                             f"แต่ได้ {threshold}: ส่ง same_below / diff_above ที่ปรับด้วย "
+                             f"cascade_agreement ให้ MotionGate")
+        self.threshold = threshold
+        self.gate      = gate
+        self.stats     = dict(gate_same=0, gate_diff=0, ssim=0)
+        self._eng      = SSIMSeries()
+        self._prev     = None        # (gray, signature) ของเฟรมก่อนหน้า
+        self._eng_synced = False     # engine มี stat ของเฟรมก่อนหน้าอยู่แล้วหรือยัง
+
+    def push(self, gray: np.ndarray) -> bool | None:
+        """
+        ส่งเฟรม gray ถัดไป → True/False ว่าซ้ำกับเฟรมก่อนหน้าไหม (เฟรมแรกคืน None)
+        """
+        sig = self.gate.signature(gray) if self.gate is not None else None
+        prev, self._prev = self._prev, (gray, sig)
+        if prev is None:
+            self._eng.reset(); self._eng.push(gray)
+            self._eng_synced = True
+            return None
+
+        if self.gate is not None:
+            verdict = self.gate.decide(prev[1], sig)
+            if verdict is not None:
+                self.stats["gate_same" if verdict else "gate_diff"] += 1
+                self._eng_synced = False
+                return verdict
+
+        # ----- stage 2: SSIM เต็ม (ใช้ stat ของเฟรมก่อนหน้าซ้ำถ้ามี) -----
+        if not self._eng_synced:
+            self._eng.reset(); self._eng.push(prev[0])
+        score = self._eng.push(gray)[0]
+        self._eng_synced = True
+        self.stats["ssim"] += 1
+        return bool(score > self.threshold)
+
+    def similar(self, img1: np.ndarray, img2: np.ndarray) -> bool:
+        """API แบบคู่เดี่ยว (สำหรับ is_similar) — นับ stats เหมือน push"""
+        self._prev = None
+        self.push(img1)
+        return self.push(img2)
+
+
+def cascade_agreement(frames, threshold: float = 0.95,
+                      gate: MotionGate | None = None) -> dict:
+    """
+    เทียบการตัดสินของ cascade กับ SSIM ล้วนบนเฟรม gray ชุดเดียวกัน
+    คืน dict: agreement (สัดส่วนคู่ที่ตัดสินตรงกัน), false_same, false_diff
+              (จำนวนคู่ที่ gate ตัดสินผิดแต่ละทาง) และจำนวนคู่ที่แต่ละ stage ตัดสิน
+    ใช้ตรวจ/ปรับ GATE_BOUNDS กับวิดีโอจริงก่อนเปิดใช้ gate
+    """
+    gate = gate or MotionGate()
+    truth = ssim_series(frames) > threshold
+    casc = SSIMCascade(threshold, gate)
+    got = np.array([casc.push(f) for f in frames][1:], dtype=bool)
+    return dict(pairs       = len(truth),
+                agreement   = float((got == truth).mean()) if len(truth) else 1.0,
+                false_same  = int((got & ~truth).sum()),
+                false_diff  = int((~got & truth).sum()),
+                **casc.stats)
@@ -0,0 +1,53 @@
+from capture_health import HealthMonitor, record_fps_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def run(hm, clock, seconds, period):
+    """เรียก tick ทุก period วินาที คืน event ที่ได้"""
+    events, end = [], clock.t + seconds
+    while clock.t < end:
+        clock.t += period
+        ev = hm.tick()
+        if ev is not None:
+            events.append(ev)
+    return events
+
+
+def test_manual_fps_survives_recover():
+    clock = FakeClock()
+    fps = 20.0
+    hm = HealthMonitor(fps, policy=[("record_fps", 0.5)], clock=clock)
+
+    degrade = run(hm, clock, 5, 2 / fps)                 # ลูปช้า 2 เท่า → ลด record fps
+    assert [e["kind"] for e in degrade] == ["degrade"]
+    fps = record_fps_after(fps, degrade[0])
+    hm.set_fps(fps)
+    assert fps == 10.0 and hm.record_fps_scale == 0.5
+
+    fps = 10.0                                           # ผู้ใช้พิมพ์ fps เอง
+    hm.rebase(fps)
+    assert hm.record_fps_scale == 1.0
+
+    recover = [e for e in run(hm, clock, 30, 1 / fps) if e["step"] == "record_fps"]
+    assert [e["kind"] for e in recover] == ["recover"]
+    assert record_fps_after(fps, recover[0]) == 10.0
+    assert hm.level == 0
+
+
+def test_recover_restores_degraded_fps():
+    clock = FakeClock()
+    fps = 20.0
+    hm = HealthMonitor(fps, policy=[("record_fps", 0.5)], clock=clock)
+    (degrade,) = run(hm, clock, 5, 2 / fps)
+    fps = record_fps_after(fps, degrade)
+    hm.set_fps(fps)
+
+    (recover,) = run(hm, clock, 30, 1 / fps)
+    assert record_fps_after(fps, recover) == 20.0
@@ -6,8 +6,15 @@ import math
 import csv
 from pathlib import Path
 from tqdm import tqdm
-from skimage.metrics import structural_similarity as ssim
+from ssim_engine import SSIMSeries, ssim_pair, ssim_series
+from pose_profiles import DEFAULT_PROFILE, POSE_PROFILES, make_pose
+from landmark_export import export_landmarks, build_index, recording_name
+from frame_reader import FrameReader
+import profiling
 import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 def sharpen_image(image):
     kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
@@ -18,46 +25,247 @@ def upscale_image(image, scale=2.0):
     height = int(image.shape[0] * scale)
     return cv2.resize(image, (width, height), interpolation=cv2.INTER_CUBIC)
 
+# ---------- PREPROCESS (ก่อนส่งเข้า pose) ----------
+PREPROCESS_DEFAULT = "upscale+sharpen"          # พฤติกรรมเดิม: ขยาย 2 เท่า + sharpen
+PREPROCESS_SPECS = ["none", "sharpen", "upscale", "upscale+sharpen", "roi", "roi+upscale"]
+ROI_MARGIN = 0.25           # ขยายกรอบคนจากเฟรมก่อนหน้าออกไปด้านละ 25% ของขนาดกรอบ
+ROI_MIN_VIS = 0.5           # ใช้เฉพาะ landmark ที่ visibility เกินนี้ในการหา ROI
+
+class Preprocessor:
+    """
+    pipeline ของภาพก่อนส่งเข้า pose.process ระบุด้วย spec เช่น "none", "upscale+sharpen", "roi+upscale"
+      - upscale : ขยาย 2 เท่า (INTER_CUBIC)
+      - sharpen : filter2D kernel เดิม
+      - roi     : crop รอบคนจาก landmark ของเฟรมก่อนหน้า (เฟรมแรก/หลุด track = ทั้งภาพ)
+    __call__(frame) → (pose_input, display) โดย display คือภาพที่ใช้วาด landmark/ทำ grid
+    ถ้ามี roi จะ map landmark กลับเป็นพิกัดของทั้งภาพใน remap() และ display = เฟรมต้นฉบับ
+    pose ที่ใช้คู่กันควรสร้างด้วย make_pose(profile, **pre.pose_overrides): crop เลื่อนเกือบทุกเฟรม
+    ROI ที่ tracker ของ MediaPipe จำจากเฟรมก่อนจึงอยู่คนละพิกัดกับ crop ใหม่ → roi บังคับ static_image_mode
+    """
+
+    def __init__(self, spec=PREPROCESS_DEFAULT, scale=2.0):
+        steps = [] if spec in ("none", "") else spec.split("+")
+        unknown = set(steps) - {"upscale", "sharpen", "roi"}
+        if unknown:
+            raise ValueError(f"ไม่รู้จัก preprocess step: {sorted(unknown)}")
+        self.spec = spec
+        self.use_roi = "roi" in steps
+        self.steps = [st for st in steps if st != "roi"]
+        self.scale = scale
+        self.roi = None             # (x0, y0, w, h) ในพิกัดเฟรมต้นฉบับ
+        self.pose_overrides = dict(static_image_mode=True) if self.use_roi else {}
+        self._shape = None
+
+    def __call__(self, frame):
+        self._shape = frame.shape[:2]
+        img = frame
+        if self.use_roi and self.roi is not None:
+            x0, y0, w, h = self.roi
+            img = frame[y0:y0 + h, x0:x0 + w]
+        for st in self.steps:
+            img = upscale_image(img, scale=self.scale) if st == "upscale" else sharpen_image(img)
+        display = frame.copy() if self.use_roi else img
+        return img, display
+
+    def remap(self, pose_landmarks):
+        """แปลง landmark (normalized ของ crop) → normalized ของทั้งภาพ (แก้ใน proto โดยตรง)"""
+        if not self.use_roi or self.roi is None or pose_landmarks is None:
+            return
+        H, W = self._shape
+        x0, y0, w, h = self.roi
+        for pt in pose_landmarks.landmark:
+            pt.x = (x0 + pt.x * w) / W
+            pt.y = (y0 + pt.y * h) / H
+
+    def update(self, pose_landmarks):
+        """คำนวณ ROI ของเฟรมถัดไปจาก landmark ของเฟรมนี้ (พิกัดทั้งภาพแล้ว)"""
+        if not self.use_roi:
+            return
+        pts = [] if pose_landmarks is None else [
+            (pt.x, pt.y) for pt in pose_landmarks.landmark if pt.visibility > ROI_MIN_VIS]
+        if len(pts) < 2:
+            self.roi = None
+            return
+        H, W = self._shape
+        xs, ys = zip(*pts)
+        bw, bh = max(xs) - min(xs), max(ys) - min(ys)
+        x0 = max(int((min(xs) - ROI_MARGIN * bw) * W), 0)
+        y0 = max(int((min(ys) - ROI_MARGIN * bh) * H), 0)
+        x1 = min(int((max(xs) + ROI_MARGIN * bw) * W), W)
+        y1 = min(int((max(ys) + ROI_MARGIN * bh) * H), H)
+        self.roi = (x0, y0, x1 - x0, y1 - y0) if x1 - x0 > 16 and y1 - y0 > 16 else None
+
+def run_pose(pose, pre, frame):
+    """preprocess → pose.process → remap/update ROI คืน (display, results)"""
+    with profiling.stage("preprocess"):
+        pose_input, display = pre(frame)
+    with profiling.stage("pose"):
+        results = pose.process(cv2.cvtColor(pose_input, cv2.COLOR_BGR2RGB))
+    pre.remap(results.pose_landmarks)
+    pre.update(results.pose_landmarks)
+    return display, results
+
+def tile_frames(images, image_size=(64, 64), out=None):
+    """ย่อทุกภาพเป็น tile ครั้งเดียว → (N, h, w, 3) uint8 ใช้ซ้ำได้กับทุก grid"""
+    w, h = image_size
+    if out is None:
+        out = np.empty((len(images), h, w, 3), dtype=np.uint8)
+    for i, img in enumerate(images):
+        out[i] = cv2.resize(img, image_size)
+    return out
+
+def render_grid(tiles, grid_size, keep=None, n=None, out=None):
+    """
+    วาง tile ลง canvas ด้วย reshape/transpose ครั้งเดียว (ไม่มี loop ต่อ tile, ไม่ resize ซ้ำ)
+    tiles : (N, h, w, 3) จาก tile_frames; ใช้แค่ n ตัวแรก (ค่า default = ทั้งหมด) ช่องที่เหลือเป็นสีดำ
+    keep  : bool (n,) — False = ช่องดำ (เฟรมที่ถูกตัด) ใช้ tile ชุดเดิมได้ทุก threshold
+    out   : canvas (rows*h, cols*w, 3) ที่จองไว้แล้ว
+    """
+    rows, cols = grid_size
+    slots = rows * cols
+    n = min(len(tiles) if n is None else n, slots)
+    h, w = tiles.shape[1:3]
+    if out is None:
+        out = np.empty((rows * h, cols * w, 3), dtype=np.uint8)
+    mask = np.zeros(slots, dtype=bool)
+    mask[:n] = True if keep is None else keep[:n]
+    if len(tiles) >= slots:
+        src = tiles[:slots]
+    else:
+        src = np.zeros((slots, h, w, 3), dtype=np.uint8)
+        src[:n] = tiles[:n]
+    # (rows, cols, h, w) → (rows, h, cols, w) = layout ของ canvas; คูณ mask แล้วเขียนลง canvas ตรง ๆ
+    np.multiply(src.reshape(rows, cols, h, w, 3).swapaxes(1, 2),
+                mask.reshape(rows, 1, cols, 1, 1),
+                out=out.reshape(rows, h, cols, w, 3))
+    return out
+
 def create_image_grid(images, grid_size=(12, 12), image_size=(64, 64)):
     rows, cols = grid_size
-    canvas = np.zeros((rows * image_size[1], cols * image_size[0], 3), dtype=np.uint8)
-    for idx, img in enumerate(images[:rows * cols]):
-        resized = cv2.resize(img, image_size)
-        r = idx // cols
-        c = idx % cols
-        canvas[r*image_size[1]:(r+1)*image_size[1], c*image_size[0]:(c+1)*image_size[0]] = resized
-    return canvas
-
-def is_similar(img1, img2, threshold=0.95):
+    return render_grid(tile_frames(images[:rows * cols], image_size), grid_size)
+
+def is_similar(img1, img2, threshold=0.95, cascade=None):
+    """
+    cascade : SSIMCascade | None — ถ้าระบุจะผ่าน motion gate ก่อน SSIM
+              และนับจำนวนคู่แต่ละ stage ไว้ใน cascade.stats
+              threshold ต้องตรงกับ cascade.threshold (ไม่งั้น ValueError)
+    """
+    if cascade is not None and threshold != cascade.threshold:
+        raise ValueError(f"threshold {threshold} ไม่ตรงกับ cascade.threshold {cascade.threshold}")
     img1_gray = cv2.resize(cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY), (256, 256))
     img2_gray = cv2.resize(cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY), (256, 256))
-    score, _ = ssim(img1_gray, img2_gray, full=True)
-    return score > threshold
-
-def remove_similar_frames(frames, threshold=0.95):
-    result_frames = [frames[0]]
-    for i in tqdm(range(1, len(frames)), desc=f"SSIM @ {threshold:.2f}"):
-        if is_similar(frames[i-1], frames[i], threshold):
-            blank = np.zeros_like(frames[i])
-            result_frames.append(blank)
-        else:
-            result_frames.append(frames[i])
-    return result_frames
+    if cascade is not None:
+        return cascade.similar(img1_gray, img2_gray)
+    return ssim_pair(img1_gray, img2_gray) > threshold
+
+def similarity_series(frames, size=(256, 256)):
+    """SSIM ของเฟรมติดกันทั้งคลิป (len(frames)-1 ค่า) คำนวณครั้งเดียวต่อวิดีโอ"""
+    gray = [cv2.resize(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), size) for f in frames]
+    return ssim_series(gray)
+
+def keep_mask(scores, threshold=0.95):
+    """True = เก็บเฟรมไว้, เฟรมแรกเก็บเสมอ; เฟรมที่ SSIM กับเฟรมก่อนหน้า > threshold ถูกตัด"""
+    return np.concatenate([[True], np.asarray(scores) <= threshold])
+
+def count_kept(scores, thresholds):
+    """{threshold: จำนวนเฟรมที่เหลือ} จาก series ที่เก็บไว้ โดยไม่ต้องแตะภาพอีก"""
+    return {th: int(keep_mask(scores, th).sum()) for th in thresholds}
+
+def remove_similar_frames(frames, threshold=0.95, scores=None):
+    if scores is None:
+        scores = similarity_series(frames)
+    mask = keep_mask(scores, threshold)
+    return [f if keep else np.zeros_like(f) for f, keep in zip(frames, mask)]
+
+SSIM_THRESHOLDS = [1.00, 0.98, 0.95, 0.90, 0.85, 0.80]
+SSIM_SIZE       = (256, 256)    # ขนาดภาพ gray ที่ใช้คิด SSIM
+GRID_COLS       = 12
+GRID_TILE       = (128, 128)
+GRID_PAGE_ROWS  = 50            # 600 เฟรมต่อหน้า (take 20 s @ 30 fps ได้หน้าเดียวเหมือนเดิม)
+
+class GridPages:
+    """
+    เก็บ thumbnail + SSIM กับเฟรมก่อนหน้า ไว้แค่หนึ่งหน้า grid เมื่อหน้าเต็มจะเขียน grid ก่อน SSIM,
+    grid หลัง SSIM ทุก threshold และ final grid ของหน้านั้นทันที แล้วเริ่มหน้าใหม่
+    → หน่วยความจำคงที่ (ประมาณหน้าเดียว) ไม่ขึ้นกับความยาววิดีโอ
+    หน้าแรกใช้ชื่อไฟล์เดิม หน้าถัดไปต่อท้าย _p002, _p003, ...
+    """
+
+    def __init__(self, output_dir, prefix, file_stem, thresholds=SSIM_THRESHOLDS,
+                 cols=GRID_COLS, tile=GRID_TILE, page_rows=GRID_PAGE_ROWS):
+        self.output_dir, self.prefix, self.file_stem = output_dir, prefix, file_stem
+        self.thresholds = thresholds
+        self.cols, self.tile = cols, tile
+        self.page_size = cols * page_rows
+        self.thumbs = np.empty((self.page_size, tile[1], tile[0], 3), dtype=np.uint8)
+        self.scores = np.empty(self.page_size)
+        self.canvas = np.empty((page_rows * tile[1], cols * tile[0], 3), dtype=np.uint8)
+        self.n = 0
+        self.page = 0
+
+    def add(self, display, score):
+        """display = ภาพเต็มของเฟรม (ย่อเหลือ thumbnail ทันที), score = SSIM กับเฟรมก่อนหน้า (-inf = เก็บเสมอ)"""
+        self.thumbs[self.n] = cv2.resize(display, self.tile)
+        self.scores[self.n] = score
+        self.n += 1
+        if self.n == self.page_size:
+            self.flush()
+
+    def path(self, kind):
+        page = "" if self.page == 0 else f"_p{self.page + 1:03d}"
+        return os.path.join(self.output_dir, f"{self.prefix}_{kind}_{self.file_stem}{page}.jpg")
+
+    def flush(self):
+        if self.n == 0:
+            return
+        rows = math.ceil(self.n / self.cols)
+        grid_size = (rows, self.cols)
+        canvas = self.canvas[:rows * self.tile[1]]
+        cv2.imwrite(self.path("grid_before_ssim"), render_grid(self.thumbs, grid_size, n=self.n, out=canvas))
+        for th in self.thresholds:
+            keep = self.scores[:self.n] <= th           # เหมือน keep_mask (เฟรมแรกของคลิป = -inf)
+            render_grid(self.thumbs, grid_size, keep=keep, n=self.n, out=canvas)
+            cv2.imwrite(self.path(f"grid_after_ssim{int(th * 100):03d}"), canvas)
+        cv2.imwrite(self.path("final_grid"), canvas)  # last one as final
+        self.n = 0
+        self.page += 1
+
+SUMMARY_HEADER = [
+    "parent_folder", "subfolder", "filename", "total_frames",
+    "frames_ssim_100", "frames_ssim_098", "frames_ssim_095",
+    "frames_ssim_090", "frames_ssim_085", "frames_ssim_080", "coverage"
+]
+OUTPUT_DIR = "result"
 
 def ensure_csv_header(csv_path):
     if not os.path.exists(csv_path):
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        Path(csv_path).parent.mkdir(parents=True, exist_ok=True)
         with open(csv_path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                "parent_folder", "subfolder", "filename", "total_frames",
-                "frames_ssim_100", "frames_ssim_098", "frames_ssim_095",
-                "frames_ssim_090", "frames_ssim_085", "frames_ssim_080", "coverage"
-            ])
+            writer.writerow(SUMMARY_HEADER)
+
+def video_key(video_path):
+    """(parent_folder, subfolder, filename) แบบเดียวกับแถวใน summary.csv"""
+    parts = Path(video_path).parts
+    return parts[-3], parts[-2], Path(video_path).stem
+
+def video_artifacts(video_path, output_dir=OUTPUT_DIR):
+    """ไฟล์ที่ process_video ต้องเขียนครบถึงจะถือว่าวิดีโอนี้เสร็จ"""
+    parent, sub, stem = video_key(video_path)
+    return [os.path.join(output_dir, f"{parent}_{sub}_ssim_series_{stem}.npy"),
+            os.path.join(output_dir, f"{parent}_{sub}_final_grid_{stem}.jpg")]
 
-def process_video(video_path, csv_path):
+@profiling.timed()
+def process_video(video_path, csv_path, preprocess=PREPROCESS_DEFAULT, pose_profile=DEFAULT_PROFILE,
+                  export_dir=None, progress=True):
+    """
+    csv_path   : append แถวสรุปลงไฟล์นี้ (None = ไม่เขียน ให้ผู้เรียกเขียนเอง) และคืนแถวนั้นเสมอ
+    export_dir : ถ้าระบุ จะ export landmark (พิกัด normalized ของเฟรมต้นฉบับ) + timestamp
+                 ชื่อ <parent>_<sub>_<stem> ไว้ที่นี่ (ดู landmark_export)
+    progress   : แสดง progress bar ต่อเฟรม (ปิดเมื่อรันใน process pool)
+    """
     VIS_TH = 0.5
-    output_dir = "result"
+    output_dir = OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
 
     path_obj = Path(video_path)
@@ -66,92 +274,257 @@ def process_video(video_path, csv_path):
     file_stem = path_obj.stem
     prefix = f"{parent}_{sub}"
 
-    grid_before_path = os.path.join(output_dir, f"{prefix}_grid_before_ssim_{file_stem}.jpg")
-    final_output_path = os.path.join(output_dir, f"{prefix}_final_grid_{file_stem}.jpg")
+    series_path = os.path.join(output_dir, f"{prefix}_ssim_series_{file_stem}.npy")
 
-    pose = mp.solutions.pose.Pose()
+    pre = Preprocessor(preprocess)
+    pose = make_pose(pose_profile, **pre.pose_overrides)
     mp_drawing = mp.solutions.drawing_utils
 
-    cap = cv2.VideoCapture(video_path)
     frame_count = 0
     valid_keypoint_match = 0
-    all_frames = []
+    grids = GridPages(output_dir, prefix, file_stem)
+    ssim_eng = SSIMSeries()
+    scores = []                 # SSIM ของคู่ติดกัน (เก็บแค่ตัวเลข ไม่เก็บภาพ)
     ref_visible = []
+    lm_rows, stamps = [], []
+
+    # decode เฟรมถัดไปใน thread ระหว่างรอ pose ของเฟรมนี้; with/finally ปิด decoder + pose แม้ pose.process พัง
+    try:
+        with FrameReader(video_path, "bgr") as reader, \
+                tqdm(total=reader.frame_count, desc=f"{file_stem}", disable=not progress) as pbar:
+            for fr in reader:
+                sharpened, results = run_pose(pose, pre, fr.bgr)
+                if export_dir is not None:
+                    stamps.append(fr.timestamp)
+                    lm_rows.append([(pt.x, pt.y, pt.z, pt.visibility) for pt in results.pose_landmarks.landmark]
+                                   if results.pose_landmarks else [(np.nan,) * 4] * 33)
+
+                if results.pose_landmarks:
+                    mp_drawing.draw_landmarks(
+                        sharpened,
+                        results.pose_landmarks,
+                        mp.solutions.pose.POSE_CONNECTIONS,
+                        landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=3),
+                        connection_drawing_spec=mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
+                    )
+
+                    if frame_count == 0:
+                        ref_visible = [pt.visibility > VIS_TH for pt in results.pose_landmarks.landmark]
+                    else:
+                        lm = results.pose_landmarks.landmark
+                        match_cnt = sum((ref and (pt.visibility > VIS_TH)) for ref, pt in zip(ref_visible, lm))
+                        if sum(ref_visible) > 0 and match_cnt / sum(ref_visible) >= 0.9:
+                            valid_keypoint_match += 1
 
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    pbar = tqdm(total=total_frames, desc=f"{file_stem}")
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        upscaled = upscale_image(frame, scale=2.0)
-        sharpened = sharpen_image(upscaled)
-        frame_rgb = cv2.cvtColor(sharpened, cv2.COLOR_BGR2RGB)
-        results = pose.process(frame_rgb)
-
-        if results.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                sharpened,
-                results.pose_landmarks,
-                mp.solutions.pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=3),
-                connection_drawing_spec=mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
-            )
-
-            if frame_count == 0:
-                ref_visible = [pt.visibility > VIS_TH for pt in results.pose_landmarks.landmark]
-            else:
-                lm = results.pose_landmarks.landmark
-                match_cnt = sum((ref and (pt.visibility > VIS_TH)) for ref, pt in zip(ref_visible, lm))
-                if sum(ref_visible) > 0 and match_cnt / sum(ref_visible) >= 0.9:
-                    valid_keypoint_match += 1
-
-        all_frames.append(sharpened)
-        frame_count += 1
-        pbar.update(1)
-
-    cap.release()
-    pose.close()
-    pbar.close()
+                # เก็บแค่ thumbnail + gray ของเฟรมก่อนหน้า (อยู่ใน ssim_eng) ไม่เก็บเฟรมเต็ม
+                with profiling.stage("ssim"):
+                    gray = cv2.resize(cv2.cvtColor(sharpened, cv2.COLOR_BGR2GRAY), SSIM_SIZE)
+                    pair = ssim_eng.push(gray)
+                scores.extend(pair)
+                with profiling.stage("grid"):
+                    grids.add(sharpened, pair[0] if len(pair) else -np.inf)
+                frame_count += 1
+                pbar.update(1)
+    finally:
+        pose.close()
 
     if frame_count == 0:
         print("❌ No frames found:", video_path)
         return
 
     coverage = valid_keypoint_match / (frame_count - 1) if frame_count > 1 else 0
-    grid_cols = 12
-    grid_rows = math.ceil(len(all_frames) / grid_cols)
+    if export_dir is not None:
+        export_landmarks(export_dir, recording_name(path_obj), np.asarray(lm_rows, dtype=np.float32),
+                         stamps, source=video_path, pose_profile=pose_profile, preprocess=preprocess)
+    with profiling.stage("grid"):
+        grids.flush()
 
-    grid_before = create_image_grid(all_frames, grid_size=(grid_rows, grid_cols), image_size=(128, 128))
-    cv2.imwrite(grid_before_path, grid_before)
+    # SSIM ของคู่ติดกันเก็บไว้ใช้กับ threshold อื่นภายหลัง
+    scores = np.asarray(scores, dtype=np.float64)
+    np.save(series_path, scores)
+    ssims = count_kept(scores, SSIM_THRESHOLDS)
 
-    ssims = {}
-    thresholds = [1.00, 0.98, 0.95, 0.90, 0.85, 0.80]
-    for th in thresholds:
-        cleaned = remove_similar_frames(all_frames, threshold=th)
-        ssims[th] = sum(1 for f in cleaned if not np.all(f == 0))
-        grid_th = create_image_grid(cleaned, grid_size=(grid_rows, grid_cols), image_size=(128, 128))
-        suffix = f"{int(th * 100):03d}"
-        grid_path = os.path.join(output_dir, f"{prefix}_grid_after_ssim{suffix}_{file_stem}.jpg")
-        cv2.imwrite(grid_path, grid_th)
+    row = [
+        parent, sub, file_stem, frame_count,
+        ssims[1.00], ssims[0.98], ssims[0.95],
+        ssims[0.90], ssims[0.85], ssims[0.80], round(coverage, 4)
+    ]
+    if csv_path is not None:
+        with open(csv_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(row)
+    return row
+
+# ---------- BATCH (resumable + parallel) ----------
+def load_summary(csv_path):
+    """คืน {video_key: row} จาก summary.csv (แถวซ้ำ → ใช้แถวล่าสุด)"""
+    if not os.path.exists(csv_path):
+        return {}
+    with open(csv_path, newline='') as f:
+        rows = list(csv.reader(f))[1:]
+    return {tuple(r[:3]): r for r in rows if len(r) == len(SUMMARY_HEADER)}
+
+def rewrite_summary(csv_path, rows):
+    """เขียน summary.csv ใหม่ทั้งไฟล์ (ไฟล์ชั่วคราว + rename กันไฟล์เสียถ้าถูกขัดจังหวะ)"""
+    Path(csv_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{csv_path}.tmp"
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_HEADER)
+        writer.writerows(rows)
+    os.replace(tmp, csv_path)
 
-    cv2.imwrite(final_output_path, grid_th)  # last one as final
+def pending_videos(video_paths, csv_path, output_dir=OUTPUT_DIR, force=False):
+    """
+    แยกวิดีโอที่เสร็จแล้ว (มีแถวใน summary และไฟล์ผลลัพธ์ครบ) ออกจากที่ต้องทำ
+    เขียน summary ใหม่โดยลบเฉพาะแถวซ้ำและแถวของวิดีโอที่จะทำใหม่
+    (แถวของวิดีโออื่น รวมถึงวิดีโอที่ไม่อยู่ใน video_paths รอบนี้ คงไว้ตามเดิม)
+    คืน list วิดีโอที่ต้องทำ
+    """
+    summary = load_summary(csv_path)
+    todo = [v for v in video_paths
+            if force or video_key(v) not in summary
+            or not all(os.path.exists(p) for p in video_artifacts(v, output_dir))]
+    redo = {video_key(v) for v in todo}
+    rewrite_summary(csv_path, [row for key, row in summary.items() if key not in redo])
+    return todo
 
+def _process_in_worker(video_path, preprocess, pose_profile, export_dir):
+    return process_video(video_path, None, preprocess=preprocess, pose_profile=pose_profile,
+                         export_dir=export_dir, progress=False)
+
+def run_batch(video_paths, csv_path='result/summary.csv', workers=1,
+              preprocess=PREPROCESS_DEFAULT, pose_profile=DEFAULT_PROFILE, export_dir=None,
+              force=False):
+    """
+    process_video ทุกวิดีโอที่ยังไม่เสร็จ (ทำต่อจากรอบที่ถูกขัดจังหวะได้)
+    - workers > 1 : วิดีโอละ process ใน pool; process หลักเป็นผู้เขียน summary.csv คนเดียว
+    - แถวถูก append ทันทีที่วิดีโอนั้นเสร็จ → ถ้าหยุดกลางทาง รอบหน้าจะข้ามวิดีโอที่มีแถวแล้ว
+    - วิดีโอที่ error หรืออ่านเฟรมไม่ได้เลยจะไม่ถูกเขียนแถว (นับเป็น failed ทำใหม่รอบหน้า)
+    คืน dict สรุป (done, skipped, failed, frames, seconds)
+    """
+    todo = pending_videos(video_paths, csv_path, force=force)
+    skipped = len(video_paths) - len(todo)
+    print(f"▶ {len(todo)} videos to process ({skipped} already done)")
+
+    t0 = time.perf_counter()
+    n_done, n_frames, failed = 0, 0, []
     with open(csv_path, 'a', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow([
-            parent, sub, file_stem, frame_count,
-            ssims[1.00], ssims[0.98], ssims[0.95],
-            ssims[0.90], ssims[0.85], ssims[0.80], round(coverage, 4)
-        ])
+
+        def record(video, row):
+            nonlocal n_done, n_frames
+            if row is None:                     # เปิดไม่ได้ / ไม่มีเฟรม → ไม่มีแถวให้เขียน
+                print(f"❌ {video}: ไม่มีเฟรม")
+                failed.append(video)
+                return
+            n_done += 1
+            writer.writerow(row)
+            f.flush()
+            n_frames += int(row[3])
+            dt = time.perf_counter() - t0
+            print(f"[{n_done + len(failed)}/{len(todo)}] {video}  "
+                  f"{n_done / dt:.2f} videos/s  {n_frames / dt:.1f} frames/s")
+
+        if workers <= 1:
+            for v in todo:
+                print(f"\n▶ Processing: {v}")
+                try:
+                    record(v, process_video(v, None, preprocess=preprocess, pose_profile=pose_profile,
+                                            export_dir=export_dir))
+                except Exception as e:          # วิดีโอเดียวพังไม่หยุดทั้ง batch
+                    print(f"❌ {v}: {e}")
+                    failed.append(v)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futs = {ex.submit(_process_in_worker, v, preprocess, pose_profile, export_dir): v
+                        for v in todo}
+                for fut in as_completed(futs):
+                    v = futs[fut]
+                    try:
+                        record(v, fut.result())
+                    except Exception as e:
+                        print(f"❌ {v}: {e}")
+                        failed.append(v)
+
+    if export_dir:
+        build_index(export_dir)
+    elapsed = time.perf_counter() - t0
+    print(f"✔ {n_done} done, {skipped} skipped, {len(failed)} failed "
+          f"in {elapsed:.1f} s ({n_frames / elapsed if elapsed else 0:.1f} frames/s)")
+    return dict(done=n_done, skipped=skipped, failed=failed,
+                frames=n_frames, seconds=elapsed)
+
+def benchmark_preprocess(video_paths, specs=PREPROCESS_SPECS, out_csv="result/preprocess_bench.csv",
+                         pose_profile=DEFAULT_PROFILE):
+    """
+    วัด throughput (เฟรม/วินาที ของ preprocess+pose) เทียบกับ coverage ของแต่ละ spec
+    coverage นิยามเดียวกับ process_video → เลือก spec ที่ถูกที่สุดที่ coverage ไม่ตก
+    """
+    VIS_TH = 0.5
+    rows = []
+    for spec in specs:
+        n_frames, matched, pairs, elapsed = 0, 0, 0, 0.0
+        for video_path in video_paths:
+            pre = Preprocessor(spec)
+            pose = make_pose(pose_profile, **pre.pose_overrides)
+            cap = cv2.VideoCapture(video_path)
+            ref_visible, frame_idx = [], 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                t0 = time.perf_counter()
+                _, results = run_pose(pose, pre, frame)
+                elapsed += time.perf_counter() - t0
+                if results.pose_landmarks:
+                    vis = [pt.visibility > VIS_TH for pt in results.pose_landmarks.landmark]
+                    if frame_idx == 0:
+                        ref_visible = vis
+                    elif sum(ref_visible) > 0:
+                        match_cnt = sum(r and v for r, v in zip(ref_visible, vis))
+                        matched += match_cnt / sum(ref_visible) >= 0.9
+                pairs += frame_idx > 0
+                frame_idx += 1
+            n_frames += frame_idx
+            cap.release()
+            pose.close()
+        rows.append(dict(spec=spec, frames=n_frames,
+                         fps=round(n_frames / elapsed, 2) if elapsed else 0.0,
+                         coverage=round(matched / pairs, 4) if pairs else 0.0))
+        print(f"  {spec:<16} {rows[-1]['fps']:>8} fps   coverage={rows[-1]['coverage']}")
+
+    Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_csv, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["spec", "frames", "fps", "coverage"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
 
 # === MAIN LOOP ===
-csv_summary_path = 'result/summary.csv'
-ensure_csv_header(csv_summary_path)
-video_folders = glob.glob('recordings/*/*')
-for folder in video_folders:
-    for video in glob.glob(os.path.join(folder, '*.mp4')):
-        print(f"\n▶ Processing: {video}")
-        process_video(video, csv_summary_path)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pose + SSIM grid ของทุกวิดีโอใน recordings/*/*")
+    parser.add_argument("--preprocess", default=PREPROCESS_DEFAULT,
+                        help=f"ขั้นตอนก่อน pose เช่น {', '.join(PREPROCESS_SPECS)}")
+    parser.add_argument("--pose-profile", default=DEFAULT_PROFILE, choices=list(POSE_PROFILES),
+                        help="การตั้งค่า MediaPipe Pose (ดู pose_profiles.py)")
+    parser.add_argument("--export-landmarks", default=None, metavar="DIR",
+                        help="export landmark ต่อวิดีโอ + index.csv สำหรับเทรนโมเดล")
+    parser.add_argument("--bench-preprocess", action="store_true",
+                        help="วัด fps/coverage ของทุก preprocess spec แทนการประมวลผลปกติ")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"จำนวน process ที่ประมวลผลวิดีโอพร้อมกัน (default 1 = ทีละไฟล์, "
+                             f"เครื่องนี้มี {os.cpu_count()} core)")
+    parser.add_argument("--force", action="store_true",
+                        help="ประมวลผลใหม่ทุกวิดีโอแม้มีผลใน summary.csv แล้ว")
+    profiling.add_cli_args(parser)
+    args = parser.parse_args()
+    profiling.enable_from_args(args)
+
+    video_paths = sorted(glob.glob('recordings/*/*/*.mp4'))
+    if args.bench_preprocess:
+        benchmark_preprocess(video_paths, pose_profile=args.pose_profile)
+    else:
+        run_batch(video_paths, 'result/summary.csv', workers=args.workers,
+                  preprocess=args.preprocess, pose_profile=args.pose_profile,
+                  export_dir=args.export_landmarks, force=args.force)
@@ -8,6 +8,11 @@ import datetime
 import os
 import glob
 
+from capture_sources import Recorder, camera_sources
+from encoder_profiles import Transcoder, encoders_from_env
+from capture_health import HealthMonitor, record_fps_after, write_session
+import profiling
+
 import platform
 if platform.system() == "Windows":
     import winsound
@@ -50,14 +55,22 @@ class DualCameraApp(ctk.CTk):
         # กำหนดสีพื้นหลัก
         self.configure(fg_color=self.bg_color)
 
-        # ตั้งค่ากล้อง
-        self.cap1 = cv2.VideoCapture(0)
-        self.cap2 = cv2.VideoCapture(1)
+        # ตั้งค่ากล้อง (ค่า default กล้อง 0 กับ 1, กำหนดเองได้ด้วย env CAMERA_SOURCES เช่น "fake,fake")
+        self.recorder = Recorder(camera_sources())
+
+        # encoder ตอนบันทึก + transcode เก็บถาวรเบื้องหลัง (env CAPTURE_ENCODER / ARCHIVE_ENCODER ดู encoder_profiles.py)
+        self.capture_encoder, archive_encoder = encoders_from_env()
+        self.transcoder = (Transcoder(archive_encoder, source=self.capture_encoder)
+                           if archive_encoder else None)
+
+        # เฝ้าลูป: deadline miss / กล้องอ่านไม่ได้ / queue ของ writer แล้วลดภาระตาม DEGRADE_POLICY (ดู capture_health.py)
+        self.health = HealthMonitor(self.fps, len(self.recorder.caps))
+        self.tick_count = 0
+        self.pending_fps = None           # fps ที่ถูกลดระหว่างบันทึก ใช้กับ take ถัดไป
+        self.next_due = time.perf_counter()
         
         # ตัวแปรสำหรับการบันทึก
         self.recording = False
-        self.out1 = None
-        self.out2 = None
         self.recording_start_time = None
         self.recording_duration = "00:00:00"
         self.current_filename = ""
@@ -525,6 +538,9 @@ class DualCameraApp(ctk.CTk):
                 os.remove(file1)
             if os.path.exists(file2):
                 os.remove(file2)
+            session = os.path.join(recordings_folder, f"{filename}_session.json")
+            if os.path.exists(session):
+                os.remove(session)
             self.status_label.configure(text=f"ลบวิดีโอ: {filename} แล้ว")
             self.load_recording_history()  # อัปเดตตารางใหม่หลังลบ
         except Exception as e:
@@ -552,8 +568,9 @@ class DualCameraApp(ctk.CTk):
         try:
             new_fps = float(self.fps_entry.get())
             if new_fps > 0:
-                self.fps = new_fps
-                self.frame_interval = int(1000 / self.fps)
+                self.apply_fps(new_fps)
+                self.health.rebase(new_fps)     # ค่าที่ผู้ใช้ตั้งเป็นฐานใหม่ ถอยขั้น record_fps จะไม่คูณทับ
+                self.pending_fps = None
                 self.status_label.configure(text=f"FPS ถูกตั้งค่าเป็น {new_fps}")
         except ValueError:
             self.status_label.configure(text="ค่า FPS ไม่ถูกต้อง")
@@ -574,16 +591,21 @@ class DualCameraApp(ctk.CTk):
         posture = self.posture_var.get().replace(" ", "_").lower()
         self.current_posture = self.posture_var.get()
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
 
         base_filename = f'{posture}_{timestamp}'
         self.current_filename = base_filename
 
         filename1 = os.path.join(recordings_folder, f'{base_filename}_camera1.mp4')
         filename2 = os.path.join(recordings_folder, f'{base_filename}_camera2.mp4')
+        self.session_path = os.path.join(recordings_folder, f'{base_filename}_session.json')
 
-        self.out1 = cv2.VideoWriter(filename1, fourcc, self.fps, (640, 480))
-        self.out2 = cv2.VideoWriter(filename2, fourcc, self.fps, (640, 480))
+        if self.pending_fps is not None:
+            self.apply_fps(self.pending_fps)
+            self.pending_fps = None
+        self.recorder.start([filename1, filename2], self.fps, self.capture_encoder, background=True)
+        self.health.start_session()
+        self.recording_started = datetime.datetime.now()
+        self.recording_t0 = time.perf_counter()
 
         self.recording = True
         self.recording_target_duration = 13
@@ -602,13 +624,24 @@ class DualCameraApp(ctk.CTk):
 
     def stop_recording(self):
         self.recording = False
-        if self.out1: self.out1.release()
-        if self.out2: self.out2.release()
+        polling = self.transcoder is not None and self.transcoder.pending()
+        files = self.recorder.stop()
+        session_error = self.write_session_metadata(files)   # สถิติไฟล์ของแต่ละกล้องอยู่ใน <take>_session.json
+        for s in files:
+            if self.transcoder is not None:
+                self.transcoder.submit(s["path"])
+        if self.transcoder is not None and not polling:
+            self.after(1000, self.poll_transcodes)
         
         # อัพเดทสถานะและปุ่ม
         self.start_button.configure(state="normal", fg_color=self.accent_color, text_color="#FFFFFF")
         self.stop_button.configure(state="disabled", fg_color="#CCCCCC", text_color="#666666")
-        self.status_label.configure(text=f"บันทึกเสร็จสิ้น ระยะเวลา {self.recording_duration}")
+        status = f"บันทึกเสร็จสิ้น ระยะเวลา {self.recording_duration}"
+        if self.recorder.writer_error is not None:
+            status = f"⚠ บันทึกหยุดกลางคัน ({self.recording_duration}): เขียนไฟล์ไม่ได้ {self.recorder.writer_error!r}"
+        if session_error:
+            status += f" (เขียน {os.path.basename(self.session_path)} ไม่ได้: {session_error})"
+        self.status_label.configure(text=status)
         
         # เพิ่มรายการใหม่ลงในประวัติ
         # โหลดประวัติการบันทึกใหม่เพื่อให้มีข้อมูลล่าสุด
@@ -618,6 +651,72 @@ class DualCameraApp(ctk.CTk):
         self.recording_duration = "00:00:00"
         self.timer_display.configure(text=self.recording_duration)
 
+    def write_session_metadata(self, files):
+        # metadata ของ take: ความยาวที่บันทึกได้จริงเทียบกับเป้า + สุขภาพของลูปและทุก intervention
+        # คืนข้อความ error ถ้าเขียนไม่ได้ (ให้ stop_recording แสดงใน status_label) ไม่งั้น None
+        meta = dict(
+            take=self.current_filename,
+            posture=self.current_posture,
+            started=self.recording_started.isoformat(timespec="seconds"),
+            fps=self.fps,
+            target_duration=self.recording_target_duration,
+            frames=self.recorded_frame_count,
+            recorded_duration=self.recorded_frame_count / self.fps,
+            wall_duration=round(time.perf_counter() - self.recording_t0, 3),
+            encoder=self.capture_encoder,
+            archive_encoder=self.transcoder.profile if self.transcoder is not None else None,
+            pending_fps=self.pending_fps,
+            files=files,
+            writer_error=repr(self.recorder.writer_error) if self.recorder.writer_error else None,
+            health=self.health.session_metadata(),
+        )
+        try:
+            write_session(self.session_path, meta)
+        except OSError as e:
+            return str(e)
+        return None
+
+    def apply_fps(self, fps):
+        self.fps = fps
+        self.frame_interval = int(1000 / self.fps)
+        self.health.set_fps(fps)
+        self.fps_entry.delete(0, "end")
+        self.fps_entry.insert(0, f"{fps:g}")
+
+    def apply_intervention(self, event):
+        # health monitor เลื่อนขั้น / ถอยกลับแล้ว: preview_every / preview_scale มีผลทันทีผ่าน self.health
+        if event["step"] == "record_fps":
+            current = self.pending_fps if self.pending_fps is not None else self.fps
+            new_fps = record_fps_after(current, event)
+            if self.recording:
+                self.pending_fps = new_fps      # fps ของไฟล์ที่เปิดอยู่เปลี่ยนไม่ได้
+                event["applied"] = "next_take"
+            else:
+                self.apply_fps(new_fps)
+                event["applied"] = "now"
+            event["record_fps"] = new_fps
+        if event["kind"] == "recover":
+            self.status_label.configure(text=f"ลูปกลับมาทันแล้ว คืนค่า: {event['step']} → {event['after']}")
+        else:
+            self.status_label.configure(text=f"⚠ ลูปไม่ทัน ลดภาระ: {event['step']} → {event['after']} "
+                                             f"({', '.join(event['reasons'])})")
+
+    def poll_transcodes(self):
+        # transcode เสร็จแล้ว → ไฟล์ปลายทางพร้อมใช้ โหลดประวัติใหม่
+        results = self.transcoder.collect()
+        for r in results:
+            if "error" in r:
+                self.status_label.configure(
+                    text=f"แปลงไฟล์ {os.path.basename(r['src'])} ไม่สำเร็จ (เก็บไฟล์เดิมไว้): {r['error']}")
+            elif not self.recording:
+                self.status_label.configure(
+                    text=f"แปลงไฟล์ {os.path.basename(r['path'])} เป็น {r['profile']} แล้ว "
+                         f"({r['src_bytes'] / 1e6:.1f} → {r['bytes'] / 1e6:.1f} MB)")
+        if results:
+            self.load_recording_history()
+        if self.transcoder.pending():
+            self.after(1000, self.poll_transcodes)
+
     def update_timer(self):
         # คำนวณเวลาที่ผ่านไปจากจำนวนเฟรมที่บันทึก
         elapsed_seconds = self.recorded_frame_count / self.fps
@@ -639,18 +738,23 @@ class DualCameraApp(ctk.CTk):
         text_color="#FFA500"  # สีส้ม
     )
 
+    @profiling.timed()
     def update_frames(self):
-        ret1, frame1 = self.cap1.read()
-        ret2, frame2 = self.cap2.read()
+        frames = self.recorder.read()     # เฟรมของทุกกล้อง ปรับขนาดเป็น 640x480 แล้ว
 
         now = time.perf_counter()
         self.current_fps = 1 / (now - self.last_time)
         self.last_time = now
 
-        if ret1 and ret2:
-            # ปรับขนาดเฟรมให้เป็น 640x480
-            frame1 = cv2.resize(frame1, (640, 480))
-            frame2 = cv2.resize(frame2, (640, 480))
+        self.tick_count += 1
+        show_preview = self.tick_count % self.health.preview_every == 0
+
+        if frames is not None and show_preview:
+            frame1, frame2 = frames
+            if self.health.preview_scale != 1.0:
+                scale = self.health.preview_scale
+                frame1 = cv2.resize(frame1, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                frame2 = cv2.resize(frame2, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
             
             # แปลงเฟรมเป็น RGB และเตรียมสำหรับแสดงผล
             frame1_rgb = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)
@@ -688,10 +792,13 @@ class DualCameraApp(ctk.CTk):
             self.video_label2.configure(image=img2)
             self.video_label2.imgtk = img2
 
+        if frames is not None:
+            if self.recording:
+                try:
+                    self.recorder.write(frames)
+                except RuntimeError:            # writer เบื้องหลังล้ม: ปิดไฟล์ แล้วแจ้งใน status_label
+                    self.stop_recording()
             if self.recording:
-                self.out1.write(frame1)
-                self.out2.write(frame2)
-
                 # เพิ่มจำนวนเฟรมที่บันทึก
                 self.recorded_frame_count += 1
 
@@ -708,25 +815,29 @@ class DualCameraApp(ctk.CTk):
                 if self.recorded_frame_count >= self.target_frame_count:
                     
                     self.stop_recording()
+        else:
+            failed = ", ".join(str(i + 1) for i in self.recorder.failed)
+            self.status_label.configure(text=f"Camera {failed} อ่านเฟรมไม่ได้")
+
+        event = self.health.tick(self.recorder.failed, self.recorder.queue_depth)
+        if event is not None:
+            self.apply_intervention(event)
 
-        self.after(self.frame_interval, self.update_frames)
+        # นัดรอบถัดไปตามกำหนดเวลา ไม่ใช่ frame_interval หลังงานเสร็จ (ไม่งั้นทุกรอบยาวเกิน 1/fps เสมอ)
+        # ถ้าตามหลังอยู่แล้วเริ่มนับใหม่จากตอนนี้ ไม่เร่งรอบติดกันเพื่อไล่ให้ทัน
+        self.next_due = max(self.next_due + 1 / self.fps, time.perf_counter())
+        self.after(max(1, int((self.next_due - time.perf_counter()) * 1000)), self.update_frames)
 
     def update_camera_selection_1(self, choice):
         index = int(choice.split()[-1])
-        if self.cap1.isOpened():
-            self.cap1.release()
-        if cv2.VideoCapture(index).read()[0]:  # ตรวจสอบก่อนเปิด
-            self.cap1 = cv2.VideoCapture(index)
+        if self.recorder.replace(0, index):  # ตรวจสอบก่อนเปิด
             self.status_label.configure(text=f"Camera 1 → Camera {index}")
         else:
             self.status_label.configure(text=f"Camera {index} ไม่พร้อมใช้งาน")
 
     def update_camera_selection_2(self, choice):
         index = int(choice.split()[-1])
-        if self.cap2.isOpened():
-            self.cap2.release()
-        if cv2.VideoCapture(index).read()[0]:
-            self.cap2 = cv2.VideoCapture(index)
+        if self.recorder.replace(1, index):
             self.status_label.configure(text=f"Camera 2 → Camera {index}")
         else:
             self.status_label.configure(text=f"Camera {index} ไม่พร้อมใช้งาน")
@@ -734,11 +845,10 @@ class DualCameraApp(ctk.CTk):
     def on_closing(self):
         if self.recording:
             self.stop_recording()
-        if self.cap1.isOpened():
-            self.cap1.release()
-        if self.cap2.isOpened():
-            self.cap2.release()
+        self.recorder.release()
         self.destroy()
+        if self.transcoder is not None:
+            self.transcoder.shutdown(wait=True)  # รอไฟล์ที่ค้างในคิวแปลงให้เสร็จก่อนออก
 
 if __name__ == "__main__":
     app = DualCameraApp()